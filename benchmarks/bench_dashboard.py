@@ -0,0 +1,145 @@
+# bench_dashboard.py
+#
+# Measures what a dashboard costs the trading threads. A writer thread logs
+# strategy1_data rows and opens/closes trades through db_manager while a
+# separate process polls the database, and the write latencies are compared
+# with no reader, with the old approach (full-table reads over a normal
+# connection, rollback journal) and with DashboardQueries (read-only
+# connection, WAL, incremental polling). Also times one refresh of each
+# reader against a large trades table.
+#
+#   python benchmarks/bench_dashboard.py --rows 200000 --seconds 5
+#   python benchmarks/bench_dashboard.py --poll-interval 0.1
+
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.join(BASE_DIR, 'src'))
+sys.path.append(os.path.join(BASE_DIR, 'benchmarks'))
+
+import db_manager
+from bench_trade_analytics import populate
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def full_read(db_path):
+    """
+    The old way: load whole tables over a normal connection.
+    """
+    import pandas as pd
+
+    conn = sqlite3.connect(db_path)
+    pd.read_sql('SELECT * FROM trades', conn)
+    pd.read_sql('SELECT * FROM strategy1_data', conn)
+    conn.close()
+
+def dashboard_queries(db_path):
+    from config.config import DASHBOARD_PARAMS
+    from dashboard_queries import DashboardQueries
+
+    params = dict(DASHBOARD_PARAMS, ttl={key: 0 for key in DASHBOARD_PARAMS['ttl']})
+    return DashboardQueries(db_path, params)
+
+def dashboard_read(queries):
+    queries.open_positions()
+    queries.pnl()
+    queries.latest_indicators()
+
+def poll_loop(db_path, mode, interval, stop):
+    """
+    Reader process: refresh every `interval` seconds until `stop` is set.
+    """
+    queries = dashboard_queries(db_path) if mode == 'dashboard' else None
+    while not stop.is_set():
+        if queries is not None:
+            dashboard_read(queries)
+        else:
+            full_read(db_path)
+        stop.wait(interval)
+
+def write_loop(seconds):
+    """
+    Trading-thread stand-in: one indicator row and one trade open or close every millisecond.
+    """
+    latencies = []
+    open_ids = []
+    deadline = time.perf_counter() + seconds
+    i = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        db_manager.log_strategy1_data({'ticker': 'BTC-USD', 'timestamp': str(i), 'close': 100.0 + i % 7})
+        if i % 2:
+            db_manager.log_trade_close(open_ids.pop(), 101.0, 0.01, 0.01)
+        else:
+            open_ids.append(db_manager.log_trade_open('BTC-USD', 'benchmark', 'BUY', 100.0, 0.01, str(i)))
+        latencies.append(time.perf_counter() - start)
+        i += 1
+        time.sleep(0.001)
+    return {
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': max(latencies) * 1000
+    }
+
+def run_scenario(db_path, mode, seconds, poll_interval):
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"PRAGMA journal_mode = {'DELETE' if mode == 'full_read' else 'WAL'}")
+    conn.close()
+    if mode is None:
+        return write_loop(seconds)
+    context = multiprocessing.get_context('spawn')
+    stop = context.Event()
+    reader = context.Process(target=poll_loop, args=(db_path, mode, poll_interval, stop), daemon=True)
+    reader.start()
+    time.sleep(2)  # Let the reader start up and make its first (full) load
+    try:
+        return write_loop(seconds)
+    finally:
+        stop.set()
+        reader.join()
+
+def run(rows=200000, seconds=5.0, poll_interval=0.5):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db_manager.DB_PATH = os.path.join(tmp, 'trading_bot.db')
+        db_manager.initialize_db()
+        populate(db_manager.DB_PATH, rows)
+        db_manager.rebuild_daily_pnl()
+
+        start = time.perf_counter()
+        full_read(db_manager.DB_PATH)
+        results['full_read_refresh_ms'] = (time.perf_counter() - start) * 1000
+        queries = dashboard_queries(db_manager.DB_PATH)
+        start = time.perf_counter()
+        dashboard_read(queries)
+        results['dashboard_first_refresh_ms'] = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        dashboard_read(queries)
+        results['dashboard_refresh_ms'] = (time.perf_counter() - start) * 1000
+        queries.close()
+
+        for name, mode in (('no_reader', None), ('full_read', 'full_read'), ('dashboard', 'dashboard')):
+            for stat, value in run_scenario(db_manager.DB_PATH, mode, seconds, poll_interval).items():
+                results[f'write_{name}_{stat}'] = value
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the dashboard queries and their impact on database writes.')
+    parser.add_argument('--rows', type=int, default=200000, help='Trades in the synthetic database.')
+    parser.add_argument('--seconds', type=float, default=5.0, help='Duration of each write scenario.')
+    parser.add_argument('--poll-interval', type=float, default=0.5, help='Seconds between reader refreshes.')
+    args = parser.parse_args()
+    for name, value in run(args.rows, args.seconds, args.poll_interval).items():
+        print(f"{name}: {value:.3f}" if isinstance(value, float) else f"{name}: {value}")
+
+if __name__ == '__main__':
+    main()
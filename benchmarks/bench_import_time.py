@@ -0,0 +1,103 @@
+# bench_import_time.py
+#
+# Measures how long it takes to import modules under src/ in a fresh
+# interpreter with no credentials in the environment, using the cumulative
+# times reported by `python -X importtime`, and checks them against budgets
+# so that eager heavy imports or import-time side effects don't creep back.
+#
+#   python benchmarks/bench_import_time.py
+#   python benchmarks/bench_import_time.py --check   # exit 1 if over budget
+
+import argparse
+import os
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(BASE_DIR, 'src')
+
+# Cumulative import budgets in milliseconds
+BUDGETS_MS = {
+    'config.config': 50,
+    'utils': 150,
+    'trade_executor': 250,
+    'webhook_manager': 250,
+    'indicators': 50,
+    'notifier': 100,
+    'trade_analytics': 150,
+    'reporting': 250
+}
+
+# Settings that must not be needed just to import a module
+CREDENTIAL_VARS = ('COINBASE_API_KEY', 'COINBASE_PRIVATE_KEY', 'EMAIL_ADDRESS', 'EMAIL_PASSWORD', 'PHONE_NUMBER')
+
+def measure(module):
+    """
+    Import `module` in a fresh interpreter and return its cumulative import time.
+
+    :return: tuple (float milliseconds or None, str error output)
+    """
+    env = {key: value for key, value in os.environ.items() if key not in CREDENTIAL_VARS}
+    env['PYTHONPATH'] = os.pathsep.join([BASE_DIR, SRC_DIR])
+    env['PYTHONDONTWRITEBYTECODE'] = '1'
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=BASE_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return None, result.stderr.strip().splitlines()[-1]
+
+    # Lines look like "import time:  self [us] | cumulative | imported package"
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = [field.strip() for field in line[len('import time:'):].split('|')]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1]) / 1000, ''
+    return None, 'module not found in -X importtime output'
+
+def run(modules=None, repeat=3):
+    """
+    Measure each module `repeat` times and keep the fastest run.
+
+    :return: dict of module -> {'ms', 'budget_ms', 'over_budget', 'error'}
+    """
+    results = {}
+    for module in modules or BUDGETS_MS:
+        times, error = [], ''
+        for _ in range(repeat):
+            ms, error = measure(module)
+            if ms is None:
+                break
+            times.append(ms)
+        best = min(times) if times else None
+        budget = BUDGETS_MS.get(module)
+        results[module] = {
+            'ms': best,
+            'budget_ms': budget,
+            'over_budget': best is None or (budget is not None and best > budget),
+            'error': error if best is None else ''
+        }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure import times of the bot modules.')
+    parser.add_argument('modules', nargs='*', help='Modules to measure (default: all budgeted modules).')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--check', action='store_true', help='Exit with status 1 if a module is over budget.')
+    args = parser.parse_args()
+
+    results = run(args.modules, args.repeat)
+    for module, result in results.items():
+        if result['ms'] is None:
+            print(f"{module:<20} FAILED: {result['error']}")
+            continue
+        budget = f"{result['budget_ms']:>6} ms" if result['budget_ms'] is not None else '     -'
+        flag = '  OVER BUDGET' if result['over_budget'] else ''
+        print(f"{module:<20} {result['ms']:8.1f} ms  budget {budget}{flag}")
+
+    if args.check and any(result['over_budget'] for result in results.values()):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+# bench_logging.py
+#
+# Compares the queued logging pipeline (records handed to a background
+# listener thread that writes JSON lines) with the previous setup of a
+# synchronous RotatingFileHandler on the calling thread. Reports the p50/p99
+# latency each call adds on the calling thread, end-to-end throughput until
+# every record is on disk, and the cost of a guarded message whose level is
+# disabled.
+#
+#   python benchmarks/bench_logging.py --records 200000 --threads 4
+
+import argparse
+import logging
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+from logging.handlers import QueueListener, RotatingFileHandler
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.join(BASE_DIR, 'src'))
+
+from config.config import LOGGING_PARAMS
+from logging_setup import JsonFormatter, NonBlockingQueueHandler, set_caller_info
+
+def _logger(name, handler):
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def _drive(logger, records, threads):
+    """
+    Log `records` messages split over `threads` threads.
+
+    :return: tuple (elapsed seconds, list of per-call nanoseconds on the calling threads)
+    """
+    per_thread = records // threads
+    latencies = []
+
+    def work():
+        timings = []
+        for i in range(per_thread):
+            start = time.perf_counter_ns()
+            logger.info("Order %s for %s at %.2f", i, 'BTC-USD', 100.0 + i)
+            timings.append(time.perf_counter_ns() - start)
+        latencies.extend(timings)
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start, latencies
+
+def _summary(elapsed, latencies, records):
+    return {
+        'caller_p50_ns': percentile(latencies, 0.5),
+        'caller_p99_ns': percentile(latencies, 0.99),
+        'records_per_s': records / elapsed
+    }
+
+def run_sync(directory, records, threads):
+    handler = RotatingFileHandler(os.path.join(directory, 'sync.log'), maxBytes=1 << 30)
+    handler.setFormatter(logging.Formatter('%(asctime)s:%(levelname)s:%(message)s'))
+    set_caller_info(True)  # As every record was created before the shared pipeline
+    elapsed, latencies = _drive(_logger('bench_sync', handler), records, threads)
+    handler.close()
+    return _summary(elapsed, latencies, records)
+
+def run_queued(directory, records, threads):
+    handler = RotatingFileHandler(os.path.join(directory, 'queued.jsonl'), maxBytes=1 << 30)
+    handler.setFormatter(JsonFormatter())
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    set_caller_info(LOGGING_PARAMS['caller_info'])
+    start = time.perf_counter()
+    _, latencies = _drive(_logger('bench_queued', NonBlockingQueueHandler(log_queue)), records, threads)
+    listener.stop()  # Returns once every queued record is written
+    elapsed = time.perf_counter() - start
+    set_caller_info(True)
+    handler.close()
+    return _summary(elapsed, latencies, records)
+
+def run_disabled(events):
+    logger = logging.getLogger('bench_disabled')
+    logger.setLevel(logging.WARNING)
+    payload = {'type': 'ticker', 'product_id': 'BTC-USD', 'price': '100.0', 'best_bid': '99.9', 'best_ask': '100.1'}
+
+    def unguarded():
+        for _ in range(events):
+            logger.info(f"Received message: {payload}")
+
+    def guarded():
+        for _ in range(events):
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"Received message: {payload}")
+
+    results = {}
+    for name, func in (('unguarded_disabled_ns', unguarded), ('guarded_disabled_ns', guarded)):
+        start = time.perf_counter()
+        func()
+        results[name] = (time.perf_counter() - start) / events * 1e9
+    return results
+
+def run(records=200000, threads=4):
+    with tempfile.TemporaryDirectory() as directory:
+        sync = run_sync(directory, records, threads)
+        queued = run_queued(directory, records, threads)
+    results = {f'sync_{name}': value for name, value in sync.items()}
+    results.update({f'queued_{name}': value for name, value in queued.items()})
+    results.update(run_disabled(records))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure logging throughput and caller latency.')
+    parser.add_argument('--records', type=int, default=200000)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+    for name, value in run(args.records, args.threads).items():
+        print(f"{name}: {value:.1f}" if isinstance(value, float) else f"{name}: {value}")
+
+if __name__ == '__main__':
+    main()
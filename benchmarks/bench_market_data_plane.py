@@ -0,0 +1,138 @@
+# bench_market_data_plane.py
+#
+# Measures the shared-memory market data plane: ticks published per second by
+# the writer, the latency of latest() and bars() reads, and reader throughput
+# from several worker processes while the writer publishes flat out. For
+# comparison it times shipping the same bars to a worker the old way, as a
+# pickled DataFrame.
+#
+#   python benchmarks/bench_market_data_plane.py --readers 4 --seconds 3
+#   python benchmarks/bench_market_data_plane.py --tickers 200 --bars 1440
+
+import argparse
+import os
+import pickle
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.join(BASE_DIR, 'src'))
+
+import numpy as np
+
+SEGMENT = 'bench_market_data_plane'
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def tickers(count):
+    return [f'T{i:03d}-USD' for i in range(count)]
+
+def read_loop(reader, names, bars, seconds, results):
+    """
+    Worker process: read latest() and bars() round-robin for `seconds`.
+    """
+    reads = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for ticker in names:
+            reader.latest(ticker)
+            reader.bars(ticker, bars)
+            reads += 2
+    results.put((reads, reader.retries))
+
+def run_writer(plane, names, ticks):
+    rng = np.random.default_rng(42)
+    prices = 100 + rng.standard_normal(ticks).cumsum() * 0.01
+    now = time.time()
+    start = time.perf_counter()
+    for i in range(ticks):
+        plane.on_tick(names[i % len(names)], prices[i], 0.01, now + i * 0.01, prices[i] - 0.01, prices[i] + 0.01)
+    return ticks / (time.perf_counter() - start)
+
+def run_reads(reader, names, bars, iterations=2000):
+    latest, window = [], []
+    for i in range(iterations):
+        ticker = names[i % len(names)]
+        start = time.perf_counter()
+        reader.latest(ticker)
+        latest.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        reader.bars(ticker, bars)
+        window.append(time.perf_counter() - start)
+    return {
+        'latest_p50_us': percentile(latest, 0.5) * 1e6,
+        'latest_p99_us': percentile(latest, 0.99) * 1e6,
+        'bars_p50_us': percentile(window, 0.5) * 1e6,
+        'bars_p99_us': percentile(window, 0.99) * 1e6
+    }
+
+def run_pickle(reader, ticker, bars, iterations=500):
+    """
+    Time a DataFrame of the same bars through pickle, as a multiprocessing.Queue would ship it.
+    """
+    df = reader.frame(ticker, limit=bars, include_partial=True)
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        pickle.loads(pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL))
+        timings.append(time.perf_counter() - start)
+    return {'pickle_frame_p50_us': percentile(timings, 0.5) * 1e6}
+
+def run(ticker_count=100, bars=300, readers=2, seconds=2.0):
+    import multiprocessing
+    from market_data_plane import MarketDataReader, MarketDataWriter, spawn_worker
+
+    names = tickers(ticker_count)
+    plane = MarketDataWriter(names, name=SEGMENT, max_tickers=ticker_count, capacity=max(bars, 1440))
+    try:
+        now = int(time.time()) // 60 * 60
+        history = np.arange(now - plane.capacity * 60, now, 60, dtype=np.int64)
+        values = np.full((len(history), 5), 100.0)
+        for ticker in names:
+            plane.load_bars(ticker, history, values)
+
+        results = {'writer_ticks_per_s': run_writer(plane, names, 200000)}
+        reader = MarketDataReader(SEGMENT)
+        results.update(run_reads(reader, names, bars))
+        results.update(run_pickle(reader, names[0], bars))
+        reader.close()
+
+        # Worker processes read while this process keeps publishing
+        queue = multiprocessing.get_context('spawn').Queue()
+        workers = [spawn_worker(read_loop, names, bars, seconds, queue, segment=SEGMENT) for _ in range(readers)]
+        deadline = time.perf_counter() + seconds + 5  # Allow for interpreter start-up in the workers
+        ticks = 0
+        while any(worker.is_alive() for worker in workers) and time.perf_counter() < deadline:
+            run_writer(plane, names, 1000)
+            ticks += 1000
+        reads, retries = 0, 0
+        for _ in workers:
+            worker_reads, worker_retries = queue.get(timeout=10)
+            reads += worker_reads
+            retries += worker_retries
+        for worker in workers:
+            worker.join()
+        results.update({
+            'worker_reads_per_s': reads / seconds,
+            'worker_retry_rate': retries / reads if reads else 0.0,
+            'concurrent_ticks': ticks
+        })
+        return results
+    finally:
+        plane.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the shared-memory market data plane.')
+    parser.add_argument('--tickers', type=int, default=100)
+    parser.add_argument('--bars', type=int, default=300, help='Bars read per bars() call.')
+    parser.add_argument('--readers', type=int, default=2, help='Worker processes reading concurrently.')
+    parser.add_argument('--seconds', type=float, default=2.0, help='How long each worker reads.')
+    args = parser.parse_args()
+    for name, value in run(args.tickers, args.bars, args.readers, args.seconds).items():
+        print(f"{name}: {value:.3f}" if isinstance(value, float) else f"{name}: {value}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+# bench_metrics.py
+#
+# Measures the per-event cost of the metrics instrumentation (counter
+# increments, histogram observations and the timing decorator) against an
+# empty loop, single-threaded and with several threads updating the same
+# metric, and checks it stays under a microsecond per event.
+#
+#   python benchmarks/bench_metrics.py
+#   python benchmarks/bench_metrics.py --check   # exit 1 if over budget
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.join(BASE_DIR, 'src'))
+
+from metrics import MetricsRegistry
+
+BUDGET_NS = 1000
+
+def _per_event_ns(func, events):
+    start = time.perf_counter()
+    func(events)
+    return (time.perf_counter() - start) / events * 1e9
+
+def run(events=1000000, threads=4):
+    registry = MetricsRegistry()
+    count = registry.counter('bench_total', 'Benchmark counter.', ('type',)).labels('ticker')
+    observe = registry.histogram('bench_seconds', 'Benchmark histogram.').labels()
+    timed = registry.histogram('bench_timed_seconds', 'Benchmark timer.').labels()
+
+    @timed.time()
+    def instrumented():
+        pass
+
+    def plain():
+        pass
+
+    def empty_loop(n):
+        for _ in range(n):
+            pass
+
+    def counter_loop(n):
+        inc = count.inc
+        for _ in range(n):
+            inc()
+
+    def histogram_loop(n):
+        record = observe.observe
+        for i in range(n):
+            record(0.0003)
+
+    def plain_call_loop(n):
+        for _ in range(n):
+            plain()
+
+    def timed_call_loop(n):
+        for _ in range(n):
+            instrumented()
+
+    baseline = _per_event_ns(empty_loop, events)
+    call_baseline = _per_event_ns(plain_call_loop, events)
+    results = {
+        'counter_inc_ns': _per_event_ns(counter_loop, events) - baseline,
+        'histogram_observe_ns': _per_event_ns(histogram_loop, events) - baseline,
+        'timed_decorator_ns': _per_event_ns(timed_call_loop, events) - call_baseline
+    }
+
+    # Same histogram updated from several threads at once
+    per_thread = events // threads
+    workers = [threading.Thread(target=histogram_loop, args=(per_thread,)) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    results[f'histogram_observe_{threads}_threads_ns'] = (time.perf_counter() - start) / (per_thread * threads) * 1e9 - baseline
+
+    results['render_ms'] = _per_event_ns(lambda n: [registry.render() for _ in range(n)], 100) / 1e6
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure metrics instrumentation overhead.')
+    parser.add_argument('--events', type=int, default=1000000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--check', action='store_true', help=f'Exit with status 1 if an event costs more than {BUDGET_NS}ns.')
+    args = parser.parse_args()
+
+    results = run(args.events, args.threads)
+    for name, value in results.items():
+        print(f"{name}: {value:.1f}")
+    over = [name for name, value in results.items() if name.endswith('_ns') and value > BUDGET_NS]
+    if over:
+        print(f"Over the {BUDGET_NS}ns budget: {', '.join(over)}")
+        if args.check:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
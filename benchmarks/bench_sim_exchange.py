@@ -0,0 +1,134 @@
+# bench_sim_exchange.py
+#
+# Load tests the order path offline against the simulated exchange. First the
+# matching engine alone (post-only orders placed and cancelled while synthetic
+# candles are replayed through it), then trade_executor.place_order end to end
+# through the shared client, pre-trade gate, metrics, tracing and a temporary
+# database, optionally with injected exchange latency and rejections.
+#
+#   python benchmarks/bench_sim_exchange.py --orders 20000 --threads 4
+#   python benchmarks/bench_sim_exchange.py --latency-ms 20 --reject-rate 0.05
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.join(BASE_DIR, 'src'))
+
+from config.config import SIM_EXCHANGE_PARAMS
+
+TICKERS = ['BTC-USD', 'ETH-USD', 'SOL-USD', 'DOGE-USD', 'LTC-USD', 'XRP-USD', 'ADA-USD', 'AVAX-USD']
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def run_engine(orders, seed=42):
+    """
+    Place `orders` post-only limit orders around the book while the replay moves prices.
+    """
+    from sim_exchange import SimulatedExchange, synthetic_candles
+
+    rng = random.Random(seed)
+    exchange = SimulatedExchange(balances={'USD': 1e12}, latency_ms=0, reject_rate=0, error_rate=0)
+    exchange.load_candles(synthetic_candles(TICKERS, minutes=max(60, orders // 50)))
+    ticks = exchange.replay(speed=0).ticks()
+    for _ in range(len(TICKERS)):
+        next(ticks)
+
+    open_ids = []
+    start = time.perf_counter()
+    for i in range(orders):
+        ticker = rng.choice(TICKERS)
+        book = exchange.get_product_order_book(ticker)
+        bid = float(book['bids'][0][0])
+        order = exchange.place_order(ticker, 'buy', 0.01, price=round(bid * rng.uniform(0.995, 1.0), 8), post_only=True)
+        open_ids.append(order['id'])
+        if i % 4 == 3:
+            next(ticks, None)  # Move the market between orders
+        if i % 10 == 9:
+            order_id = open_ids.pop(rng.randrange(len(open_ids)))
+            if exchange.get_order(order_id)['status'] == 'open':
+                exchange.cancel_order(order_id)
+    elapsed = time.perf_counter() - start
+    return {
+        'engine_orders_per_s': orders / elapsed,
+        'engine_filled': exchange.stats['filled'],
+        'engine_canceled': exchange.stats['canceled'],
+        'engine_ticks': exchange.stats['ticks']
+    }
+
+def run_end_to_end(orders, threads, latency_ms=0.0, reject_rate=0.0, seed=42):
+    """
+    Drive trade_executor.place_order through the simulated exchange from several threads.
+    """
+    SIM_EXCHANGE_PARAMS.update({
+        'enabled': True, 'source': 'synthetic', 'history_minutes': 60, 'replay_minutes': 60,
+        'balances': {'USD': 1e12}, 'latency_ms': latency_ms, 'reject_rate': reject_rate, 'seed': seed
+    })
+    import db_manager
+    import trade_executor
+    from risk_gate import pre_trade_gate
+    from sim_exchange import get_simulated_exchange
+
+    pre_trade_gate.limits.update({
+        'max_orders_per_minute': orders * 2, 'max_open_positions': orders * 2,
+        'max_ticker_notional': float('inf'), 'max_total_notional': float('inf')
+    })
+    exchange = get_simulated_exchange()
+    per_thread = orders // threads
+    latencies, placed = [], []
+
+    def work(worker):
+        rng = random.Random(seed + worker)
+        timings, ok = [], 0
+        for _ in range(per_thread):
+            start = time.perf_counter()
+            order_id = trade_executor.place_order(rng.choice(TICKERS), 'BUY', 0.01, 'benchmark')
+            timings.append(time.perf_counter() - start)
+            ok += order_id is not None
+        latencies.extend(timings)
+        placed.append(ok)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_manager.DB_PATH = os.path.join(tmp, 'trading_bot.db')
+        db_manager.initialize_db()
+        workers = [threading.Thread(target=work, args=(i,)) for i in range(threads)]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+
+    return {
+        'e2e_orders_per_s': per_thread * threads / elapsed,
+        'e2e_p50_ms': percentile(latencies, 0.5) * 1000,
+        'e2e_p99_ms': percentile(latencies, 0.99) * 1000,
+        'e2e_accepted': sum(placed),
+        'e2e_exchange_rejected': exchange.stats['rejected'] + exchange.stats['injected_rejections']
+    }
+
+def run(orders=20000, threads=4, latency_ms=0.0, reject_rate=0.0):
+    results = run_engine(orders)
+    results.update(run_end_to_end(min(orders, 5000), threads, latency_ms, reject_rate))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the order path against the simulated exchange.')
+    parser.add_argument('--orders', type=int, default=20000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Latency injected into every exchange call.')
+    parser.add_argument('--reject-rate', type=float, default=0.0, help='Fraction of orders the exchange rejects.')
+    args = parser.parse_args()
+    for name, value in run(args.orders, args.threads, args.latency_ms, args.reject_rate).items():
+        print(f"{name}: {value:.3f}" if isinstance(value, float) else f"{name}: {value}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+# bench_trade_analytics.py
+#
+# Builds a synthetic trades table (one million rows by default) in a temporary
+# database and compares the SQL aggregation layer against the old approach of
+# loading every trade with get_trades and aggregating in Python.
+#
+#   python benchmarks/bench_trade_analytics.py --rows 1000000
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.join(BASE_DIR, 'src'))
+
+import db_manager
+import trade_analytics
+
+TICKERS = ['BTC-USD', 'ETH-USD', 'SOL-USD', 'DOGE-USD', 'LTC-USD', 'XRP-USD', 'ADA-USD', 'AVAX-USD']
+STRATEGIES = ['strategy1', 'strategy2']
+
+INSERT_TRADE = '''
+    INSERT INTO trades (
+        ticker, strategy, buy_timestamp, buy_price, buy_amount,
+        sell_timestamp, sell_price, sell_amount, profit_loss, order_id, side
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'BUY')
+'''
+
+def populate(db_path, rows, open_fraction=0.001, seed=42):
+    """
+    Fill the trades table with `rows` trades spread over the past year.
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    conn = sqlite3.connect(db_path)
+    batch = []
+    for i in range(rows):
+        buy_time = now - timedelta(seconds=(rows - i) * 365 * 86400 / rows)
+        price = rng.uniform(1, 1000)
+        amount = rng.uniform(0.01, 1)
+        if rng.random() < open_fraction:
+            sell = (None, None, None, None)
+        else:
+            sell_price = price * rng.uniform(0.97, 1.03)
+            sell = (
+                (buy_time + timedelta(hours=rng.uniform(0.1, 8))).isoformat(),
+                sell_price,
+                amount,
+                (sell_price - price) * amount
+            )
+        batch.append((rng.choice(TICKERS), rng.choice(STRATEGIES), buy_time.isoformat(), price, amount) + sell + (str(i),))
+        if len(batch) >= 50000:
+            conn.executemany(INSERT_TRADE, batch)
+            batch = []
+    if batch:
+        conn.executemany(INSERT_TRADE, batch)
+    conn.commit()
+    conn.execute('ANALYZE')
+    conn.close()
+
+def timed(func, repeat=5):
+    """
+    Return the best wall time of `repeat` calls, in milliseconds.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def python_daily_summary(start):
+    trades = db_manager.get_trades('strategy1')
+    closed = [t for t in trades if t['profit_loss'] is not None and t['buy_timestamp'] >= start]
+    wins = sum(1 for t in closed if t['profit_loss'] > 0)
+    return len(closed), sum(t['profit_loss'] for t in closed), wins
+
+def run(rows=1000000):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db_manager.DB_PATH = os.path.join(tmp, 'trading_bot.db')
+        db_manager.initialize_db()
+
+        start = time.perf_counter()
+        populate(db_manager.DB_PATH, rows)
+        results['populate_s'] = time.perf_counter() - start
+
+        now = datetime.utcnow()
+        day_ago = (now - timedelta(hours=24)).isoformat()
+        week_ago = (now - timedelta(days=7)).isoformat()
+
+        results['summary_strategy_24h_ms'] = timed(
+            lambda: trade_analytics.get_trade_summary('strategy1', start=day_ago))
+        results['summary_closed_24h_ms'] = timed(
+            lambda: trade_analytics.get_trade_summary(start=day_ago, by='sell'))
+        results['pnl_by_ticker_7d_ms'] = timed(
+            lambda: trade_analytics.get_pnl_by_ticker('strategy1', start=week_ago))
+        results['pnl_by_strategy_24h_ms'] = timed(
+            lambda: trade_analytics.get_pnl_by_strategy(start=day_ago))
+        results['latest_open_trade_ms'] = timed(
+            lambda: db_manager.get_latest_buy_trade('BTC-USD', 'strategy1'), repeat=50)
+        results['python_aggregation_24h_ms'] = timed(lambda: python_daily_summary(day_ago), repeat=1)
+
+        conn = sqlite3.connect(db_manager.DB_PATH)
+        results['plan_latest_open_trade'] = ' | '.join(row[3] for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM trades WHERE ticker = 'BTC-USD' AND strategy = 'strategy1' "
+            "AND sell_timestamp IS NULL ORDER BY id DESC LIMIT 1"))
+        conn.close()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark SQL-side trade analytics.')
+    parser.add_argument('--rows', type=int, default=1000000)
+    args = parser.parse_args()
+    for name, value in run(args.rows).items():
+        print(f"{name}: {value:.3f}" if isinstance(value, float) else f"{name}: {value}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+# bench_webhook_ingest.py
+#
+# Starts the aiohttp webhook ingestion server on a local ephemeral port with a
+# deliberately slow processing function and drives it with a local load
+# generator, reporting throughput, client-observed latency and the server's
+# own acknowledgement time (body received to response ready), separately from
+# the time handlers spent waiting for request bodies to arrive.
+#
+#   python benchmarks/bench_webhook_ingest.py --requests 20000 --concurrency 64
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.join(BASE_DIR, 'src'))
+
+import aiohttp
+from webhook_ingest import WebhookIngestServer
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+async def generate_load(url, requests, concurrency, duplicate_every):
+    latencies = []
+    counter = iter(range(requests))
+
+    async def client(session):
+        for i in counter:
+            # Every `duplicate_every`-th request redelivers the previous event id
+            event_id = i - 1 if duplicate_every and i % duplicate_every == 0 else i
+            payload = {'id': f'evt-{event_id}', 'type': 'ticker', 'price': '100.0'}
+            start = time.perf_counter()
+            async with session.post(url, json=payload) as response:
+                await response.read()
+            latencies.append(time.perf_counter() - start)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return elapsed, latencies
+
+def run(requests=20000, concurrency=64, process_delay=0.002, duplicate_every=10):
+    def slow_process(data):
+        time.sleep(process_delay)
+
+    server = WebhookIngestServer(slow_process, host='127.0.0.1', port=0, queue_size=requests, workers=8)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    server.ready.wait(10)
+
+    url = f'http://127.0.0.1:{server.port}/webhook'
+    elapsed, latencies = asyncio.run(generate_load(url, requests, concurrency, duplicate_every))
+    stats = server.get_stats()
+    return {
+        'requests_per_s': requests / elapsed,
+        'client_latency_p50_ms': percentile(latencies, 0.5) * 1000,
+        'client_latency_p99_ms': percentile(latencies, 0.99) * 1000,
+        'server_ack_avg_us': stats['avg_ack_us'],
+        'server_body_wait_avg_us': stats['avg_body_wait_us'],
+        'accepted': stats['accepted'],
+        'duplicate': stats['duplicate'],
+        'rejected': stats['rejected'],
+        'processed_during_run': stats['processed'],
+        'queued_after_run': stats['queued']
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the webhook ingestion server.')
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--process-delay', type=float, default=0.002,
+                        help='Seconds the simulated processing function sleeps per event.')
+    args = parser.parse_args()
+    for name, value in run(args.requests, args.concurrency, args.process_delay).items():
+        print(f"{name}: {value:.3f}" if isinstance(value, float) else f"{name}: {value}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,408 @@
+# run_benchmarks.py
+#
+# Offline benchmark suite for the hot paths of the bot: websocket message
+# processing, calculate_indicators against history length and ticker count,
+# insert_data_into_db, trade log/close under concurrent threads, the risk
+# checks against trades-table size, and startup. Market data is synthetic
+# (seeded, so runs are comparable) or recorded, read from the retention
+# archive or the candlesticks tables; nothing touches the network and every
+# database is a temporary file.
+#
+# Results are written as JSON. With --compare, each metric is checked against
+# a stored baseline and the run exits 1 if any got worse by more than the
+# threshold. Metric names carry their unit: *_per_s is better when higher,
+# *_ms/*_us/*_ns/*_s when lower; anything else is informational.
+#
+#   python benchmarks/run_benchmarks.py --output benchmarks/baseline.json
+#   python benchmarks/run_benchmarks.py --compare benchmarks/baseline.json --threshold 0.15
+#   python benchmarks/run_benchmarks.py --only indicators risk_check --data archive
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.join(BASE_DIR, 'src'))
+
+from config.config import LOGGING_PARAMS, SIM_EXCHANGE_PARAMS, TICKERS
+
+# Keep the bot's own logging from dominating the measurements
+LOGGING_PARAMS.update({'level': 'WARNING', 'levels': {}, 'file': None, 'module_files': {}})
+
+SEED = 42
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def best_of(func, repeat=5):
+    """
+    Return the best wall time of `repeat` calls, in seconds.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def load_candles(source, tickers, rows, granularity=900):
+    """
+    Return market data as the bot holds it: ticker -> DataFrame with a UTC timestamp column.
+
+    :param source: str, 'synthetic', 'archive' or 'database'
+    :param rows: int, the number of most recent candles to keep per ticker
+    """
+    import pandas as pd
+    from sim_exchange import archived_candles, database_candles, synthetic_candles
+
+    if source == 'synthetic':
+        candles = synthetic_candles(tickers, minutes=rows, granularity=granularity, seed=SEED)
+    elif source == 'archive':
+        candles = archived_candles(tickers)
+    else:
+        candles = database_candles(tickers)
+    if not candles:
+        raise SystemExit(f"No {source} candles found for {', '.join(tickers)}.")
+
+    frames = {}
+    for ticker, df in candles.items():
+        df = df.tail(rows).reset_index(drop=True)
+        df.insert(0, 'timestamp', pd.to_datetime(df.pop('time'), unit='s', utc=True))
+        frames[ticker] = df
+    return frames
+
+def bench_websocket(source, messages=20000, tickers=None):
+    """
+    Push ticker messages through websocket_client.on_message with history already loaded.
+    """
+    import process_websocket_data
+    import websocket_client
+
+    tickers = tickers or TICKERS
+    frames = load_candles(source, tickers, 300)
+    process_websocket_data.historical_data.clear()
+    process_websocket_data.historical_data.update({ticker: df.copy() for ticker, df in frames.items()})
+    tickers = list(frames)
+
+    start_time = time.time()
+    payloads = []
+    for i in range(messages):
+        ticker = tickers[i % len(tickers)]
+        price = float(frames[ticker]['close'].iloc[-1]) * (1 + (i % 7 - 3) * 1e-4)
+        stamp = datetime.fromtimestamp(start_time + i * 0.01, timezone.utc).isoformat().replace('+00:00', 'Z')
+        payloads.append(json.dumps({
+            'type': 'ticker', 'product_id': ticker, 'price': str(price), 'last_size': '0.01',
+            'best_bid': str(price * 0.9999), 'best_ask': str(price * 1.0001), 'time': stamp
+        }))
+
+    latencies = []
+    start = time.perf_counter()
+    for payload in payloads:
+        call = time.perf_counter()
+        websocket_client.on_message(None, payload)
+        latencies.append(time.perf_counter() - call)
+    elapsed = time.perf_counter() - start
+    return {
+        'messages_per_s': messages / elapsed,
+        'p50_us': percentile(latencies, 0.5) * 1e6,
+        'p99_us': percentile(latencies, 0.99) * 1e6
+    }
+
+def bench_indicators(source, rows=(100, 300, 500, 1000), ticker_counts=(1, 5, len(TICKERS))):
+    """
+    Time calculate_indicators per history length, and across every ticker for each ticker count.
+    """
+    from indicators import calculate_indicators
+
+    frames = load_candles(source, TICKERS, max(rows))
+    tickers = list(frames)
+    calculate_indicators(frames[tickers[0]].copy())  # Import ta outside the timings
+
+    results = {}
+    for length in rows:
+        df = frames[tickers[0]].tail(length).reset_index(drop=True)
+        results[f'rows_{length}_ms'] = best_of(lambda: calculate_indicators(df.copy())) * 1000
+    for count in ticker_counts:
+        subset = [frames[ticker].tail(300).reset_index(drop=True) for ticker in tickers[:count]]
+        results[f'tickers_{count}_ms'] = best_of(lambda: [calculate_indicators(df.copy()) for df in subset]) * 1000
+    return results
+
+def bench_insert_candles(source, sizes=(100, 1000)):
+    """
+    Measure data_fetcher.insert_data_into_db throughput into a fresh database.
+
+    Every run writes a table of its own, so each one times inserts rather than
+    INSERT OR REPLACE overwriting the previous run's rows. insert_data_into_db
+    logs and swallows errors, so the rows are counted after each run and a
+    short count fails the benchmark instead of reading as a fast insert.
+    """
+    import data_fetcher
+
+    frames = load_candles(source, TICKERS[:1], max(sizes), granularity=60)
+    df = next(iter(frames.values()))
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        data_fetcher.DB_FILE = os.path.join(tmp, 'candles.db')
+        for size in sizes:
+            batch = df.tail(size)
+            best = float('inf')
+            for run in range(3):
+                ticker = f'BENCH-{size}-{run}'
+                start = time.perf_counter()
+                data_fetcher.insert_data_into_db(ticker, batch)
+                best = min(best, time.perf_counter() - start)
+                stored = _count_rows(data_fetcher.DB_FILE, f"candlesticks_{ticker.replace('-', '_')}")
+                if stored != len(batch):
+                    raise RuntimeError(f"insert_data_into_db stored {stored} of {len(batch)} rows for {ticker}")
+            results[f'rows_{size}_per_s'] = len(batch) / best
+    return results
+
+def _count_rows(db_path, table):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+    except sqlite3.OperationalError:
+        return 0  # The table was never created
+    finally:
+        conn.close()
+
+def bench_trade_log_close(trades=2000, thread_counts=(1, 4, 8)):
+    """
+    Open and close trades through db_manager from several threads at once.
+    """
+    import db_manager
+
+    results = {}
+    for threads in thread_counts:
+        per_thread = trades // threads
+        open_latencies, close_latencies = [], []
+
+        def work(worker):
+            opens, closes = [], []
+            for i in range(per_thread):
+                start = time.perf_counter()
+                trade_id = db_manager.log_trade_open(TICKERS[i % len(TICKERS)], 'benchmark', 'BUY', 100.0, 0.01,
+                                                     f'bench-{worker}-{i}')
+                opens.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                db_manager.log_trade_close(trade_id, 101.0, 0.01, 0.01)
+                closes.append(time.perf_counter() - start)
+            open_latencies.extend(opens)
+            close_latencies.extend(closes)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            db_manager.DB_PATH = os.path.join(tmp, 'trading_bot.db')
+            db_manager.initialize_db()
+            workers = [threading.Thread(target=work, args=(i,)) for i in range(threads)]
+            start = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - start
+
+        results[f'threads_{threads}_trades_per_s'] = per_thread * threads / elapsed
+        results[f'threads_{threads}_open_p50_ms'] = percentile(open_latencies, 0.5) * 1000
+        results[f'threads_{threads}_open_p99_ms'] = percentile(open_latencies, 0.99) * 1000
+        results[f'threads_{threads}_close_p50_ms'] = percentile(close_latencies, 0.5) * 1000
+        results[f'threads_{threads}_close_p99_ms'] = percentile(close_latencies, 0.99) * 1000
+    return results
+
+def bench_risk_check(table_sizes=(1000, 10000, 100000), checks=10000):
+    """
+    Time loading risk state and the per-order checks against trades tables of growing size.
+    """
+    import db_manager
+    from bench_trade_analytics import populate
+    from risk_gate import pre_trade_gate
+    from risk_manager import initialize_risk_state, risk_engine
+
+    pre_trade_gate.limits.update({
+        'max_orders_per_minute': checks * 2, 'max_open_positions': checks * 2,
+        'max_ticker_notional': float('inf'), 'max_total_notional': float('inf')
+    })
+    results = {}
+    for rows in table_sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_manager.DB_PATH = os.path.join(tmp, 'trading_bot.db')
+            db_manager.initialize_db()
+            populate(db_manager.DB_PATH, rows, seed=SEED)
+            results[f'rows_{rows}_load_state_ms'] = best_of(
+                lambda: (initialize_risk_state(), pre_trade_gate.rebuild()), repeat=3) * 1000
+
+            start = time.perf_counter()
+            for i in range(checks):
+                strategy = 'strategy1' if i % 2 else 'strategy2'
+                risk_engine.consecutive_losses(strategy)
+                risk_engine.net_pnl_24h(strategy)
+            results[f'rows_{rows}_engine_check_us'] = (time.perf_counter() - start) / checks * 1e6
+
+            start = time.perf_counter()
+            for i in range(checks):
+                pre_trade_gate.check(TICKERS[i % len(TICKERS)], 'SELL', 0.01, 100.0, 'strategy1')
+            results[f'rows_{rows}_gate_check_us'] = (time.perf_counter() - start) / checks * 1e6
+    return results
+
+def bench_startup(source):
+    """
+    Time the storage and history startup steps, cold and from a market snapshot.
+
+    History comes from the simulated exchange, so the fetch cost is the bot's own
+    handling of the responses rather than network time.
+    """
+    SIM_EXCHANGE_PARAMS.update({'enabled': True, 'source': source, 'seed': SEED, 'latency_ms': 0,
+                                'latency_jitter_ms': 0, 'reject_rate': 0, 'error_rate': 0})
+    import db_manager
+    from market_snapshot import save_snapshot, warm_start
+    from process_websocket_data import historical_data
+    from risk_gate import pre_trade_gate
+    from risk_manager import initialize_risk_state
+    from startup import StartupOrchestrator
+
+    def initialize_storage():
+        db_manager.initialize_db()
+        initialize_risk_state()
+        pre_trade_gate.rebuild()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db_manager.DB_PATH = os.path.join(tmp, 'trading_bot.db')
+        snapshot = os.path.join(tmp, 'market_snapshot.bin')
+        for phase in ('cold', 'warm'):
+            historical_data.clear()
+            startup = StartupOrchestrator()
+            startup.add('db', initialize_storage)
+            startup.add('history', lambda: warm_start(path=snapshot))
+            start = time.perf_counter()
+            if not startup.run():
+                raise RuntimeError(startup.report())
+            results[f'{phase}_total_s'] = time.perf_counter() - start
+            for name, timing in startup.timings().items():
+                results[f'{phase}_{name}_s'] = timing['duration']
+            save_snapshot(snapshot)
+
+    from bench_import_time import measure
+
+    for module in ('trade_executor', 'indicators'):
+        milliseconds, _ = measure(module)
+        if milliseconds is not None:
+            results[f'import_{module}_ms'] = milliseconds
+    return results
+
+BENCHMARKS = {
+    'websocket': lambda args: bench_websocket(args.data, args.messages),
+    'indicators': lambda args: bench_indicators(args.data),
+    'insert_candles': lambda args: bench_insert_candles(args.data),
+    'trade_log_close': lambda args: bench_trade_log_close(args.trades),
+    'risk_check': lambda args: bench_risk_check(args.table_sizes),
+    'startup': lambda args: bench_startup(args.data)
+}
+
+def run(args):
+    results = {}
+    for name in args.only or BENCHMARKS:
+        start = time.perf_counter()
+        results[name] = BENCHMARKS[name](args)
+        print(f"{name}: done in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return results
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BASE_DIR, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _direction(metric):
+    """
+    Return 1 if higher is better for `metric`, -1 if lower is better, 0 if it is not compared.
+    """
+    if metric.endswith('_per_s'):
+        return 1
+    if metric.endswith(('_ms', '_us', '_ns', '_s')):
+        return -1
+    return 0
+
+def compare(results, baseline, threshold):
+    """
+    Compare results with a baseline run.
+
+    :param results: dict of benchmark -> metric -> value
+    :param baseline: dict in the same shape
+    :param threshold: float, relative change beyond which a worse metric is a regression
+    :return: tuple (list of report lines, list of regressed 'benchmark.metric' names)
+    """
+    lines, regressions = [], []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            direction = _direction(metric)
+            previous = baseline.get(name, {}).get(metric)
+            if not direction or not previous or value is None:
+                continue
+            change = (value - previous) / previous
+            worse = -change * direction > threshold
+            if worse:
+                regressions.append(f'{name}.{metric}')
+            lines.append(f"{'REGRESSION' if worse else '':<12}{name + '.' + metric:<48}"
+                         f"{previous:>14.3f}{value:>14.3f}{change:>+9.1%}")
+    return lines, regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the offline benchmark suite and compare with a baseline.')
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help='Benchmarks to run (default: all).')
+    parser.add_argument('--data', choices=['synthetic', 'archive', 'database'], default='synthetic',
+                        help='Market data source: seeded synthetic candles or recorded candles.')
+    parser.add_argument('--messages', type=int, default=20000, help='Websocket messages to process.')
+    parser.add_argument('--trades', type=int, default=2000, help='Trades opened and closed per thread count.')
+    parser.add_argument('--table-sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='Trades-table sizes for the risk checks.')
+    parser.add_argument('--output', help='Write the results JSON here instead of stdout.')
+    parser.add_argument('--compare', metavar='BASELINE', help='Baseline JSON to check for regressions.')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Relative slowdown that counts as a regression (default 0.10).')
+    args = parser.parse_args()
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'commit': _git_commit(),
+            'args': vars(args)
+        },
+        'results': run(args)
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        lines, regressions = compare(report['results'], baseline['results'], args.threshold)
+        print(f"{'':<12}{'metric':<48}{'baseline':>14}{'current':>14}{'change':>9}", file=sys.stderr)
+        for line in lines:
+            print(line, file=sys.stderr)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%} against {args.compare} "
+                  f"(commit {baseline['meta'].get('commit')}).", file=sys.stderr)
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%}.", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
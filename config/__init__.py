@@ -1 +1,6 @@
-from .config import COINBASE_API_KEY, COINBASE_PRIVATE_KEY, SANDBOX_MODE
+def __getattr__(name):
+    # Resolved lazily so importing the package does not load the .env file
+    if name in ('COINBASE_API_KEY', 'COINBASE_PRIVATE_KEY', 'SANDBOX_MODE'):
+        from . import config
+        return getattr(config, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,72 +1,103 @@
 # config.py
 
 import os
-from dotenv import load_dotenv
+import threading
 import logging
 
-# Set up logging
+# Set up logging; handlers are installed by src/logging_setup.py
 logger = logging.getLogger('config')
-logger.setLevel(logging.INFO)
-handler = logging.StreamHandler()
-formatter = logging.Formatter('%(asctime)s:%(levelname)s:%(message)s')
-handler.setFormatter(formatter)
-if not logger.handlers:
-  logger.addHandler(handler)
 
 # Define the base directory
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# Load .env file
+# .env file, loaded on first access to an environment setting
 DOTENV_PATH = os.path.join(BASE_DIR, '..', '.env')
-logger.info(f"Loading .env file from: {DOTENV_PATH}")
-load_dotenv(dotenv_path=DOTENV_PATH)
 
-# Fetch environment variables
-COINBASE_API_KEY = os.getenv('COINBASE_API_KEY')
-COINBASE_PRIVATE_KEY = os.getenv('COINBASE_PRIVATE_KEY')  # Updated
-SANDBOX_MODE = os.getenv('SANDBOX_MODE', 'True').lower() == 'true'
-EMAIL_ADDRESS = os.getenv('EMAIL_ADDRESS')
-EMAIL_PASSWORD = os.getenv('EMAIL_PASSWORD')
-TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
-TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
-TWILIO_PHONE_NUMBER = os.getenv('TWILIO_PHONE_NUMBER')
-PHONE_NUMBER = os.getenv('PHONE_NUMBER')
-PHONE_NUMBER = os.getenv('PHONE_NUMBER')
+# Environment variables the bot cannot run without; checked by Settings.validate()
+REQUIRED_SETTINGS = [
+  'COINBASE_API_KEY', 'COINBASE_PRIVATE_KEY', 'EMAIL_ADDRESS', 'EMAIL_PASSWORD', 'PHONE_NUMBER'
+]
+
+class Settings:
+  """
+  Settings read from the environment and the .env file.
+
+  Importing this module does not touch the environment; the .env file is
+  loaded the first time get_settings() (or a module attribute such as
+  config.COINBASE_API_KEY) is accessed, and missing variables are only an
+  error when validate() is called, so scripts that need no credentials can
+  import anything under src/.
+  """
+
+  def __init__(self):
+    from dotenv import load_dotenv
+    logger.info(f"Loading .env file from: {DOTENV_PATH}")
+    load_dotenv(dotenv_path=DOTENV_PATH)
+
+    self.COINBASE_API_KEY = os.getenv('COINBASE_API_KEY')
+    self.COINBASE_PRIVATE_KEY = os.getenv('COINBASE_PRIVATE_KEY')
+    self.SANDBOX_MODE = os.getenv('SANDBOX_MODE', 'True').lower() == 'true'
+    self.EMAIL_ADDRESS = os.getenv('EMAIL_ADDRESS')
+    self.EMAIL_PASSWORD = os.getenv('EMAIL_PASSWORD')
+    self.TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
+    self.TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
+    self.TWILIO_PHONE_NUMBER = os.getenv('TWILIO_PHONE_NUMBER')
+    self.PHONE_NUMBER = os.getenv('PHONE_NUMBER')
+    self.SMTP_HOST = os.getenv('SMTP_HOST', 'smtp.gmail.com')
+    self.SMTP_PORT = int(os.getenv('SMTP_PORT', '587'))
+    self.SMTP_STARTTLS = os.getenv('SMTP_STARTTLS', 'True').lower() == 'true'
+    self.WEBHOOK_SERVER_MODE = os.getenv('WEBHOOK_SERVER_MODE', 'async')
+
+  def missing(self):
+    return [name for name in REQUIRED_SETTINGS if not getattr(self, name)]
+
+  def validate(self):
+    """
+    Log which settings were loaded and raise ValueError if a required one is missing.
+    """
+    for name in REQUIRED_SETTINGS:
+      logger.info(f"{name}: {'Loaded' if getattr(self, name) else 'Missing'}")
+    logger.info(f"SANDBOX_MODE: {self.SANDBOX_MODE}")
 
+    missing_vars = self.missing()
+    if missing_vars:
+      for var in missing_vars:
+          logger.error(f"{var} is missing in the environment variables.")
+      raise ValueError("Missing one or more required environment variables.")
+    logger.info("All required environment variables loaded successfully.")
 
+_settings = None
+_settings_lock = threading.Lock()
+
+def get_settings():
+  """
+  Return the process-wide Settings, loading them on first use.
+  """
+  global _settings
+  if _settings is None:
+    with _settings_lock:
+      if _settings is None:
+        _settings = Settings()
+  return _settings
+
+# Module attributes served lazily from Settings by __getattr__ below
+_ENV_SETTINGS = frozenset([
+  'COINBASE_API_KEY', 'COINBASE_PRIVATE_KEY', 'SANDBOX_MODE', 'EMAIL_ADDRESS', 'EMAIL_PASSWORD',
+  'TWILIO_ACCOUNT_SID', 'TWILIO_AUTH_TOKEN', 'TWILIO_PHONE_NUMBER', 'PHONE_NUMBER',
+  'SMTP_HOST', 'SMTP_PORT', 'SMTP_STARTTLS', 'WEBHOOK_SERVER_MODE'
+])
+
+def __getattr__(name):
+  # Keeps `from config.config import SANDBOX_MODE` style imports working; the
+  # environment is read at that point rather than when config is imported.
+  if name in _ENV_SETTINGS:
+    return getattr(get_settings(), name)
+  raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Database file path
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DB_FILE = os.path.join(BASE_DIR, 'data', 'trading_bot.db')  # Adjust the path as needed
 
-# Log environment variables
-logger.info(f"COINBASE_API_KEY: {'Loaded' if COINBASE_API_KEY else 'Missing'}")
-logger.info(f"COINBASE_PRIVATE_KEY: {'Loaded' if COINBASE_PRIVATE_KEY else 'Missing'}")  # Updated
-logger.info(f"SANDBOX_MODE: {SANDBOX_MODE}")
-logger.info(f"EMAIL_ADDRESS: {'Loaded' if EMAIL_ADDRESS else 'Missing'}")
-logger.info(f"EMAIL_PASSWORD: {'Loaded' if EMAIL_PASSWORD else 'Missing'}")
-logger.info(f"PHONE_NUMBER: {'Loaded' if PHONE_NUMBER else 'Missing'}")
-
-# Validate environment variables
-missing_vars = []
-if not COINBASE_API_KEY:
-  missing_vars.append('COINBASE_API_KEY')
-if not COINBASE_PRIVATE_KEY:  # Updated
-  missing_vars.append('COINBASE_PRIVATE_KEY')
-if not EMAIL_ADDRESS:
-  missing_vars.append('EMAIL_ADDRESS')
-if not EMAIL_PASSWORD:
-  missing_vars.append('EMAIL_PASSWORD')
-if not PHONE_NUMBER:
-  missing_vars.append('PHONE_NUMBER')
-
-if missing_vars:
-  for var in missing_vars:
-      logger.error(f"{var} is missing in the environment variables.")
-  raise ValueError("Missing one or more required environment variables.")
-else:
-  logger.info("All required environment variables loaded successfully.")
-
 # Strategy 1 Configuration
 STRATEGY_1 = {
   'stochastic_levels': {
@@ -97,6 +128,13 @@ STRATEGY_2 = {
   'sell_after_candles': 8  # Sell after 8th 1-hour candle
 }
 
+# Strategy 2 capture (see src/strategy2_capture.py). When enabled, the rows
+# Strategy 2 logs through strategy2_capture are buffered and written once per
+# ticker and hour at hour close instead of inserted and updated per checkpoint.
+STRATEGY2_CAPTURE_PARAMS = {
+    'enabled': False
+}
+
 # Scenario configuration ('A' or 'B') - A immediate, B starts on the hour.
 SCENARIO = 'A'  # Change to 'B' as needed
 
@@ -120,6 +158,7 @@ BUY_AMOUNTS = {
     'SUI-USD': 10,       # Amount in USD
     'XLM-USD': 10,       # Amount in USD
     'ADA-USD': 10,       # Amount in USD
+    'LINK-USD': 10,       # Amount in USD
     'AVAX-USD': 10     # Amount in USD
 }
 
@@ -132,4 +171,254 @@ MAX_NET_LOSS_24H = 150  # Default to $150
 RISK_MANAGEMENT_PARAMS = {
     'MAX_CONSECUTIVE_LOSSES': MAX_CONSECUTIVE_LOSSES,
     'MAX_NET_LOSS_24H': MAX_NET_LOSS_24H
-}
\ No newline at end of file
+}
+# Notification dispatcher settings (SMTP host, port and STARTTLS come from Settings)
+NOTIFICATION_PARAMS = {
+    'smtp_idle_timeout': 240,  # Seconds before an idle SMTP session is closed and reopened
+    'queue_size': 1000,  # Pending notifications before new ones are dropped
+    'coalesce_window': 10.0,  # Seconds to gather a burst into a single digest message
+    'rate_limits': {  # Messages per minute per channel
+        'email': 10,
+        'sms': 2
+    },
+    'max_retries': 5,
+    'initial_backoff': 1  # Seconds, doubled after every failed attempt
+}
+
+# Pre-trade risk gate limits, checked in trade_executor.place_order before an order is sent
+PRE_TRADE_RISK_PARAMS = {
+    'max_ticker_notional': 50,  # Max open buy notional per ticker, in USD
+    'max_total_notional': 300,  # Max open buy notional across all tickers, in USD
+    'max_open_positions': 15,
+    'max_orders_per_minute': 30
+}
+
+# Webhook server settings. Settings.WEBHOOK_SERVER_MODE selects 'async' (aiohttp
+# ingestion server) or 'flask' (Flask development server).
+WEBHOOK_SERVER_PARAMS = {
+    'host': '0.0.0.0',
+    'port': 5000,
+    'queue_size': 10000,  # Accepted events waiting for a worker before new ones get 503
+    'workers': 4,
+    'dedupe_ttl': 600,  # Seconds an event id is remembered to drop redeliveries
+    'max_body_bytes': 1024 * 1024
+}
+
+# Scheduler settings
+SCHEDULER_PARAMS = {
+    'workers': 4,  # Threads executing scheduled jobs
+    'bar_settle_delay': 5,  # Seconds after a candle closes before bar-close jobs run
+    'lag_warning': 1.0  # Log a warning when a job starts more than this many seconds late
+}
+
+# Startup settings
+STARTUP_PARAMS = {
+    'history_workers': 8,  # Parallel REST requests when warming up price history
+    'component_timeout': 60,  # Seconds a component may wait for a prerequisite or for its own readiness
+    # Start the websocket feed from main. Off by default, as before: the strategies
+    # may run websocket_client.run_websocket themselves, and two feeds would process
+    # every tick twice. Turn on only if nothing else opens the feed.
+    'start_websocket': False
+}
+
+# Market data snapshot settings for warm restarts
+SNAPSHOT_PARAMS = {
+    'path': os.path.join(BASE_DIR, 'data', 'market_snapshot.bin'),
+    'interval': 300,  # Seconds between periodic snapshots
+    'max_age': 24 * 60 * 60  # Snapshots older than this are ignored and history is refetched
+}
+
+# Exchange REST client settings (see client_registry)
+CLIENT_PARAMS = {
+    'pool_maxsize': 16,  # Keep-alive connections kept open per host
+    'timeout': 10  # Seconds before a REST request is abandoned
+}
+
+# Candle resampler settings. A 1-minute base series is kept per ticker and the
+# other timeframes are aggregated from it.
+RESAMPLER_PARAMS = {
+    'timeframes': [5, 15, 60],  # Minutes; bars kept up to date incrementally
+    'checkpoint_minutes': [checkpoint['minute'] for checkpoint in STRATEGY_2['checkpoints']],
+    'history_minutes': 300 * 15,  # 1-minute bars fetched per ticker at startup; covers 300 15-minute bars
+    'max_base_bars': 7 * 24 * 60  # 1-minute bars kept in memory per ticker
+}
+
+# Columnar archive of data older than the hot window kept in SQLite (see RETENTION_PARAMS)
+ARCHIVE_PARAMS = {
+    'path': os.path.join(BASE_DIR, 'data', 'archive'),
+    'compression': 'zstd',
+    'compression_level': 3
+}
+
+# Retention of the live database. Rows older than max_age_hours are removed in
+# chunks of chunk_rows, each in its own short transaction; tables with an
+# 'archive' dataset are copied to the Parquet archive first. Table names may be
+# glob patterns.
+RETENTION_PARAMS = {
+    'chunk_rows': 5000,
+    'chunk_pause': 0.05,  # Seconds between chunks so other writers can take the lock
+    'vacuum_pages': 0,  # Free pages returned per incremental vacuum; 0 returns all of them
+    'tables': {
+        'candlesticks_*': {'timestamp': 'timestamp', 'max_age_hours': 24, 'archive': 'candles'},
+        'strategy1_data': {'timestamp': 'timestamp', 'max_age_hours': 30 * 24, 'archive': 'strategy1_data'},
+        'strategy2_data': {'timestamp': 'timestamp', 'max_age_hours': 30 * 24, 'archive': 'strategy2_data'},
+        'strategy2_checkpoints': {'timestamp': 'hour', 'max_age_hours': 30 * 24, 'archive': 'strategy2_checkpoints'},
+        'errors': {'timestamp': 'timestamp', 'max_age_hours': 14 * 24, 'archive': None},
+        'retention_runs': {'timestamp': 'started_at', 'max_age_hours': 365 * 24, 'archive': None}
+    }
+}
+
+# In-process metrics, served in Prometheus text format on http://host:port/metrics
+METRICS_PARAMS = {
+    'host': '127.0.0.1',
+    'port': 9108,
+    'buckets': [  # Default histogram bucket upper bounds, in seconds
+        0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+        0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+    ]
+}
+
+# Tick-to-order latency tracing (see src/tracing.py)
+TRACING_PARAMS = {
+    'enabled': True,
+    'capacity': 65536,  # Spans kept in the ring buffer
+    'max_handoff_age': 60,  # Seconds a tick trace can be picked up by another thread for its ticker
+    'report_interval': 3600  # Seconds between logged per-stage latency reports
+}
+
+# Logging: records from every module are queued to one background listener
+# thread that writes JSON lines (see src/logging_setup.py)
+LOGGING_PARAMS = {
+    'level': 'INFO',  # Default level for every logger
+    'levels': {  # Per-logger overrides
+        'websocket_client': 'WARNING',
+        'websocket_data_processor': 'WARNING',
+        'indicators': 'INFO',  # DEBUG dumps indicator frames on every calculation
+        'urllib3': 'WARNING',
+        'websocket': 'WARNING'
+    },
+    'console': True,
+    'console_format': 'text',  # 'text' or 'json'
+    'caller_info': False,  # Collect file/line/process details for each record; no output uses them
+    'file': 'logs/trading_bot.jsonl',  # Every record, relative to the repository root
+    'module_files': {  # Additional per-logger files
+        'main': 'logs/main.log',
+        'db_manager': 'logs/db_manager.log',
+        'risk_manager': 'logs/risk_manager.log',
+        'notifier': 'logs/notifier.log'
+    },
+    'max_bytes': 5 * 1024 * 1024,
+    'backup_count': 5
+}
+
+# Simulated exchange for paper trading, replays and load tests (see src/sim_exchange.py).
+# When enabled, the shared exchange client, candle downloads and the ticker
+# websocket all use the simulator instead of Coinbase.
+SIM_EXCHANGE_PARAMS = {
+    'enabled': False,
+    'source': 'synthetic',  # Market data to replay: 'synthetic', 'archive' or 'database'
+    'history_minutes': 3 * 24 * 60,  # Candles before the replay start, served as history
+    'replay_minutes': 24 * 60,  # Synthetic candles replayed as live ticks
+    'granularity': 60,  # Seconds per base candle
+    'replay_speed': 1.0,  # Simulated seconds per wall second; 0 replays as fast as possible
+    'balances': {'USD': 10000.0},
+    'spread_bps': 2.0,
+    'depth': 10,  # Levels returned for order book level 2
+    'book_size': 1000.0,  # Size shown at each level
+    'maker_fee': 0.004,
+    'taker_fee': 0.006,
+    'latency_ms': 0.0,  # Added to every call
+    'latency_jitter_ms': 0.0,
+    'reject_rate': 0.0,  # Probability an order is rejected
+    'error_rate': 0.0,  # Probability any call fails as if the exchange were unavailable
+    'seed': 0
+}
+
+# On-demand sampling profiler (see src/profiler.py). `kill -USR1 <pid>` or
+# GET http://host:port/profile?seconds=N samples every thread and writes
+# flamegraph-ready collapsed stacks to output_dir.
+PROFILER_PARAMS = {
+    'enabled': True,
+    'signal': 'SIGUSR1',
+    'host': '127.0.0.1',  # Keep local: stacks reveal the bot's internals
+    'port': 9109,
+    'duration': 30,  # Seconds sampled by default
+    'max_duration': 300,
+    'interval': 0.01,  # Seconds between samples
+    'include_idle': False,  # Keep samples of threads blocked in waits and sleeps
+    'output_dir': os.path.join(BASE_DIR, 'profiles')
+}
+
+# Sharded websocket subscriptions (see src/websocket_shards.py). When enabled,
+# TICKERS are spread over several connections by expected message rate and
+# processed by a pool of workers with per-product ordering.
+WEBSOCKET_SHARD_PARAMS = {
+    'enabled': False,
+    'max_connections': 8,
+    'max_products_per_connection': 100,
+    'max_rate_per_connection': 200.0,  # Messages per second one connection should carry
+    'default_rate': 1.0,  # Expected messages per second for a product not yet measured
+    'workers': 4,  # Threads running the message handler
+    'batch': 32,  # Messages a worker handles for one product before letting others run
+    'max_pending': 1000,  # Queued messages per product before the oldest are dropped
+    'rebalance_interval': 30,  # Seconds between rate measurements and rebalancing
+    'max_lag': 2.0,  # Seconds a connection may fall behind before products are moved off it
+    'rate_smoothing': 0.5,  # Weight of the latest measured rate in the estimate
+    'reconnect_backoff': 1,
+    'max_reconnect_backoff': 60
+}
+
+# Dynamic trading universe (see src/universe.py). When enabled, TICKERS is
+# replaced at startup and every refresh_interval by the pinned tickers plus the
+# best-ranked products by 24h volume and volatility. TICKERS is what gets
+# history and subscriptions; strategies evaluate only the screened candidates
+# (universe.strategy_tickers() and universe.indicators_for()).
+UNIVERSE_PARAMS = {
+    'enabled': False,
+    'quote_currency': 'USD',
+    'refresh_interval': 3600,  # Seconds between product/stats reloads
+    'max_products': 100,  # Products watched, including pinned ones
+    'min_volume_usd': 1000000,  # 24h volume in quote currency
+    'min_volatility': 0.0,  # 24h (high - low) / last
+    'volume_weight': 0.7,  # Weight of volume vs volatility in the ranking score
+    'exclude': ['USDT-USD', 'USDC-USD', 'DAI-USD', 'PYUSD-USD', 'EURC-USD'],  # Stablecoins
+    'pinned': list(TICKERS),  # Always watched
+    'default_buy_amount': 10,  # USD bought for tickers not listed in BUY_AMOUNTS
+    'screen': {  # Cheap pre-filter run before the full indicator pipeline
+        'bars': 32,  # Recent 15-minute bars screened per ticker
+        'recent_bars': 4,  # Bars compared with the window average volume
+        'min_range_pct': 0.002,  # Average (high - low) / close per bar
+        'min_momentum': 0.01,  # Absolute return over the window
+        'min_volume_ratio': 1.5,
+        'max_candidates': 10,
+        'settle_delay': 5  # Seconds after a 15-minute close before screening
+    }
+}
+
+# Shared-memory market data plane (see src/market_data_plane.py). When enabled,
+# the websocket process publishes latest prices and 1-minute bars to a shared
+# segment that strategy worker processes read without pickling DataFrames.
+MARKET_DATA_PLANE_PARAMS = {
+    'enabled': False,
+    'name': 'trading_bot_market_data',  # Shared memory segment name (/dev/shm on Linux)
+    'max_tickers': 512,  # Fixed at creation; ~36 MB with the default capacity
+    'capacity': 1440,  # 1-minute bars kept per ticker (one day)
+    'read_retries': 10000  # Attempts at a consistent read before giving up
+}
+
+# Performance dashboard (see src/dashboard.py; run with `streamlit run src/dashboard.py`).
+# It reads the database through a read-only connection, polls only rows added
+# since the last refresh and caches each query for its TTL in seconds.
+DASHBOARD_PARAMS = {
+    'refresh_interval': 5,  # Seconds between page refreshes
+    'ttl': {
+        'trades': 5,
+        'pnl': 15,
+        'indicators': 5,
+        'metrics': 5
+    },
+    'trade_rows': 500,  # Most recent trades loaded on the first poll (open ones always are)
+    'indicator_rows': 2000,  # Most recent strategy1_data rows kept in memory
+    'busy_timeout_ms': 100,  # Give up on a locked read quickly and serve the cached result
+    'metrics_url': f"http://{METRICS_PARAMS['host']}:{METRICS_PARAMS['port']}/metrics"
+}
@@ -0,0 +1,204 @@
+# archive.py
+
+import argparse
+import os
+import sys
+import uuid
+import pandas as pd
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import ARCHIVE_PARAMS
+from logging_setup import get_logger
+
+# Configure logging
+logger = get_logger('archive')
+
+# Archive layout: <path>/<dataset>/ticker=<ticker>/date=<YYYY-MM-DD>/part-*.parquet,
+# where the dataset is 'candles' for the candlesticks_* tables and the table
+# name for the capture tables. Timestamps are stored as UTC timestamps.
+
+def _dataset_dir(dataset, root=None):
+    return os.path.join(root or ARCHIVE_PARAMS['path'], dataset)
+
+def _affinity_type(declared):
+    """
+    Map a SQLite declared column type to an Arrow type, following SQLite's affinity rules.
+    """
+    import pyarrow as pa
+
+    declared = (declared or '').upper()
+    if 'INT' in declared:
+        return pa.int64()
+    if any(name in declared for name in ('CHAR', 'CLOB', 'TEXT')):
+        return pa.string()
+    return pa.float64()  # REAL, FLOAT, DOUBLE, NUMERIC and untyped columns
+
+def _schema(df, column_types=None):
+    """
+    Build the Arrow schema for a chunk from the SQLite column types.
+
+    Inferring it from each chunk would type a column that is NULL throughout
+    the chunk (e.g. one added by a later ALTER TABLE) as null, and files with
+    values in that column could then not be read in the same dataset.
+
+    :param column_types: dict of column name -> SQLite declared type; columns
+                         not listed are inferred, with all-NULL ones stored as float64
+    """
+    import pyarrow as pa
+
+    fields = []
+    for column in df.columns:
+        if column == 'timestamp':
+            arrow_type = pa.timestamp('ns', 'UTC')
+        elif column in ('ticker', 'date'):
+            arrow_type = pa.string()
+        elif column_types and column in column_types:
+            arrow_type = _affinity_type(column_types[column])
+        else:
+            arrow_type = pa.array(df[column], from_pandas=True).type
+            if pa.types.is_null(arrow_type):
+                arrow_type = pa.float64()
+        fields.append(pa.field(column, arrow_type))
+    return pa.schema(fields)
+
+def _write_partitions(df, dataset, root=None, run_id=None, column_types=None):
+    """
+    Append a DataFrame with ticker and timestamp columns to a dataset.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    df = df.copy()
+    df['date'] = df['timestamp'].dt.strftime('%Y-%m-%d')
+    table = pa.Table.from_pandas(df, schema=_schema(df, column_types), preserve_index=False)
+    file_format = ds.ParquetFileFormat()
+    ds.write_dataset(
+        table,
+        _dataset_dir(dataset, root),
+        format=file_format,
+        partitioning=ds.partitioning(
+            pa.schema([('ticker', pa.string()), ('date', pa.string())]), flavor='hive'
+        ),
+        basename_template=f"part-{run_id or uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior='overwrite_or_ignore',
+        file_options=file_format.make_write_options(
+            compression=ARCHIVE_PARAMS['compression'],
+            compression_level=ARCHIVE_PARAMS['compression_level']
+        )
+    )
+
+def archive_rows(df, dataset, ticker=None, timestamp_column='timestamp', root=None, column_types=None):
+    """
+    Append rows read from a SQLite table to an archive dataset.
+
+    :param df: DataFrame of table rows; an 'id' column is dropped
+    :param dataset: str, dataset name, e.g. 'candles' or the table name
+    :param ticker: str, ticker for tables without a ticker column (the candlesticks_* tables)
+    :param timestamp_column: str, the column holding the row's ISO timestamp
+    :param column_types: dict of column name -> SQLite declared type (from PRAGMA table_info),
+                         so every chunk is written with the same schema
+    :return: int, the number of rows written
+    """
+    if df.empty:
+        return 0
+    df = df.drop(columns=['id'], errors='ignore').rename(columns={timestamp_column: 'timestamp'})
+    df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True, format='ISO8601')
+    if ticker is not None:
+        df.insert(0, 'ticker', ticker)
+    _write_partitions(df, dataset, root, column_types=column_types)
+    return len(df)
+
+def read_archive(dataset, tickers=None, start=None, end=None, columns=None, root=None,
+                 deduplicate=True, as_numpy=False):
+    """
+    Load archived rows for a date range and set of tickers.
+
+    Only the ticker/date partitions overlapping the range are opened and only
+    the requested columns are decoded.
+
+    :param dataset: str, 'candles' or a capture table name such as 'strategy1_data'
+    :param tickers: list of tickers, defaults to all
+    :param start: datetime or str, inclusive lower bound on the timestamp (UTC)
+    :param end: datetime or str, exclusive upper bound on the timestamp (UTC)
+    :param columns: list of columns to load; ticker and timestamp are always included
+    :param deduplicate: bool, drop identical rows, e.g. rows archived again after an
+                        interrupted retention run
+    :param as_numpy: bool, return a dict of column name -> NumPy array instead of a DataFrame
+    :return: DataFrame sorted by ticker and timestamp, or dict of arrays
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+
+    directory = _dataset_dir(dataset, root)
+    if not os.path.isdir(directory):
+        return {} if as_numpy else pd.DataFrame()
+
+    dataset_obj = ds.dataset(
+        directory, format='parquet',
+        partitioning=ds.partitioning(pa.schema([('ticker', pa.string()), ('date', pa.string())]), flavor='hive')
+    )
+    condition = None
+
+    def _and(expression):
+        return expression if condition is None else condition & expression
+
+    if tickers is not None:
+        condition = _and(pc.field('ticker').isin(list(tickers)))
+    if start is not None:
+        start = pd.Timestamp(start, tz='UTC') if pd.Timestamp(start).tzinfo is None else pd.Timestamp(start)
+        condition = _and(pc.field('date') >= start.strftime('%Y-%m-%d'))
+        condition = _and(pc.field('timestamp') >= pa.scalar(start.to_pydatetime(), pa.timestamp('ns', 'UTC')))
+    if end is not None:
+        end = pd.Timestamp(end, tz='UTC') if pd.Timestamp(end).tzinfo is None else pd.Timestamp(end)
+        condition = _and(pc.field('date') <= end.strftime('%Y-%m-%d'))
+        condition = _and(pc.field('timestamp') < pa.scalar(end.to_pydatetime(), pa.timestamp('ns', 'UTC')))
+
+    if columns is not None:
+        columns = ['ticker', 'timestamp'] + [column for column in columns if column not in ('ticker', 'timestamp')]
+    table = dataset_obj.to_table(columns=columns, filter=condition)
+    table = table.sort_by([('ticker', 'ascending'), ('timestamp', 'ascending')])
+    df = table.to_pandas()
+    df['ticker'] = df['ticker'].astype(str)
+    df = df[['ticker', 'timestamp'] + [column for column in df.columns if column not in ('ticker', 'timestamp', 'date')]]
+    if deduplicate:
+        df = df.drop_duplicates(ignore_index=True)
+    if as_numpy:
+        # Timestamps become datetime64[ns] in UTC rather than an object array
+        arrays = {column: df[column].to_numpy() for column in df.columns if column != 'timestamp'}
+        arrays['timestamp'] = df['timestamp'].dt.tz_convert(None).to_numpy()
+        return arrays
+    return df
+
+def main():
+    parser = argparse.ArgumentParser(description='Archive old rows to Parquet and export archived data.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('archive', help='Run retention, moving rows older than the hot window into the archive.')
+    export = subparsers.add_parser('export', help='Export an archived date range to a Parquet or CSV file.')
+    export.add_argument('dataset')
+    export.add_argument('output')
+    export.add_argument('--tickers', nargs='*')
+    export.add_argument('--start')
+    export.add_argument('--end')
+    export.add_argument('--columns', nargs='*')
+    args = parser.parse_args()
+
+    if args.command == 'archive':
+        # Run directly rather than through the scheduler's run_retention, so a
+        # failure ends the command with its traceback instead of returning None
+        from retention import RetentionManager
+        report = RetentionManager().run()
+        for table, rows in report['archived'].items():
+            print(f"{table}: {rows}")
+    else:
+        df = read_archive(args.dataset, args.tickers, args.start, args.end, args.columns)
+        if args.output.endswith('.csv'):
+            df.to_csv(args.output, index=False)
+        else:
+            df.to_parquet(args.output, index=False, compression=ARCHIVE_PARAMS['compression'])
+        print(f"Exported {len(df)} rows to {args.output}")
+
+if __name__ == '__main__':
+    main()
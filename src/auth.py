@@ -1,19 +1,39 @@
 # auth.py
 
-from cdp.cdp_api_client import CdpApiClient
-from config.config import COINBASE_API_KEY, COINBASE_PRIVATE_KEY, SANDBOX_MODE
+from config.config import CLIENT_PARAMS, SIM_EXCHANGE_PARAMS, get_settings
+from client_registry import registry
 
-def get_client():
-    if SANDBOX_MODE:
+def get_client(debugging=False):
+    """
+    Build a new authenticated exchange client.
+
+    :param debugging: bool, print every request and response (slow; for troubleshooting only)
+    """
+    if SIM_EXCHANGE_PARAMS['enabled']:
+        from sim_exchange import get_simulated_exchange
+        return get_simulated_exchange()
+
+    from cdp_client import PooledCdpApiClient
+
+    settings = get_settings()
+    if settings.SANDBOX_MODE:
         host = 'https://api-public.sandbox.exchange.coinbase.com'
     else:
         host = 'https://api.exchange.coinbase.com' # or base_url = 'https://api.coinbase.com'
 
-    client = CdpApiClient(
-        api_key=COINBASE_API_KEY,
-        private_key=COINBASE_PRIVATE_KEY,
+    client = PooledCdpApiClient(
+        api_key=settings.COINBASE_API_KEY,
+        private_key=settings.COINBASE_PRIVATE_KEY,
         host=host,
-        debugging=True  # Optional: Set to True for debugging output
+        registry=registry,
+        pool_maxsize=CLIENT_PARAMS['pool_maxsize'],
+        debugging=debugging
     )
 
-    return client
\ No newline at end of file
+    return client
+
+def get_shared_client():
+    """
+    Return the authenticated client shared by every module, creating it on first use.
+    """
+    return registry.client('exchange', get_client)
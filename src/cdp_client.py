@@ -0,0 +1,69 @@
+# cdp_client.py
+
+import time
+from urllib.parse import urlparse
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cdp.cdp_api_client import CdpApiClient
+from cdp.client import rest
+from cdp.errors import InvalidAPIKeyFormatError
+from client_registry import endpoint_label
+
+class PooledCdpApiClient(CdpApiClient):
+    """
+    CdpApiClient that parses its signing key once and records request latencies.
+
+    The stock client parses the PEM private key for every request it signs;
+    here the key is loaded when the client is built and reused. The urllib3
+    pool is sized from `pool_maxsize` so concurrent callers keep their
+    connections alive instead of discarding them.
+    """
+
+    def __init__(self, api_key, private_key, host, registry, pool_maxsize=16, debugging=False):
+        super().__init__(api_key=api_key, private_key=private_key, host=host, debugging=debugging)
+        self.registry = registry
+        self.configuration.connection_pool_maxsize = pool_maxsize
+        self.rest_client = rest.RESTClientObject(self.configuration)
+        self._signing_key = self._load_signing_key()
+
+    def _load_signing_key(self):
+        try:
+            private_key = serialization.load_pem_private_key(self.private_key.encode(), password=None)
+            if not isinstance(private_key, ec.EllipticCurvePrivateKey):
+                raise InvalidAPIKeyFormatError("Invalid key type")
+        except Exception as e:
+            raise InvalidAPIKeyFormatError("Could not parse the private key") from e
+        return private_key
+
+    def _build_jwt(self, url, method="GET"):
+        parsed_url = urlparse(url)
+        now = int(time.time())
+        header = {
+            "alg": "ES256",
+            "kid": self.api_key,
+            "typ": "JWT",
+            "nonce": self._nonce(),
+        }
+        claims = {
+            "sub": self.api_key,
+            "iss": "cdp",
+            "aud": ["cdp_service"],
+            "nbf": now,
+            "exp": now + 60,
+            "uris": [f"{method} {parsed_url.netloc}{parsed_url.path}"],
+        }
+        try:
+            return jwt.encode(claims, self._signing_key, algorithm="ES256", headers=header)
+        except Exception as e:
+            raise InvalidAPIKeyFormatError("Could not sign the JWT") from e
+
+    def call_api(self, method, url, header_params=None, body=None, post_params=None, _request_timeout=None):
+        start = time.perf_counter()
+        error = True
+        try:
+            response = super().call_api(method, url, header_params, body, post_params, _request_timeout)
+            error = response.status >= 400
+            return response
+        finally:
+            self.registry.record(endpoint_label(method, url), time.perf_counter() - start, error)
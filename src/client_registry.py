@@ -0,0 +1,135 @@
+# client_registry.py
+
+import re
+import threading
+import time
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from config.config import CLIENT_PARAMS
+from metrics import counter, histogram
+from logging_setup import get_logger
+
+# Configure logging
+logger = get_logger('client_registry')
+
+# Path segments that identify a resource (product ids, order UUIDs, numeric ids)
+# are collapsed so latencies are grouped per endpoint rather than per resource.
+_ID_SEGMENT = re.compile(r'^(?:[A-Z0-9]+-[A-Z0-9]+|[0-9a-fA-F-]{16,}|\d+)$')
+
+def endpoint_label(method, url):
+    """
+    Return a label such as 'GET /products/{id}/candles' for a request.
+    """
+    path = urlparse(url).path
+    segments = ['{id}' if _ID_SEGMENT.match(segment) else segment for segment in path.split('/')]
+    return f"{method.upper()} {'/'.join(segments)}"
+
+REQUEST_SECONDS = histogram(
+    'exchange_request_seconds', 'Latency of exchange REST requests.', ('endpoint',)
+)
+REQUEST_ERRORS = counter(
+    'exchange_request_errors_total', 'Exchange REST requests that failed or returned an HTTP error.', ('endpoint',)
+)
+
+class ClientRegistry:
+    """
+    Process-wide home for HTTP sessions and API clients.
+
+    Every host gets one requests.Session with a keep-alive connection pool, so
+    REST calls reuse warm TLS connections instead of opening a new one each
+    time, and API clients registered by name (e.g. the authenticated exchange
+    client) are built once and shared. Request latencies are recorded per
+    endpoint in the exchange_request_seconds metric.
+    """
+
+    def __init__(self, params=None):
+        self.params = dict(CLIENT_PARAMS if params is None else params)
+        self._sessions = {}
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def session(self, url):
+        """
+        Return the pooled session for the scheme and host of `url`.
+        """
+        parsed = urlparse(url)
+        key = f"{parsed.scheme}://{parsed.netloc}"
+        session = self._sessions.get(key)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(key)
+                if session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.params['pool_maxsize'])
+                    session.mount(key, adapter)
+                    self._sessions[key] = session
+                    logger.info(f"Opened pooled HTTP session for {key}.")
+        return session
+
+    def request(self, method, url, endpoint=None, **kwargs):
+        """
+        Send a request through the host's pooled session and record its latency.
+
+        :param method: str, the HTTP method
+        :param url: str, the full request URL
+        :param endpoint: str, latency label (defaults to the method and normalized path)
+        :return: requests.Response
+        """
+        kwargs.setdefault('timeout', self.params['timeout'])
+        endpoint = endpoint or endpoint_label(method, url)
+        start = time.perf_counter()
+        try:
+            response = self.session(url).request(method, url, **kwargs)
+        except Exception:
+            self.record(endpoint, time.perf_counter() - start, error=True)
+            raise
+        self.record(endpoint, time.perf_counter() - start, error=response.status_code >= 400)
+        return response
+
+    def get(self, url, endpoint=None, **kwargs):
+        return self.request('GET', url, endpoint, **kwargs)
+
+    def client(self, name, factory):
+        """
+        Return the client registered under `name`, building it with `factory()` on first use.
+        """
+        client = self._clients.get(name)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(name)
+                if client is None:
+                    client = factory()
+                    self._clients[name] = client
+        return client
+
+    def record(self, endpoint, seconds, error=False):
+        REQUEST_SECONDS.labels(endpoint).observe(seconds)
+        if error:
+            REQUEST_ERRORS.labels(endpoint).inc()
+
+    def latency_stats(self):
+        """
+        Return latency statistics in milliseconds per endpoint.
+        """
+        stats = {}
+        for (endpoint,), value in REQUEST_SECONDS.items():
+            snapshot = value.snapshot()
+            stats[endpoint] = {
+                'count': snapshot['count'],
+                'errors': int(REQUEST_ERRORS.labels(endpoint).get()),
+                **{
+                    f'{key}_ms': snapshot[key] * 1000 if snapshot[key] is not None else None
+                    for key in ('avg', 'p50', 'p90', 'p99', 'max')
+                }
+            }
+        return stats
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+            self._clients.clear()
+
+registry = ClientRegistry()
@@ -0,0 +1,78 @@
+# dashboard.py
+#
+# Live performance dashboard: P&L, open positions, Strategy 1 indicator values
+# and the bot's latency/throughput metrics. Runs as its own process next to
+# the bot and only reads the database (see dashboard_queries.py).
+#
+#   streamlit run src/dashboard.py
+
+import sys
+import os
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import streamlit as st
+from config.config import DASHBOARD_PARAMS
+from dashboard_queries import DashboardQueries
+
+@st.cache_resource
+def get_queries():
+    # One backend per server process, so every open page shares its cache and connection
+    return DashboardQueries()
+
+def show_pnl(queries):
+    pnl = queries.pnl()
+    positions = queries.open_positions()
+    today, total = pnl['today'], pnl['total']
+    columns = st.columns(4)
+    columns[0].metric('Realized P&L today', f"{today['net_pnl'].sum():,.2f}")
+    columns[1].metric('Realized P&L total', f"{total['net_pnl'].sum():,.2f}")
+    columns[2].metric('Unrealized P&L', f"{positions['unrealized_pnl'].sum():,.2f}")
+    columns[3].metric('Open positions', len(positions))
+    if not pnl['daily'].empty:
+        st.bar_chart(pnl['daily'], x='day', y='net_pnl', height=200)
+    if not total.empty:
+        st.dataframe(total, hide_index=True, use_container_width=True)
+
+    st.subheader('Open positions')
+    st.dataframe(positions, hide_index=True, use_container_width=True)
+
+def show_indicators(queries):
+    st.subheader('Strategy 1 indicators')
+    latest = queries.latest_indicators()
+    if latest.empty:
+        st.info('No strategy1_data rows yet.')
+        return
+    st.dataframe(latest, hide_index=True, use_container_width=True)
+    history = queries.indicators()
+    ticker = st.selectbox('Ticker', sorted(latest['ticker']))
+    series = history[history['ticker'] == ticker].set_index('timestamp')
+    st.line_chart(series[['STOCH_K_9_3', 'STOCH_K_14_3', 'STOCH_K_40_4', 'STOCH_K_60_10_1']], height=200)
+
+def show_metrics(queries):
+    st.subheader('Latency and throughput')
+    metrics = queries.metrics()
+    if metrics is None:
+        st.info(f"Bot metrics not reachable at {DASHBOARD_PARAMS['metrics_url']}.")
+        return
+    histograms, counters = metrics
+    st.dataframe(histograms, hide_index=True, use_container_width=True)
+    st.dataframe(counters, hide_index=True, use_container_width=True)
+
+st.set_page_config(page_title='Trading bot', layout='wide')
+st.title('Trading bot performance')
+
+@st.fragment(run_every=DASHBOARD_PARAMS['refresh_interval'])
+def live():
+    queries = get_queries()
+    show_pnl(queries)
+    show_indicators(queries)
+    show_metrics(queries)
+    timings = ', '.join(
+        f"{key} {seconds * 1000:.1f}ms ({queries.rows_polled.get(key, '-')} rows)"
+        for key, seconds in sorted(queries.query_seconds.items())
+    )
+    st.caption(f"Last refresh: {timings}")
+
+live()
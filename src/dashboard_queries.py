@@ -0,0 +1,358 @@
+# dashboard_queries.py
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from urllib.parse import quote
+import pandas as pd
+import db_manager
+from config.config import DASHBOARD_PARAMS, MARKET_DATA_PLANE_PARAMS
+from logging_setup import get_logger
+
+# Configure logging
+logger = get_logger('dashboard_queries')
+
+_SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})? (\S+)$')
+_LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+def connect_read_only(db_path=None, busy_timeout_ms=None):
+    """
+    Open the database read-only.
+
+    The connection can never take a write lock, and in WAL mode readers work
+    from a snapshot, so it neither blocks nor waits for the trading threads.
+
+    :return: sqlite3.Connection, usable from any thread (callers serialize access)
+    """
+    path = os.path.abspath(db_path or db_manager.DB_PATH)
+    timeout = (DASHBOARD_PARAMS['busy_timeout_ms'] if busy_timeout_ms is None else busy_timeout_ms) / 1000
+    conn = sqlite3.connect(f'file:{quote(path)}?mode=ro', uri=True, timeout=timeout, check_same_thread=False)
+    conn.execute('PRAGMA query_only = ON')
+    return conn
+
+def parse_metrics(text):
+    """
+    Parse the Prometheus text format served by metrics.start_http_server.
+
+    :return: dict mapping sample name (e.g. 'db_write_seconds_bucket') to a list of (labels dict, value)
+    """
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith('#'):
+            continue
+        match = _SAMPLE.match(line)
+        if match is None:
+            continue
+        name, labels, value = match.groups()
+        labels = {key: value.replace('\\"', '"').replace('\\n', '\n').replace('\\\\', '\\')
+                  for key, value in _LABEL.findall(labels or '')}
+        samples.setdefault(name, []).append((labels, float(value)))
+    return samples
+
+def _label_key(labels, exclude=('le',)):
+    return tuple(sorted((key, value) for key, value in labels.items() if key not in exclude))
+
+def _bucket_percentile(buckets, fraction):
+    """
+    Return the upper bound of the bucket containing `fraction` of the observations, like HistogramValue.percentile.
+    """
+    total = buckets[-1][1] if buckets else 0
+    if not total:
+        return None
+    for bound, cumulative in buckets:
+        if cumulative >= fraction * total:
+            return bound
+    return buckets[-1][0]
+
+def summarize_metrics(samples, previous=None, elapsed=None):
+    """
+    Reduce parsed metrics to one row per histogram and counter series.
+
+    Rates are computed against the previous scrape, so they cover the last
+    refresh interval rather than the whole uptime.
+
+    :param samples: dict from parse_metrics()
+    :param previous: dict from parse_metrics() for the previous scrape, or None
+    :param elapsed: float, seconds between the two scrapes
+    :return: tuple (histogram DataFrame with count, rate, avg_ms, p50_ms, p99_ms; counter/gauge DataFrame)
+    """
+    def counts(source, name):
+        return {_label_key(labels): value for labels, value in (source or {}).get(name, [])}
+
+    histograms, others = [], []
+    for name in sorted(samples):
+        if not name.endswith('_bucket'):
+            continue
+        base = name[:-len('_bucket')]
+        series = {}
+        for labels, value in samples[name]:
+            bound = float('inf') if labels.get('le') == '+Inf' else float(labels.get('le', 'inf'))
+            series.setdefault(_label_key(labels), []).append((bound, value))
+        totals = counts(samples, f'{base}_sum')
+        before = counts(previous, f'{base}_count')
+        for key, buckets in series.items():
+            buckets.sort()
+            count = buckets[-1][1]
+            if not count:
+                continue
+            p50, p99 = _bucket_percentile(buckets, 0.5), _bucket_percentile(buckets, 0.99)
+            histograms.append({
+                'metric': base,
+                'labels': ','.join(value for _, value in key),
+                'count': int(count),
+                'rate': (count - before[key]) / elapsed if elapsed and key in before else None,
+                'avg_ms': totals.get(key, 0.0) / count * 1000,
+                'p50_ms': p50 * 1000 if p50 is not None else None,
+                'p99_ms': p99 * 1000 if p99 is not None else None
+            })
+
+    histogram_names = {name[:-len('_bucket')] for name in samples if name.endswith('_bucket')}
+    for name in sorted(samples):
+        if name.rsplit('_', 1)[0] in histogram_names and name.rsplit('_', 1)[1] in ('bucket', 'sum', 'count'):
+            continue
+        before = counts(previous, name)
+        for labels, value in samples[name]:
+            key = _label_key(labels)
+            is_counter = name.endswith('_total')
+            others.append({
+                'metric': name,
+                'labels': ','.join(value for _, value in key),
+                'value': value,
+                'rate': (value - before[key]) / elapsed if is_counter and elapsed and key in before else None
+            })
+
+    return (
+        pd.DataFrame(histograms, columns=['metric', 'labels', 'count', 'rate', 'avg_ms', 'p50_ms', 'p99_ms']),
+        pd.DataFrame(others, columns=['metric', 'labels', 'value', 'rate'])
+    )
+
+class DashboardQueries:
+    """
+    Query backend for the dashboard, shared by every browser session.
+
+    Reads go through one read-only connection (see connect_read_only). After
+    the first load, trades and strategy1_data are polled incrementally: only
+    rows with an id above the last one seen, plus the trades that were open
+    last time, since closing a trade updates its row. Each result is cached
+    for its TTL in DASHBOARD_PARAMS['ttl'], so any number of open pages costs
+    at most one query per TTL; if a refresh fails (e.g. the database is
+    briefly locked) the previous result is served.
+    """
+
+    def __init__(self, db_path=None, params=None):
+        self.db_path = db_path
+        self.params = DASHBOARD_PARAMS if params is None else params
+        self._conn = None
+        self._lock = threading.Lock()
+        self._cache = {}  # Key -> (expiry, value)
+        self._trades = {}  # Trade id -> row tuple
+        self._trade_columns = None
+        self._open_ids = set()
+        self._last_trade_id = None
+        self._indicators = deque(maxlen=self.params['indicator_rows'])
+        self._indicator_columns = None
+        self._last_indicator_id = None
+        self._metrics_scrape = None  # (monotonic time, parsed samples)
+        self._plane = None
+        self.query_seconds = {}  # Key -> duration of the last refresh
+        self.rows_polled = {}  # Key -> rows read by the last refresh
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = connect_read_only(self.db_path, self.params['busy_timeout_ms'])
+        return self._conn
+
+    def _cached(self, key, load):
+        with self._lock:
+            now = time.monotonic()
+            entry = self._cache.get(key)
+            if entry is not None and now < entry[0]:
+                return entry[1]
+            start = time.perf_counter()
+            try:
+                value = load()
+            except (sqlite3.Error, OSError) as e:
+                if entry is None:
+                    raise
+                logger.warning(f"Dashboard refresh of {key} failed; serving the cached result: {e}")
+                return entry[1]
+            self.query_seconds[key] = time.perf_counter() - start
+            self._cache[key] = (now + self.params['ttl'][key], value)
+            return value
+
+    def _load_trades(self):
+        cursor = self._connection().cursor()
+        if self._last_trade_id is None:
+            cursor.execute('SELECT * FROM trades ORDER BY id DESC LIMIT ?', (self.params['trade_rows'],))
+            rows = cursor.fetchall()
+            cursor.execute('SELECT * FROM trades WHERE sell_timestamp IS NULL')
+            rows += cursor.fetchall()
+        else:
+            # Re-read the trades that were open (they may have closed), then the new ones
+            open_ids = sorted(self._open_ids)
+            rows = []
+            for i in range(0, len(open_ids), 500):
+                chunk = open_ids[i:i + 500]
+                cursor.execute(f"SELECT * FROM trades WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+                rows += cursor.fetchall()
+            cursor.execute('SELECT * FROM trades WHERE id > ? ORDER BY id', (self._last_trade_id,))
+            rows += cursor.fetchall()
+        self._trade_columns = [column[0] for column in cursor.description]
+        self.rows_polled['trades'] = len(rows)
+
+        sell_index = self._trade_columns.index('sell_timestamp')
+        for row in rows:
+            self._trades[row[0]] = row
+            if row[sell_index] is None:
+                self._open_ids.add(row[0])
+            else:
+                self._open_ids.discard(row[0])
+        self._last_trade_id = max(self._trades, default=0)
+        closed = [trade_id for trade_id in sorted(self._trades, reverse=True) if trade_id not in self._open_ids]
+        for trade_id in closed[self.params['trade_rows']:]:
+            del self._trades[trade_id]
+
+        df = pd.DataFrame([self._trades[trade_id] for trade_id in sorted(self._trades, reverse=True)],
+                          columns=self._trade_columns or db_manager.TRADE_COLUMNS)
+        return df
+
+    def trades(self):
+        """
+        Return the most recent trades plus every open one, newest first.
+        """
+        return self._cached('trades', self._load_trades)
+
+    def _load_indicators(self):
+        cursor = self._connection().cursor()
+        if self._last_indicator_id is None:
+            cursor.execute('SELECT * FROM strategy1_data ORDER BY id DESC LIMIT ?', (self.params['indicator_rows'],))
+            rows = cursor.fetchall()[::-1]
+        else:
+            cursor.execute('SELECT * FROM strategy1_data WHERE id > ? ORDER BY id', (self._last_indicator_id,))
+            rows = cursor.fetchall()
+        self._indicator_columns = [column[0] for column in cursor.description]
+        self.rows_polled['indicators'] = len(rows)
+        self._indicators.extend(rows)
+        self._last_indicator_id = self._indicators[-1][0] if self._indicators else 0
+        return pd.DataFrame(list(self._indicators), columns=self._indicator_columns)
+
+    def indicators(self):
+        """
+        Return recent strategy1_data rows, oldest first.
+        """
+        return self._cached('indicators', self._load_indicators)
+
+    def latest_indicators(self):
+        """
+        Return the newest strategy1_data row per ticker.
+        """
+        df = self.indicators()
+        if df.empty:
+            return df
+        return df.groupby('ticker', sort=True).tail(1).drop(columns='id').reset_index(drop=True)
+
+    def _plane_prices(self, tickers):
+        if not MARKET_DATA_PLANE_PARAMS['enabled']:
+            return {}
+        from market_data_plane import MarketDataReader
+
+        try:
+            if self._plane is None:
+                self._plane = MarketDataReader()
+            prices = {}
+            for ticker in tickers:
+                price = self._plane.latest(ticker)['price']
+                if price == price:  # NaN until the first tick
+                    prices[ticker] = price
+            return prices
+        except (OSError, ValueError, KeyError, RuntimeError) as e:
+            logger.debug(f"Market data plane unavailable; using strategy1_data closes: {e}")
+            return {}
+
+    def latest_prices(self, tickers):
+        """
+        Return the latest price per ticker, from the market data plane when it is running, else strategy1_data.
+        """
+        latest = self.latest_indicators()
+        prices = dict(zip(latest['ticker'], latest['close'])) if not latest.empty else {}
+        prices.update(self._plane_prices(tickers))
+        return prices
+
+    def open_positions(self):
+        """
+        Return the open position per ticker and strategy with unrealized P&L.
+
+        Like get_latest_buy_trade, only the newest open buy of each (ticker, strategy) counts.
+        """
+        trades = self.trades()
+        columns = ['id', 'ticker', 'strategy', 'buy_timestamp', 'buy_price', 'buy_amount', 'order_id']
+        open_trades = trades[trades['sell_timestamp'].isna()]
+        if open_trades.empty:
+            return pd.DataFrame(columns=columns + ['price', 'unrealized_pnl'])
+        positions = open_trades.sort_values('id').groupby(['ticker', 'strategy']).tail(1)[columns]
+        prices = self.latest_prices(positions['ticker'].unique())
+        positions = positions.assign(price=positions['ticker'].map(prices))
+        positions['unrealized_pnl'] = (positions['price'] - positions['buy_price']) * positions['buy_amount']
+        return positions.sort_values(['ticker', 'strategy']).reset_index(drop=True)
+
+    def _load_pnl(self):
+        cursor = self._connection().cursor()
+        today = datetime.utcnow().date()
+        query = '''
+            SELECT {key}, TOTAL(trade_count), TOTAL(net_pnl), TOTAL(wins), TOTAL(losses), TOTAL(volume)
+            FROM daily_pnl WHERE day >= ?
+            GROUP BY {key}
+        '''
+        columns = ['trade_count', 'net_pnl', 'wins', 'losses', 'volume']
+        result = {}
+        for name, key, since in (('today', 'strategy', today), ('total', 'strategy', None),
+                                 ('daily', 'day', today - timedelta(days=29))):
+            cursor.execute(query.format(key=key), (since.isoformat() if since else '',))
+            result[name] = pd.DataFrame(cursor.fetchall(), columns=[key] + columns)
+        return result
+
+    def pnl(self):
+        """
+        Return realized P&L from the daily_pnl rollup.
+
+        :return: dict with 'today' and 'total' (per strategy) and 'daily' (last 30 days) DataFrames
+        """
+        return self._cached('pnl', self._load_pnl)
+
+    def _load_metrics(self):
+        from urllib.request import urlopen
+
+        with urlopen(self.params['metrics_url'], timeout=1) as response:
+            samples = parse_metrics(response.read().decode())
+        now = time.monotonic()
+        previous, elapsed = None, None
+        if self._metrics_scrape is not None:
+            elapsed = now - self._metrics_scrape[0]
+            previous = self._metrics_scrape[1]
+        self._metrics_scrape = (now, samples)
+        return summarize_metrics(samples, previous, elapsed)
+
+    def metrics(self):
+        """
+        Scrape the bot's /metrics endpoint.
+
+        :return: tuple (histogram DataFrame, counter/gauge DataFrame), or None if the bot is not reachable
+        """
+        try:
+            return self._cached('metrics', self._load_metrics)
+        except OSError as e:
+            logger.debug(f"Could not scrape {self.params['metrics_url']}: {e}")
+            return None
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            if self._plane is not None:
+                self._plane.close()
+                self._plane = None
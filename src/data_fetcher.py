@@ -2,29 +2,24 @@
 
 import sys
 import os
-import logging
-import pandas as pd
 import requests
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import time
 import threading
 from functools import wraps
-import schedule
 import sqlite3
 
 # Add the parent directory to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config.config import SANDBOX_MODE, TICKERS, DB_FILE, SCENARIO
+from config.config import TICKERS, DB_FILE, SCENARIO, SIM_EXCHANGE_PARAMS, get_settings
+from scheduler import scheduler
+from client_registry import registry
+from db_manager import DB_WRITE_SECONDS
+from logging_setup import get_logger
 
 # Configure logging
-logger = logging.getLogger('data_fetcher')
-logger.setLevel(logging.INFO)
-handler = logging.StreamHandler()
-formatter = logging.Formatter('%(asctime)s:%(levelname)s:%(message)s')
-handler.setFormatter(formatter)
-if not logger.handlers:
-    logger.addHandler(handler)
+logger = get_logger('data_fetcher')
 
 # Rate Limiter Decorator
 def rate_limited(max_calls_per_second):
@@ -35,13 +30,16 @@ def rate_limited(max_calls_per_second):
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
+            # Reserve the next call slot under the lock, then wait and call outside it
+            # so concurrent callers are spaced out but their requests still overlap.
             with lock:
-                elapsed = time.perf_counter() - last_time_called[0]
-                left_to_wait = min_interval - elapsed
-                if left_to_wait > 0:
-                    time.sleep(left_to_wait)
-                last_time_called[0] = time.perf_counter()
-                return func(*args, **kwargs)
+                now = time.perf_counter()
+                slot = max(now, last_time_called[0] + min_interval)
+                last_time_called[0] = slot
+            left_to_wait = slot - now
+            if left_to_wait > 0:
+                time.sleep(left_to_wait)
+            return func(*args, **kwargs)
         return wrapper
     return decorator
 
@@ -73,14 +71,23 @@ def retry_on_rate_limit(max_retries=5, initial_backoff=1):
 @rate_limited(max_calls_per_second=100)
 @retry_on_rate_limit(max_retries=5, initial_backoff=1)
 def fetch_historical_data(ticker, start_time=None, end_time=None, granularity=60, limit=300):
-    try:
-        base_url = 'https://api.exchange.coinbase.com' if not SANDBOX_MODE else 'https://api-public.sandbox.exchange.coinbase.com'
+    """
+    Fetch up to `limit` candles ending at end_time (now by default).
+
+    :param start_time: datetime (UTC), start of the range; defaults to end_time minus `limit` candles
+    :param end_time: datetime (UTC), end of the range; defaults to start_time plus `limit` candles, or now
+    """
+    import pandas as pd
 
-        end_time_dt = datetime.utcnow()
-        start_time_dt = end_time_dt - timedelta(seconds=granularity * limit)
+    try:
+        span = timedelta(seconds=granularity * limit)
+        if end_time is None:
+            end_time = start_time + span if start_time is not None else datetime.utcnow()
+        if start_time is None:
+            start_time = end_time - span
 
-        start_iso = start_time_dt.isoformat() + 'Z'
-        end_iso = end_time_dt.isoformat() + 'Z'
+        start_iso = _to_utc_naive(start_time).isoformat() + 'Z'
+        end_iso = _to_utc_naive(end_time).isoformat() + 'Z'
 
         params = {
             'start': start_iso,
@@ -88,11 +95,16 @@ def fetch_historical_data(ticker, start_time=None, end_time=None, granularity=60
             'granularity': granularity
         }
 
-        url = f'{base_url}/products/{ticker}/candles'
-        response = requests.get(url, params=params)
-        response.raise_for_status()
+        if SIM_EXCHANGE_PARAMS['enabled']:
+            from sim_exchange import get_simulated_exchange
+            candles = get_simulated_exchange().get_product_candles(ticker, start_iso, end_iso, granularity)
+        else:
+            base_url = 'https://api.exchange.coinbase.com' if not get_settings().SANDBOX_MODE else 'https://api-public.sandbox.exchange.coinbase.com'
+            url = f'{base_url}/products/{ticker}/candles'
+            response = registry.get(url, endpoint='GET /products/{id}/candles', params=params)
+            response.raise_for_status()
 
-        candles = response.json()
+            candles = response.json()
 
         if not candles:
             logger.warning(f"No historical data fetched for {ticker}.")
@@ -109,6 +121,37 @@ def fetch_historical_data(ticker, start_time=None, end_time=None, granularity=60
         logger.error(f"An error occurred while fetching historical data for {ticker}: {e}")
         return None
 
+def _to_utc_naive(value):
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def fetch_historical_range(ticker, start_time, end_time=None, granularity=60, page_size=300):
+    """
+    Fetch every candle between start_time and end_time, paging `page_size` candles per request.
+
+    :param start_time: datetime (UTC), start of the range
+    :param end_time: datetime (UTC), end of the range (defaults to now)
+    :return: DataFrame sorted by timestamp, or None if nothing was fetched
+    """
+    import pandas as pd
+
+    end_time = end_time or datetime.utcnow()
+    page = timedelta(seconds=granularity * page_size)
+    frames = []
+    page_start = start_time
+    while page_start < end_time:
+        page_end = min(page_start + page, end_time)
+        df = fetch_historical_data(ticker, start_time=page_start, end_time=page_end, granularity=granularity)
+        if df is not None and not df.empty:
+            frames.append(df)
+        page_start = page_end
+    if not frames:
+        return None
+    df = pd.concat(frames, ignore_index=True)
+    return df.drop_duplicates('timestamp', keep='last').sort_values('timestamp', ignore_index=True)
+
+@DB_WRITE_SECONDS.labels('insert_candles').time()
 def insert_data_into_db(ticker, df):
     try:
         conn = sqlite3.connect(DB_FILE)
@@ -145,13 +188,16 @@ def insert_data_into_db(ticker, df):
         logger.error(f"Failed to insert data into database for {ticker}: {e}")
 
 def fetch_and_store(ticker):
+    # Deferred: resampler pulls in NumPy, and process_websocket_data imports this module
+    from resampler import resampler
+
     try:
-        granularity = 900  # 15 minutes
         limit = 100  # Number of data points
 
-        data = fetch_historical_data(ticker, granularity=granularity, limit=limit)
+        # 15-minute bars aggregated from the streamed 1-minute base series, not a separate request
+        data = resampler.bars(ticker, 15, limit=limit)
 
-        if data is not None:
+        if not data.empty:
             insert_data_into_db(ticker, data)
             logger.info(f"Fetched and inserted data for {ticker}.")
         else:
@@ -160,18 +206,30 @@ def fetch_and_store(ticker):
     except Exception as e:
         logger.error(f"Error in fetch_and_store for {ticker}: {e}")
 
+def fetch_and_store_all():
+    for ticker in TICKERS:
+        fetch_and_store(ticker)
+
 def run_scheduler():
-    schedule.every(15).minutes.at(":00").do(lambda: [fetch_and_store(ticker) for ticker in TICKERS])
+    # Refresh every ticker just after each 15-minute candle closes
+    scheduler.at_bar_close(900, fetch_and_store_all, name='fetch_candles_15m')
+    scheduler.start()
 
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+def start_data_fetcher(scenario=SCENARIO, history=None):
+    """
+    Capture candles now (Scenario A) or at the next hour (Scenario B), then every 15 minutes.
 
-def start_data_fetcher(scenario=SCENARIO):
+    :param history: dict of ticker -> 15-minute candle DataFrame already fetched at
+                    startup; used for the Scenario A capture instead of refetching
+    """
     if scenario == 'A':
         logger.info("Executing Scenario A: Immediate Data Capture")
         for ticker in TICKERS:
-            fetch_and_store(ticker)
+            df = history.get(ticker) if history else None
+            if df is not None and not df.empty and 'volume' in df.columns:
+                insert_data_into_db(ticker, df.tail(100))
+            else:
+                fetch_and_store(ticker)
     elif scenario == 'B':
         logger.info("Executing Scenario B: Data Capture at Next Hour")
         utc_now = datetime.utcnow()
@@ -179,11 +237,8 @@ def start_data_fetcher(scenario=SCENARIO):
         wait_seconds = (next_hour - utc_now).total_seconds()
         logger.info(f"Waiting for {wait_seconds} seconds until the next hour starts.")
         time.sleep(wait_seconds)
-        for ticker in TICKERS:
-            fetch_and_store(ticker)
+        fetch_and_store_all()
     else:
         raise ValueError("Invalid scenario. Use 'A' for immediate start or 'B' for next hour start.")
 
-    scheduler_thread = threading.Thread(target=run_scheduler)
-    scheduler_thread.daemon = True
-    scheduler_thread.start()
\ No newline at end of file
+    run_scheduler()
\ No newline at end of file
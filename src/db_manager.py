@@ -1,32 +1,181 @@
 # db_manager.py
 
 import sqlite3
-import logging
 import os
 from datetime import datetime
+from functools import lru_cache
+from config.config import STRATEGY_2
+from metrics import histogram
+from tracing import tracer
+from logging_setup import get_logger
 
-# Get the absolute path to the logs directory
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-LOGS_DIR = os.path.join(BASE_DIR, 'logs')
-if not os.path.exists(LOGS_DIR):
-    os.makedirs(LOGS_DIR)
-
-from logging.handlers import RotatingFileHandler
-
-# Configure logging
-log_file = os.path.join(LOGS_DIR, 'db_manager.log')
-logger = logging.getLogger('db_manager')
-logger.setLevel(logging.INFO)
-handler = RotatingFileHandler(
-    log_file, maxBytes=5 * 1024 * 1024, backupCount=5
-)
-formatter = logging.Formatter('%(asctime)s:%(levelname)s:%(message)s')
-handler.setFormatter(formatter)
-if not logger.handlers:
-    logger.addHandler(handler)
+
+# Configure logging (also written to logs/db_manager.log, see LOGGING_PARAMS)
+logger = get_logger('db_manager')
 
 DB_PATH = os.path.join(BASE_DIR, 'data', 'trading_bot.db')
 
+DB_WRITE_SECONDS = histogram('db_write_seconds', 'Time spent in database writes.', ('operation',))
+
+TRADE_COLUMNS = [
+    'id', 'ticker', 'strategy', 'buy_timestamp', 'buy_price', 'buy_amount',
+    'sell_timestamp', 'sell_price', 'sell_amount', 'profit_loss', 'order_id', 'side'
+]
+
+# Callbacks run after a trade is opened or closed, used to keep in-memory state
+# (risk counters, exposure) current without re-reading the trades table
+_trade_open_listeners = []
+_trade_close_listeners = []
+
+def register_trade_open_listener(callback):
+    """
+    Register a callback invoked after every log_trade_open.
+
+    :param callback: callable taking a dict with id, ticker, strategy, side, price, amount and order_id
+    """
+    if callback not in _trade_open_listeners:
+        _trade_open_listeners.append(callback)
+
+def register_trade_close_listener(callback):
+    """
+    Register a callback invoked with the closed trade's dict after a trade is first closed.
+
+    Closing an already closed trade again updates the row and the rollup but
+    does not notify, since listeners accumulate per close.
+
+    :param callback: callable taking a trade dict (see TRADE_COLUMNS)
+    """
+    if callback not in _trade_close_listeners:
+        _trade_close_listeners.append(callback)
+
+def _trade_row_to_dict(trade):
+    return dict(zip(TRADE_COLUMNS, trade))
+
+# Checkpoint minutes stored in the wide strategy2_data table; each has open/high/low/close columns
+STRATEGY2_CHECKPOINT_MINUTES = tuple(checkpoint['minute'] for checkpoint in STRATEGY_2['checkpoints'])
+STRATEGY2_COLUMNS = frozenset(
+    ['ticker', 'timestamp', 'open', 'high', 'low', 'close'] +
+    [f'{field}_{minute}m' for minute in STRATEGY2_CHECKPOINT_MINUTES for field in ('open', 'high', 'low', 'close')]
+)
+
+def _notify_trade_open(trade):
+    for callback in _trade_open_listeners:
+        try:
+            callback(trade)
+        except Exception as e:
+            logger.error(f"Trade open listener {callback} failed for trade {trade['id']}: {e}")
+
+def _notify_trade_close(trade):
+    for callback in _trade_close_listeners:
+        try:
+            callback(trade)
+        except Exception as e:
+            logger.error(f"Trade close listener {callback} failed for trade {trade['id']}: {e}")
+
+def _apply_daily_pnl(cursor, trade, sign):
+    """
+    Add (sign=1) or remove (sign=-1) a closed trade's contribution to the daily_pnl rollup.
+    """
+    profit_loss = trade['profit_loss'] or 0.0
+    buy_notional = (trade['buy_price'] or 0.0) * (trade['buy_amount'] or 0.0)
+    sell_notional = (trade['sell_price'] or 0.0) * (trade['sell_amount'] or 0.0)
+    cursor.execute('''
+        INSERT INTO daily_pnl (
+            day, strategy, ticker, trade_count, gross_pnl, net_pnl, wins, losses, volume
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (day, strategy, ticker) DO UPDATE SET
+            trade_count = trade_count + excluded.trade_count,
+            gross_pnl = gross_pnl + excluded.gross_pnl,
+            net_pnl = net_pnl + excluded.net_pnl,
+            wins = wins + excluded.wins,
+            losses = losses + excluded.losses,
+            volume = volume + excluded.volume
+    ''', (
+        trade['sell_timestamp'][:10],
+        trade['strategy'],
+        trade['ticker'],
+        sign,
+        sign * (sell_notional - buy_notional),
+        sign * profit_loss,
+        sign * (profit_loss > 0),
+        sign * (profit_loss < 0),
+        sign * (buy_notional + sell_notional)
+    ))
+
+@DB_WRITE_SECONDS.labels('close_trade').time()
+def _close_trade(trade_id, sell_timestamp, sell_price, sell_amount, profit_loss):
+    """
+    Write sell details and update the daily_pnl rollup in one transaction.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM trades WHERE id = ?', (trade_id,))
+    previous = cursor.fetchone()
+    already_closed = False
+    if previous is not None:
+        previous = _trade_row_to_dict(previous)
+        already_closed = previous['sell_timestamp'] is not None
+        if already_closed:
+            # Closing an already closed trade replaces its earlier rollup contribution
+            _apply_daily_pnl(cursor, previous, -1)
+    cursor.execute('''
+        UPDATE trades
+        SET sell_timestamp = ?, sell_price = ?, sell_amount = ?, profit_loss = ?
+        WHERE id = ?
+    ''', (
+        sell_timestamp,
+        sell_price,
+        sell_amount,
+        profit_loss,
+        trade_id
+    ))
+    trade = None
+    if previous is not None:
+        trade = dict(previous, sell_timestamp=sell_timestamp, sell_price=sell_price,
+                     sell_amount=sell_amount, profit_loss=profit_loss)
+        if sell_timestamp is not None:
+            _apply_daily_pnl(cursor, trade, 1)
+    conn.commit()
+    conn.close()
+    if trade is not None and not already_closed:
+        _notify_trade_close(trade)
+    elif already_closed:
+        logger.warning(f"Trade {trade_id} was already closed; updated it without notifying listeners again.")
+
+def rebuild_daily_pnl():
+    """
+    Recompute the daily_pnl rollup from the trades table.
+
+    :return: int, the number of rollup rows written
+    """
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute('DELETE FROM daily_pnl')
+    cursor.execute('''
+        INSERT INTO daily_pnl (
+            day, strategy, ticker, trade_count, gross_pnl, net_pnl, wins, losses, volume
+        )
+        SELECT
+            substr(sell_timestamp, 1, 10),
+            strategy,
+            ticker,
+            COUNT(*),
+            TOTAL(IFNULL(sell_price * sell_amount, 0) - IFNULL(buy_price * buy_amount, 0)),
+            TOTAL(profit_loss),
+            TOTAL(profit_loss > 0),
+            TOTAL(profit_loss < 0),
+            TOTAL(IFNULL(sell_price * sell_amount, 0) + IFNULL(buy_price * buy_amount, 0))
+        FROM trades
+        WHERE sell_timestamp IS NOT NULL
+        GROUP BY 1, 2, 3
+    ''')
+    rows = cursor.rowcount
+    conn.commit()
+    conn.close()
+    logger.info(f"Rebuilt daily_pnl rollup with {rows} rows.")
+    return rows
+
 def initialize_db():
     if not os.path.exists(os.path.join(BASE_DIR, 'data')):
         os.makedirs(os.path.join(BASE_DIR, 'data'))
@@ -34,6 +183,14 @@ def initialize_db():
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
 
+    # Let retention return freed pages with PRAGMA incremental_vacuum. This only
+    # takes effect on a new database; convert existing ones with
+    # `python src/retention.py --enable-incremental-vacuum` while the bot is stopped.
+    cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    # Write-ahead logging lets readers (the dashboard, analytics) work from a
+    # snapshot while the trading threads write. The mode persists in the file
+    cursor.execute('PRAGMA journal_mode = WAL')
+
     # Create tables
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS trades (
@@ -47,9 +204,13 @@ def initialize_db():
             sell_price REAL,
             sell_amount REAL,
             profit_loss REAL,
-            order_id TEXT  -- Added order_id to store the exchange's order ID
+            order_id TEXT,  -- Added order_id to store the exchange's order ID
+            side TEXT  -- 'BUY' or 'SELL' as passed to log_trade_open
         )
     ''')
+    # Databases created before trades recorded the order side; their rows keep side NULL
+    if 'side' not in {row[1] for row in cursor.execute('PRAGMA table_info(trades)')}:
+        cursor.execute('ALTER TABLE trades ADD COLUMN side TEXT')
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS errors (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -121,13 +282,84 @@ def initialize_db():
             "close_50m" REAL
         )
     ''')
+    # Columns for checkpoints added to STRATEGY_2 after the table was created
+    existing = {row[1] for row in cursor.execute('PRAGMA table_info(strategy2_data)')}
+    for column in sorted(STRATEGY2_COLUMNS - existing):
+        cursor.execute(f'ALTER TABLE strategy2_data ADD COLUMN "{column}" REAL')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_strategy2_data_ticker_timestamp
+        ON strategy2_data (ticker, timestamp)
+    ''')
+    # Long-format Strategy 2 checkpoints: one narrow row per ticker, hour and checkpoint
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS strategy2_checkpoints (
+            ticker TEXT,
+            hour TEXT,
+            checkpoint_minute INTEGER,
+            open REAL,
+            high REAL,
+            low REAL,
+            close REAL,
+            volume REAL,
+            PRIMARY KEY (ticker, hour, checkpoint_minute)
+        ) WITHOUT ROWID
+    ''')
 
+    # One row per retention run: rows removed, time taken and database size
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS retention_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at TEXT,
+            duration REAL,
+            rows_deleted INTEGER,
+            rows_archived INTEGER,
+            size_before INTEGER,
+            size_after INTEGER,
+            free_pages INTEGER,
+            details TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_errors_timestamp
+        ON errors (timestamp)
+    ''')
 
+    # Daily P&L rollup per strategy and ticker, maintained on every trade close
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS daily_pnl (
+            day TEXT,
+            strategy TEXT,
+            ticker TEXT,
+            trade_count INTEGER,
+            gross_pnl REAL,
+            net_pnl REAL,
+            wins INTEGER,
+            losses INTEGER,
+            volume REAL,
+            PRIMARY KEY (day, strategy, ticker)
+        )
+    ''')
 
+    # Indexes backing the trade analytics queries and the open-position lookup
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_trades_strategy_buy_timestamp
+        ON trades (strategy, buy_timestamp)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_trades_ticker_strategy_sell_timestamp
+        ON trades (ticker, strategy, sell_timestamp)
+    ''')
+    # get_latest_buy_trade is served by the (ticker, strategy, sell_timestamp) index
+    # above, which made this partial index redundant
+    cursor.execute('DROP INDEX IF EXISTS idx_trades_open')
+    # Refresh planner statistics for tables that need it (SQLite 3.46+ checks every
+    # table; older versions rely on the PRAGMA optimize of the nightly retention run)
+    cursor.execute('PRAGMA optimize=0x10002')
 
     conn.commit()
     conn.close()
 
+@DB_WRITE_SECONDS.labels('log_strategy1_data').time()
 def log_strategy1_data(data):
     """
     Log data for Strategy 1 to the database.
@@ -168,35 +400,112 @@ def log_strategy1_data(data):
     conn.commit()
     conn.close()
 
-def log_strategy2_data(data):
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
+# Cache the validated SQL text per column set. Connections are opened per call,
+# so SQLite still prepares the statement each time
+@lru_cache(maxsize=64)
+def _strategy2_insert_sql(columns):
+    unknown = set(columns) - STRATEGY2_COLUMNS
+    if unknown:
+        raise ValueError(f"Unknown strategy2_data columns: {sorted(unknown)}")
+    quoted = ', '.join(f'"{column}"' for column in columns)
+    return f'INSERT INTO strategy2_data ({quoted}) VALUES ({", ".join("?" * len(columns))})'
 
-    columns = ', '.join(data.keys())
-    placeholders = ', '.join('?' * len(data))
-    sql = f'INSERT INTO strategy2_data ({columns}) VALUES ({placeholders})'
-    cursor.execute(sql, list(data.values()))
+@lru_cache(maxsize=64)
+def _strategy2_update_sql(columns):
+    unknown = set(columns) - STRATEGY2_COLUMNS
+    if unknown:
+        raise ValueError(f"Unknown strategy2_data columns: {sorted(unknown)}")
+    set_clause = ', '.join(f'"{column}" = ?' for column in columns)
+    return f'UPDATE strategy2_data SET {set_clause} WHERE ticker = ? AND timestamp = ?'
 
+@DB_WRITE_SECONDS.labels('log_strategy2_data').time()
+def log_strategy2_data(data):
+    columns = tuple(data)
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute(_strategy2_insert_sql(columns), [data[column] for column in columns])
     conn.commit()
     conn.close()
 
+@DB_WRITE_SECONDS.labels('update_strategy2_data').time()
 def update_strategy2_data(ticker, timestamp, data):
-    conn = sqlite3.connect(DB_FILE)
+    columns = tuple(key for key in data if key not in ('ticker', 'timestamp'))
+    params = [data[column] for column in columns]
+    params.extend([ticker, timestamp])
+
+    conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
+    cursor.execute(_strategy2_update_sql(columns), params)
+    conn.commit()
+    conn.close()
 
-    set_clause = ', '.join(f"{key}=?" for key in data.keys() if key not in ['ticker', 'timestamp'])
-    sql = f'''
-        UPDATE strategy2_data
-        SET {set_clause}
-        WHERE ticker=? AND timestamp=?
-    '''
-    params = [data[key] for key in data if key not in ['ticker', 'timestamp']]
-    params.extend([ticker, timestamp])
+@DB_WRITE_SECONDS.labels('save_strategy2_hour').time()
+def save_strategy2_hour(ticker, timestamp, data, checkpoints):
+    """
+    Write a completed Strategy 2 hour in one transaction.
 
-    cursor.execute(sql, params)
+    The wide strategy2_data row is inserted once with every checkpoint filled
+    in, instead of being inserted and then updated at each checkpoint, and the
+    checkpoints are also written to the narrow strategy2_checkpoints table.
+
+    :param ticker: str, the trading pair
+    :param timestamp: str, ISO timestamp of the start of the hour
+    :param data: dict of strategy2_data columns (hour OHLC and open_5m-style checkpoint columns)
+    :param checkpoints: dict of checkpoint minute -> dict with open, high, low, close and volume
+    """
+    row = dict(data, ticker=ticker, timestamp=timestamp)
+    columns = tuple(column for column in row if column in STRATEGY2_COLUMNS)
+
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute(_strategy2_insert_sql(columns), [row[column] for column in columns])
+    cursor.executemany('''
+        INSERT OR REPLACE INTO strategy2_checkpoints (
+            ticker, hour, checkpoint_minute, open, high, low, close, volume
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [
+        (ticker, timestamp, minute, values.get('open'), values.get('high'),
+         values.get('low'), values.get('close'), values.get('volume'))
+        for minute, values in sorted(checkpoints.items())
+    ])
     conn.commit()
     conn.close()
 
+def get_strategy2_checkpoints(ticker, start_hour=None, end_hour=None, checkpoint_minute=None):
+    """
+    Fetch Strategy 2 checkpoints for a ticker from the narrow table.
+
+    :param start_hour: str, inclusive ISO lower bound on the hour
+    :param end_hour: str, exclusive ISO upper bound on the hour
+    :param checkpoint_minute: int, return only this checkpoint
+    :return: list of dicts ordered by hour and checkpoint minute
+    """
+    conditions, params = ['ticker = ?'], [ticker]
+    if start_hour is not None:
+        conditions.append('hour >= ?')
+        params.append(start_hour)
+    if end_hour is not None:
+        conditions.append('hour < ?')
+        params.append(end_hour)
+    if checkpoint_minute is not None:
+        conditions.append('checkpoint_minute = ?')
+        params.append(checkpoint_minute)
+
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT ticker, hour, checkpoint_minute, open, high, low, close, volume
+        FROM strategy2_checkpoints
+        WHERE {' AND '.join(conditions)}
+        ORDER BY hour, checkpoint_minute
+    ''', params)
+    rows = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return rows
+
+@DB_WRITE_SECONDS.labels('log_trade_open').time()
+@tracer.traced('log_trade_open')
 def log_trade_open(ticker, strategy, side, price, amount, order_id):
     """
     Log the opening of a trade in the database.
@@ -213,19 +522,30 @@ def log_trade_open(ticker, strategy, side, price, amount, order_id):
     cursor = conn.cursor()
     cursor.execute('''
         INSERT INTO trades (
-            ticker, strategy, buy_timestamp, buy_price, buy_amount, order_id
-        ) VALUES (?, ?, ?, ?, ?, ?)
+            ticker, strategy, buy_timestamp, buy_price, buy_amount, order_id, side
+        ) VALUES (?, ?, ?, ?, ?, ?, ?)
     ''', (
         ticker,
         strategy,
         datetime.utcnow().isoformat(),
         price,
         amount,
-        order_id
+        order_id,
+        side
     ))
     conn.commit()
     trade_id = cursor.lastrowid
     conn.close()
+    if _trade_open_listeners:
+        _notify_trade_open({
+            'id': trade_id,
+            'ticker': ticker,
+            'strategy': strategy,
+            'side': side,
+            'price': price,
+            'amount': amount,
+            'order_id': order_id
+        })
     return trade_id
 
 def log_trade_close(trade_id, sell_price, sell_amount, profit_loss):
@@ -237,21 +557,7 @@ def log_trade_close(trade_id, sell_price, sell_amount, profit_loss):
     :param sell_amount: float, the amount sold
     :param profit_loss: float, the profit or loss from the trade
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
-        UPDATE trades
-        SET sell_timestamp = ?, sell_price = ?, sell_amount = ?, profit_loss = ?
-        WHERE id = ?
-    ''', (
-        datetime.utcnow().isoformat(),
-        sell_price,
-        sell_amount,
-        profit_loss,
-        trade_id
-    ))
-    conn.commit()
-    conn.close()
+    _close_trade(trade_id, datetime.utcnow().isoformat(), sell_price, sell_amount, profit_loss)
 
 def get_latest_buy_trade(ticker, strategy):
     """
@@ -283,21 +589,13 @@ def update_trade_with_sell_info(trade_id, sell_info):
     """
     Update the trade record with sell information.
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
-        UPDATE trades
-        SET sell_timestamp = ?, sell_price = ?, sell_amount = ?, profit_loss = ?
-        WHERE id = ?
-    ''', (
+    _close_trade(
+        trade_id,
         sell_info.get('sell_timestamp'),
         sell_info.get('sell_price'),
         sell_info.get('sell_amount'),
-        sell_info.get('profit_loss'),
-        trade_id
-    ))
-    conn.commit()
-    conn.close()
+        sell_info.get('profit_loss')
+    )
 
 def get_trades(strategy):
     """
@@ -311,23 +609,73 @@ def get_trades(strategy):
     trades = cursor.fetchall()
     conn.close()
     # Convert to list of dictionaries
-    trades_list = []
-    for trade in trades:
-        trades_list.append({
-            'id': trade[0],
-            'ticker': trade[1],
-            'strategy': trade[2],
-            'buy_timestamp': trade[3],
-            'buy_price': trade[4],
-            'buy_amount': trade[5],
-            'sell_timestamp': trade[6],
-            'sell_price': trade[7],
-            'sell_amount': trade[8],
-            'profit_loss': trade[9],
-            'order_id': trade[10]  # Added order_id
-        })
-    return trades_list
+    return [_trade_row_to_dict(trade) for trade in trades]
+
+def get_open_trades():
+    """
+    Retrieve all trades that have not been closed yet.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT * FROM trades WHERE sell_timestamp IS NULL
+    ''')
+    trades = cursor.fetchall()
+    conn.close()
+    return [_trade_row_to_dict(trade) for trade in trades]
+
+def get_trade_strategies():
+    """
+    Retrieve the names of all strategies that have recorded trades.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute('SELECT DISTINCT strategy FROM trades')
+    strategies = [row[0] for row in cursor.fetchall()]
+    conn.close()
+    return strategies
+
+def get_loss_streak(strategy):
+    """
+    Count the consecutive losing trades most recently closed for a strategy.
+
+    :param strategy: str, the strategy name
+    :return: int, the number of losses since the last non-losing close
+    """
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT profit_loss FROM trades
+        WHERE strategy = ? AND profit_loss IS NOT NULL
+        ORDER BY sell_timestamp DESC, id DESC
+    ''', (strategy,))
+    streak = 0
+    for (profit_loss,) in cursor:
+        if profit_loss >= 0:
+            break
+        streak += 1
+    conn.close()
+    return streak
+
+def get_closed_trades_since(strategy, since):
+    """
+    Retrieve (buy_timestamp, profit_loss) for closed trades bought at or after `since`.
+
+    :param strategy: str, the strategy name
+    :param since: str, ISO timestamp lower bound on buy_timestamp
+    :return: list of (str, float) tuples
+    """
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT buy_timestamp, profit_loss FROM trades
+        WHERE strategy = ? AND buy_timestamp >= ? AND profit_loss IS NOT NULL
+    ''', (strategy, since))
+    trades = cursor.fetchall()
+    conn.close()
+    return trades
 
+@DB_WRITE_SECONDS.labels('log_error').time()
 def log_error(error_message):
     """
     Log an error message to the database.
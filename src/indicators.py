@@ -1,19 +1,17 @@
 # indicators.py
 
-import pandas as pd
-import ta
 import logging
-from datetime import datetime, timezone
+from metrics import histogram
+from tracing import tracer
+from logging_setup import get_logger
 
 # Configure logging for indicators
-logger = logging.getLogger('indicators')
-logger.setLevel(logging.DEBUG)
-handler = logging.StreamHandler()
-formatter = logging.Formatter('%(asctime)s:%(levelname)s:%(message)s')
-handler.setFormatter(formatter)
-if not logger.handlers:
-    logger.addHandler(handler)
+logger = get_logger('indicators')
 
+INDICATOR_SECONDS = histogram('calculate_indicators_seconds', 'Time spent computing indicators for one frame.')
+
+@INDICATOR_SECONDS.labels().time()
+@tracer.traced('calculate_indicators', ticker_param=None)
 def calculate_indicators(df):
     """
     Calculate technical indicators and add them to the DataFrame.
@@ -21,6 +19,8 @@ def calculate_indicators(df):
     :param df: DataFrame with candle data
     :return: DataFrame with indicators
     """
+    import ta  # Deferred: importing ta pulls in its whole indicator library
+
     try:
         # Ensure necessary columns are present
         required_columns = ['timestamp', 'open', 'high', 'low', 'close']
@@ -46,8 +46,9 @@ def calculate_indicators(df):
         df.loc[df['PSAR'] < df['close'], 'PSAR_trend'] = 1  # Bullish trend
         df.loc[df['PSAR'] > df['close'], 'PSAR_trend'] = -1  # Bearish trend
 
-        # After determining PSAR trend
-        logger.debug(f"PSAR trend values:\n{df[['timestamp', 'PSAR_trend']].tail()}")
+        # After determining PSAR trend; formatting the frame is only worth it when DEBUG is on
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"PSAR trend values:\n{df[['timestamp', 'PSAR_trend']].tail()}")
 
         # Stochastic Oscillators with multiple window settings
         # STOCH_K_9_3
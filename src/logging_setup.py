@@ -0,0 +1,192 @@
+# logging_setup.py
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from config.config import LOGGING_PARAMS
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TEXT_FORMAT = '%(asctime)s:%(levelname)s:%(name)s:%(message)s'
+
+# LogRecord attributes that are not `extra=` fields
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats a record as one JSON object per line.
+
+    Fields passed with `extra=` are included as top-level keys.
+    """
+
+    _encoder = json.JSONEncoder(default=str)
+
+    def __init__(self):
+        super().__init__()
+        self._second = None
+        self._second_text = None
+
+    def _time(self, record):
+        # The date part only changes once a second
+        second = int(record.created)
+        if second != self._second:
+            self._second = second
+            self._second_text = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(second))
+        return f"{self._second_text}.{int(record.msecs):03d}Z"
+
+    def format(self, record):
+        entry = {
+            'time': self._time(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage()
+        }
+        for key in record.__dict__.keys() - _RECORD_ATTRIBUTES:
+            if not key.startswith('_'):
+                entry[key] = record.__dict__[key]
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc_info'] = record.exc_text
+        if record.stack_info:
+            entry['stack_info'] = record.stack_info
+        return self._encoder.encode(entry)
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread with as little work as possible on the caller.
+
+    The message is merged with its args up front (the args may be mutated once
+    the call returns) but the record is not copied and formatting, including
+    tracebacks, happens on the listener thread. The queue is unbounded and
+    lock-free for the caller, so logging never blocks a trading thread.
+    """
+
+    def prepare(self, record):
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def handle(self, record):
+        # Skip the per-handler lock: SimpleQueue.put is already thread-safe
+        rv = self.filter(record)
+        if rv:
+            self.emit(record)
+        return rv
+
+def _file_handler(path, params, name=None):
+    path = path if os.path.isabs(path) else os.path.join(BASE_DIR, path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    file_handler = RotatingFileHandler(path, maxBytes=params['max_bytes'], backupCount=params['backup_count'],
+                                       delay=True)
+    file_handler.setFormatter(JsonFormatter())
+    if name is not None:
+        file_handler.addFilter(logging.Filter(name))
+    return file_handler
+
+def build_handlers(params=None):
+    """
+    Create the output handlers the listener thread writes to.
+
+    :param params: dict shaped like LOGGING_PARAMS
+    :return: list of logging.Handler
+    """
+    params = LOGGING_PARAMS if params is None else params
+    handlers = []
+    if params.get('console'):
+        console = logging.StreamHandler(sys.stderr)
+        if params.get('console_format') == 'json':
+            console.setFormatter(JsonFormatter())
+        else:
+            console.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers.append(console)
+    if params.get('file'):
+        handlers.append(_file_handler(params['file'], params))
+    for name, path in params.get('module_files', {}).items():
+        handlers.append(_file_handler(path, params, name))
+    return handlers
+
+_SRCFILE = logging._srcfile
+
+def set_caller_info(enabled):
+    """
+    Turn collection of the caller's file/line and process details on or off for every record.
+
+    Neither output format uses them and looking up the caller is the largest
+    cost of creating a record (see "Optimization" in the logging HOWTO).
+    """
+    logging._srcfile = _SRCFILE if enabled else None
+    logging.logProcesses = enabled
+    logging.logMultiprocessing = enabled
+
+_listener = None
+_lock = threading.Lock()
+
+def configure_logging(params=None, handlers=None):
+    """
+    Route every record through a queue to one background listener thread.
+
+    Installs a NonBlockingQueueHandler on the root logger and applies the
+    per-logger levels from config. Safe to call more than once; only the first
+    call has an effect until shutdown_logging().
+
+    :param params: dict shaped like LOGGING_PARAMS
+    :param handlers: list of output handlers, defaults to build_handlers(params)
+    :return: QueueListener
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+    with _lock:
+        if _listener is not None:
+            return _listener
+        params = LOGGING_PARAMS if params is None else params
+        log_queue = queue.SimpleQueue()
+        listener = QueueListener(log_queue, *(build_handlers(params) if handlers is None else handlers),
+                                 respect_handler_level=True)
+        root = logging.getLogger()
+        for existing in [h for h in root.handlers if isinstance(h, NonBlockingQueueHandler)]:
+            root.removeHandler(existing)
+        root.addHandler(NonBlockingQueueHandler(log_queue))
+        root.setLevel(params['level'])
+        set_caller_info(params.get('caller_info', True))
+        for name, level in params.get('levels', {}).items():
+            logging.getLogger(name).setLevel(level)
+        listener.start()
+        _listener = listener
+        atexit.register(shutdown_logging)
+    return _listener
+
+def shutdown_logging():
+    """
+    Write out queued records and stop the listener thread.
+    """
+    global _listener
+    with _lock:
+        listener, _listener = _listener, None
+        if listener is None:
+            return
+        listener.stop()
+        root = logging.getLogger()
+        for existing in [h for h in root.handlers if isinstance(h, NonBlockingQueueHandler)]:
+            root.removeHandler(existing)
+        for output in listener.handlers:
+            output.close()
+
+def get_logger(name):
+    """
+    Return the named logger, configuring the shared pipeline on first use.
+
+    Modules only create their logger; handlers live on the root logger and
+    levels come from LOGGING_PARAMS['levels'].
+    """
+    configure_logging()
+    return logging.getLogger(name)
@@ -4,118 +4,118 @@ import sys
 import os
 import threading
 import time
-import logging
-import sqlite3
-import pandas as pd
-import schedule
-from datetime import datetime, timedelta, timezone
 
 # Add the parent directory to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config.config import TICKERS, DB_FILE, SCENARIO
+from config.config import TICKERS, DB_FILE, SCENARIO, SNAPSHOT_PARAMS, TRACING_PARAMS, PROFILER_PARAMS, UNIVERSE_PARAMS, MARKET_DATA_PLANE_PARAMS, STRATEGY2_CAPTURE_PARAMS, STARTUP_PARAMS, get_settings
 from data_fetcher import start_data_fetcher
 from indicators import calculate_indicators
 from strategy1 import schedule_strategy1
 from strategy2 import run_strategy2
 from db_manager import initialize_db, log_error
-from logging.handlers import RotatingFileHandler
+from risk_manager import initialize_risk_state
+from risk_gate import pre_trade_gate
 from notifier import send_email
 from reporting import send_daily_report
-
-# Configure logging
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-LOGS_DIR = os.path.join(BASE_DIR, 'logs')
-if not os.path.exists(LOGS_DIR):
-    os.makedirs(LOGS_DIR)
-
-log_file = os.path.join(LOGS_DIR, 'main.log')
-logger = logging.getLogger('main')
-logger.setLevel(logging.INFO)
-handler = RotatingFileHandler(
-    log_file, maxBytes=5 * 1024 * 1024, backupCount=5
-)
-formatter = logging.Formatter('%(asctime)s:%(levelname)s:%(message)s')
-handler.setFormatter(formatter)
-if not logger.handlers:
-    logger.addHandler(handler)
-
-def clean_old_candlestick_data():
-    try:
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
-
-        # Get current UTC time
-        now = datetime.utcnow()
-
-        # Calculate the cutoff time (24 hours ago)
-        cutoff_time = now - timedelta(hours=24)
-        cutoff_timestamp = cutoff_time.isoformat()
-
-        # Get all table names starting with 'candlesticks_'
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name LIKE 'candlesticks_%';")
-        tables = cursor.fetchall()
-
-        for (table_name,) in tables:
-            logger.info(f"Cleaning old data from {table_name}.")
-            cursor.execute(f"DELETE FROM {table_name} WHERE timestamp < ?", (cutoff_timestamp,))
-            conn.commit()
-            logger.info(f"Old data deleted from {table_name}.")
-
-        conn.close()
-        logger.info("Cleaned old candlestick data from all tables.")
-    except Exception as e:
-        logger.error(f"Error while cleaning old candlestick data: {e}")
+from scheduler import scheduler
+from startup import StartupOrchestrator
+from process_websocket_data import historical_data
+from market_snapshot import save_snapshot, warm_start
+from resampler import resampler
+from strategy2_capture import checkpoint_recorder
+from retention import run_retention
+from tracing import tracer
+from universe import universe
+import websocket_client
+import market_data_plane
+import metrics
+import profiler
+from logging_setup import get_logger, shutdown_logging
+
+# Configure logging (also written to logs/main.log, see LOGGING_PARAMS)
+logger = get_logger('main')
 
 def run_scheduler():
-    try:
-        # Schedule the daily report at 7 AM UTC
-        schedule.every().day.at("07:00").do(send_daily_report)
-        # Schedule the cleanup function to run daily at 00:00 UTC
-        schedule.every().day.at("00:00").do(clean_old_candlestick_data)
-
-        while True:
-            schedule.run_pending()
-            time.sleep(60)  # Wait one minute between checks
-    except Exception as e:
-        logger.error(f"Scheduler encountered an error: {e}")
-
-def main():
+    # Schedule the daily report at 7 AM UTC
+    scheduler.daily_at("07:00", send_daily_report)
+    # Apply database retention (archive, chunked deletes, vacuum) daily at 00:00 UTC
+    scheduler.daily_at("00:00", run_retention)
+    # Snapshot market data periodically for fast warm restarts
+    scheduler.every(SNAPSHOT_PARAMS['interval'], save_snapshot, name='market_snapshot')
+    # Close 1-minute bars of tickers that have not traded since the minute ended
+    scheduler.at_bar_close(60, resampler.close_elapsed, settle_delay=1, name='close_1m_bars')
+    if STRATEGY2_CAPTURE_PARAMS['enabled']:
+        # Write the hours Strategy 2 recorded once they have closed
+        scheduler.at_bar_close(3600, checkpoint_recorder.flush_completed, name='strategy2_checkpoints')
+    # Log the per-stage tick-to-order latency breakdown
+    scheduler.every(TRACING_PARAMS['report_interval'], tracer.log_report, name='latency_report')
+    if UNIVERSE_PARAMS['enabled']:
+        # Re-rank the universe and screen the watched tickers after every 15-minute close
+        scheduler.every(UNIVERSE_PARAMS['refresh_interval'], universe.refresh, name='universe_refresh')
+        scheduler.at_bar_close(900, universe.candidate_indicators,
+                               settle_delay=UNIVERSE_PARAMS['screen']['settle_delay'], name='universe_screen')
+    scheduler.start()
+
+def initialize_storage():
     initialize_db()
     logger.info("Database initialized.")
+    initialize_risk_state()
+    pre_trade_gate.rebuild()
+    logger.info("Risk state loaded.")
 
-    # Start data fetching in a separate thread with Scenario A or B as needed
-    scenario = SCENARIO  # Get scenario from config
+def warm_history():
+    # Restored from the last snapshot plus the gap since, or fetched once in parallel,
+    # and shared by the websocket processor and the data fetcher
+    warm_start()
+    logger.info(f"Historical data warmed for {len(historical_data)} tickers.")
 
-    # Start Strategy 1 first
-    strategy1_thread = threading.Thread(target=schedule_strategy1, args=(scenario,))
-    strategy1_thread.daemon = True
-    strategy1_thread.start()
-    logger.info("Strategy 1 started.")
-
-    # Wait to ensure Strategy 1 has started and completed initial data fetching
-    time.sleep(20)  # Reduced sleep time to 20 seconds
+def main():
+    # Fail fast on missing credentials; importing modules no longer checks them
+    get_settings().validate()
 
-    # Start data fetcher (for continuous data fetching if applicable)
-    data_fetcher_thread = threading.Thread(target=start_data_fetcher, args=(scenario,), daemon=True)
-    data_fetcher_thread.start()
-    logger.info("Data fetcher started.")
+    scenario = SCENARIO  # Get scenario from config
 
-    # Start Strategy 2
-    strategy2_thread = threading.Thread(target=run_strategy2, args=(scenario,), daemon=True)
-    strategy2_thread.start()
-    logger.info("Strategy 2 started.")
+    # Each component starts as soon as the components it requires are ready
+    startup = StartupOrchestrator()
+    startup.add('metrics', metrics.start_http_server)
+    if PROFILER_PARAMS['enabled']:
+        # Signal handlers can only be installed from the main thread
+        profiler.install_signal_handler()
+        startup.add('profiler', profiler.start_http_server)
+    startup.add('db', initialize_storage)
+    # The universe decides which tickers get history and subscriptions
+    if UNIVERSE_PARAMS['enabled']:
+        startup.add('universe', universe.refresh)
+    startup.add('history', warm_history, requires=['universe'] if UNIVERSE_PARAMS['enabled'] else [])
+    if UNIVERSE_PARAMS['enabled']:
+        # Strategies evaluate the screened candidates (universe.strategy_tickers), so screen once before they start
+        startup.add('universe_screen', universe.candidate_indicators, requires=['history'])
+    strategy_requires = ['db', 'history', 'universe_screen'] if UNIVERSE_PARAMS['enabled'] else ['db', 'history']
+    if MARKET_DATA_PLANE_PARAMS['enabled']:
+        # Seeded from the resampler, so it must exist before the first tick is published
+        startup.add('market_data_plane', market_data_plane.start_plane, requires=['history'])
+    if STARTUP_PARAMS['start_websocket']:
+        startup.add('websocket', websocket_client.run_websocket,
+                    requires=['history', 'market_data_plane'] if MARKET_DATA_PLANE_PARAMS['enabled'] else ['history'],
+                    background=True, ready_event=websocket_client.subscribed)
+    startup.add('data_fetcher', lambda: start_data_fetcher(scenario, history=historical_data),
+                requires=['db', 'history'], background=scenario == 'B')
+    startup.add('strategy1', lambda: schedule_strategy1(scenario), requires=strategy_requires, background=True)
+    startup.add('strategy2', lambda: run_strategy2(scenario), requires=strategy_requires, background=True)
+    # Register the daily jobs with the shared scheduler
+    startup.add('scheduler', run_scheduler, requires=['db'])
+
+    if startup.run():
+        logger.info("All components started.")
+    else:
+        logger.error("Some components failed to start; see the startup timing report.")
 
     # Send initialization email
     subject = "Trading Bot Initialized"
-    body = "The trading bot has started."
+    body = f"The trading bot has started.\n\n{startup.report()}"
     send_email(subject, body)
 
-    # Start the scheduler in a separate thread
-    scheduler_thread = threading.Thread(target=run_scheduler)
-    scheduler_thread.daemon = True
-    scheduler_thread.start()
-
     # Keep main thread alive
     try:
         while True:
@@ -124,6 +124,20 @@ def main():
         logger.info("Trading bot stopped by user.")
     finally:
         logger.info("Shutting down...")
+        scheduler.stop(wait=False)
+        tracer.log_report()
+        if STRATEGY2_CAPTURE_PARAMS['enabled']:
+            # Buffered hours are otherwise only written at hour close
+            try:
+                checkpoint_recorder.flush_all()
+            except Exception as e:
+                logger.error(f"Failed to save Strategy 2 checkpoints on shutdown: {e}")
+        try:
+            save_snapshot()
+        except Exception as e:
+            logger.error(f"Failed to save market snapshot on shutdown: {e}")
+        market_data_plane.stop_plane()
+        shutdown_logging()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
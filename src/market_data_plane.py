@@ -0,0 +1,364 @@
+# market_data_plane.py
+
+import sys
+import threading
+import time
+import numpy as np
+from config.config import MARKET_DATA_PLANE_PARAMS, TICKERS
+from resampler import FIELDS, aggregate
+from logging_setup import get_logger
+
+# Configure logging
+logger = get_logger('market_data_plane')
+
+# Segment layout: MAGIC, int64 max_tickers, capacity and ticker_count, then the
+# arrays below, each starting on an ALIGNMENT boundary. Both sides compute the
+# offsets from (max_tickers, capacity), so readers only need the segment name.
+MAGIC = b'369MDP01'
+ALIGNMENT = 64
+NAME_BYTES = 32
+LATEST_FIELDS = ('price', 'size', 'time', 'bid', 'ask')
+BAR_COLUMNS = 1 + len(FIELDS)  # Bar open time, then open, high, low, close, volume
+
+_created = set()  # Segments created by a writer in this process
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def _layout(max_tickers, capacity):
+    """
+    Return ({array name: (offset, dtype, shape)}, total bytes) for a segment.
+    """
+    arrays = (
+        ('names', f'S{NAME_BYTES}', (max_tickers,)),
+        ('seq', np.uint64, (max_tickers,)),  # Seqlock: odd while the ticker is being written
+        ('count', np.int64, (max_tickers,)),  # Bars appended since the ticker was loaded
+        ('latest', np.float64, (max_tickers, len(LATEST_FIELDS))),
+        ('bars', np.float64, (max_tickers, capacity, BAR_COLUMNS))  # Ring of 1-minute bars
+    )
+    layout = {}
+    offset = _align(len(MAGIC) + 3 * 8)
+    for name, dtype, shape in arrays:
+        layout[name] = (offset, np.dtype(dtype), shape)
+        offset = _align(offset + np.dtype(dtype).itemsize * int(np.prod(shape)))
+    return layout, offset
+
+def _views(buffer, layout):
+    return {
+        name: np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+        for name, (offset, dtype, shape) in layout.items()
+    }
+
+class MarketDataWriter:
+    """
+    Owns the shared-memory segment and is its only writer.
+
+    Holds, per ticker, the latest ticker message and a ring of 1-minute bars
+    whose newest entry is the bar still forming. Every update of a ticker is
+    bracketed by two increments of its sequence number (a seqlock), so readers
+    in other processes can detect and retry a read that overlapped a write
+    without any lock on the writer's side. The one lock is taken only to give
+    a new ticker its slot, since sharded websocket workers publish
+    concurrently; updates of one ticker come from one worker at a time.
+    """
+
+    def __init__(self, tickers=None, name=None, max_tickers=None, capacity=None):
+        from multiprocessing import shared_memory  # Deferred: only when the plane is enabled
+
+        params = MARKET_DATA_PLANE_PARAMS
+        self.name = name or params['name']
+        self.max_tickers = params['max_tickers'] if max_tickers is None else max_tickers
+        self.capacity = params['capacity'] if capacity is None else capacity
+        layout, size = _layout(self.max_tickers, self.capacity)
+        try:
+            self._shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a writer that did not shut down cleanly
+            stale = shared_memory.SharedMemory(name=self.name)
+            stale.close()
+            stale.unlink()
+            self._shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        buffer = self._shm.buf
+        self._header = np.ndarray((3,), dtype=np.int64, buffer=buffer, offset=len(MAGIC))
+        self._header[:] = (self.max_tickers, self.capacity, 0)
+        arrays = _views(buffer, layout)
+        self._names = arrays['names']
+        self._seq = arrays['seq']
+        self._count = arrays['count']
+        self._latest = arrays['latest']
+        self._bars = arrays['bars']
+        self._latest[:] = np.nan
+        self._slots = {}
+        self._slot_lock = threading.Lock()
+        _created.add(self.name)
+        buffer[:len(MAGIC)] = MAGIC  # Written last: readers attach once the header is complete
+        for ticker in TICKERS if tickers is None else tickers:
+            self._slot(ticker)
+        logger.info(
+            f"Market data plane '{self.name}' created: {size / 1e6:.1f} MB for up to {self.max_tickers} "
+            f"tickers x {self.capacity} bars."
+        )
+
+    def _slot(self, ticker):
+        slot = self._slots.get(ticker)
+        if slot is not None:
+            return slot
+        with self._slot_lock:
+            slot = self._slots.get(ticker)  # Another worker may have added it meanwhile
+            if slot is None:
+                slot = len(self._slots)
+                if slot >= self.max_tickers:
+                    raise ValueError(f"Market data plane is full ({self.max_tickers} tickers); cannot add {ticker}.")
+                self._names[slot] = ticker.encode()
+                self._slots[ticker] = slot
+                self._header[2] = slot + 1  # Published after the name so readers never see a blank slot
+        return slot
+
+    def load_bars(self, ticker, timestamps, values):
+        """
+        Replace a ticker's bars, e.g. with the resampler's history at startup.
+
+        :param timestamps: int64 array of bar open times in epoch seconds
+        :param values: float64 array of shape (n, 5) with open, high, low, close, volume
+        """
+        slot = self._slot(ticker)
+        n = min(len(timestamps), self.capacity)
+        seq = self._seq
+        seq[slot] += 1
+        bars = self._bars[slot]
+        bars[:n, 0] = timestamps[len(timestamps) - n:]
+        bars[:n, 1:] = values[len(values) - n:]
+        self._count[slot] = n
+        seq[slot] += 1
+
+    def on_tick(self, ticker, price, size, timestamp, bid=np.nan, ask=np.nan):
+        """
+        Publish a ticker message: update the latest values and fold it into the forming 1-minute bar.
+        """
+        slot = self._slots.get(ticker)
+        if slot is None:
+            slot = self._slot(ticker)
+        minute = timestamp // 60 * 60
+        seq = self._seq
+        seq[slot] += 1
+        latest = self._latest[slot]
+        latest[0] = price
+        latest[1] = size
+        latest[2] = timestamp
+        latest[3] = bid
+        latest[4] = ask
+        count = int(self._count[slot])
+        bar = self._bars[slot, (count - 1) % self.capacity] if count else None
+        if bar is None or minute > bar[0]:
+            self._bars[slot, count % self.capacity] = (minute, price, price, price, price, size)
+            self._count[slot] = count + 1
+        elif minute == bar[0]:
+            if price > bar[2]:
+                bar[2] = price
+            if price < bar[3]:
+                bar[3] = price
+            bar[4] = price
+            bar[5] += size
+        seq[slot] += 1  # Ticks for an already closed minute only update the latest values
+
+    def close(self, unlink=True):
+        self._names = self._seq = self._count = self._latest = self._bars = self._header = None
+        self._shm.close()
+        if unlink:
+            self._shm.unlink()
+            _created.discard(self.name)
+
+class TornReadError(RuntimeError):
+    """Raised when a consistent read could not be made, e.g. the writer died mid-update."""
+
+class MarketDataReader:
+    """
+    Read-only view of a market data plane, for use in any process.
+
+    The arrays are mapped straight from shared memory; nothing is pickled or
+    sent over a pipe. Reads copy only the requested rows and retry if the
+    writer updated the ticker meanwhile. version() changes on every update of
+    a ticker, so a worker can skip work when nothing has changed.
+    """
+
+    def __init__(self, name=None):
+        import multiprocessing
+        from multiprocessing import shared_memory
+
+        self.name = name or MARKET_DATA_PLANE_PARAMS['name']
+        self._shm = shared_memory.SharedMemory(name=self.name)
+        if sys.version_info < (3, 13) and self.name not in _created and multiprocessing.parent_process() is None:
+            # Attaching registers the segment with this process's resource
+            # tracker, which would unlink it on exit; the writer owns it.
+            # Processes started by multiprocessing share their parent's
+            # tracker, so they must leave the writer's registration alone
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(self._shm._name, 'shared_memory')
+        buffer = self._shm.buf
+        if bytes(buffer[:len(MAGIC)]) != MAGIC:
+            self._shm.close()
+            raise ValueError(f"Shared memory segment '{self.name}' is not a market data plane.")
+        self._header = np.ndarray((3,), dtype=np.int64, buffer=buffer, offset=len(MAGIC))
+        self.max_tickers, self.capacity = int(self._header[0]), int(self._header[1])
+        arrays = _views(buffer, _layout(self.max_tickers, self.capacity)[0])
+        self._names = arrays['names']
+        self._seq = arrays['seq']
+        self._count = arrays['count']
+        self._latest = arrays['latest']
+        self._bars = arrays['bars']
+        self._slots = {}
+        self.retries = 0
+        self.max_retries = MARKET_DATA_PLANE_PARAMS['read_retries']
+
+    def tickers(self):
+        count = int(self._header[2])
+        return [name.decode() for name in self._names[:count]]
+
+    def _slot(self, ticker):
+        slot = self._slots.get(ticker)
+        if slot is None:
+            self._slots = {ticker: i for i, ticker in enumerate(self.tickers())}
+            slot = self._slots.get(ticker)
+            if slot is None:
+                raise KeyError(ticker)
+        return slot
+
+    def _read(self, slot, copy):
+        seq = self._seq
+        for attempt in range(self.max_retries):
+            before = int(seq[slot])
+            if not before & 1:
+                result = copy()
+                if int(seq[slot]) == before:
+                    return result
+            self.retries += 1
+            if attempt > 100:
+                time.sleep(0)  # Let a descheduled writer finish
+        raise TornReadError(f"No consistent read of slot {slot} after {self.max_retries} attempts.")
+
+    def version(self, ticker):
+        """
+        Return the ticker's sequence number; it changes on every update.
+        """
+        return int(self._seq[self._slot(ticker)])
+
+    def latest(self, ticker):
+        """
+        Return the latest ticker values: dict with price, size, time, bid and ask.
+        """
+        slot = self._slot(ticker)
+        values = self._read(slot, lambda: self._latest[slot].copy())
+        return dict(zip(LATEST_FIELDS, values.tolist()))
+
+    def bars(self, ticker, limit=None, include_partial=True):
+        """
+        Return the most recent 1-minute bars.
+
+        :param limit: int, number of bars (defaults to all that are kept)
+        :param include_partial: bool, include the bar that is still forming
+        :return: tuple (int64 array of bar open times, float64 array of shape (n, 5))
+        """
+        slot = self._slot(ticker)
+        capacity = self.capacity
+
+        def copy():
+            count = int(self._count[slot])
+            kept = min(count, capacity)
+            n = kept if limit is None else min(limit, kept)
+            start = count - n
+            if not n:
+                # No bars yet, or limit=0; the ring's unused rows are not bars
+                return np.empty((0, BAR_COLUMNS), dtype=np.float64)
+            first, last = start % capacity, (start + n - 1) % capacity + 1
+            if first < last:
+                return self._bars[slot, first:last].copy()
+            # Wrapped around the end of the ring
+            return np.concatenate([self._bars[slot, first:], self._bars[slot, :last]])
+
+        block = self._read(slot, copy)
+        if not include_partial and len(block):
+            forming_minute = time.time() // 60 * 60
+            if block[-1, 0] >= forming_minute:
+                block = block[:-1]
+        return block[:, 0].astype(np.int64), block[:, 1:]
+
+    def frame(self, ticker, minutes=1, limit=None, include_partial=False):
+        """
+        Return bars as a DataFrame shaped like resampler.bars(), aggregated to `minutes`.
+        """
+        import pandas as pd
+
+        timestamps, values = self.bars(ticker, include_partial=include_partial)
+        if minutes != 1:
+            timestamps, values = aggregate(timestamps, values, minutes)
+        if limit is not None:
+            timestamps, values = timestamps[-limit:], values[-limit:]
+        df = pd.DataFrame(values, columns=FIELDS)
+        df.insert(0, 'timestamp', pd.to_datetime(timestamps, unit='s', utc=True))
+        return df
+
+    def close(self):
+        self._names = self._seq = self._count = self._latest = self._bars = self._header = None
+        self._shm.close()
+
+def _worker_main(name, target, args):
+    reader = MarketDataReader(name)
+    try:
+        target(reader, *args)
+    finally:
+        reader.close()
+
+def spawn_worker(target, *args, name=None, segment=None):
+    """
+    Run target(reader, *args) in a new process with a MarketDataReader attached.
+
+    Processes are started with the 'spawn' method, so `target` must be a
+    module-level function and the worker does not inherit the parent's
+    threads, sockets or locks.
+
+    :return: multiprocessing.Process, already started
+    """
+    import multiprocessing
+
+    context = multiprocessing.get_context('spawn')
+    process = context.Process(
+        target=_worker_main, args=(segment or MARKET_DATA_PLANE_PARAMS['name'], target, args),
+        name=name or getattr(target, '__name__', 'market-data-worker'), daemon=True
+    )
+    process.start()
+    logger.info(f"Started worker {process.name} (pid {process.pid}) on the market data plane.")
+    return process
+
+writer = None
+
+def start_plane(tickers=None):
+    """
+    Create the shared segment in this (the ingestion) process and seed it from the resampler.
+
+    :return: MarketDataWriter
+    """
+    global writer
+    from resampler import resampler
+
+    plane = MarketDataWriter(tickers)
+    for ticker in TICKERS if tickers is None else tickers:
+        df = resampler.bars(ticker, 1, include_partial=True, limit=plane.capacity)
+        if not df.empty:
+            plane.load_bars(ticker, df['timestamp'].dt.as_unit('s').astype('int64').to_numpy(),
+                            df[list(FIELDS)].to_numpy(dtype=np.float64))
+    writer = plane
+    return plane
+
+def publish_tick(ticker, price, size, timestamp, bid=np.nan, ask=np.nan):
+    """
+    Forward a ticker message to the plane; does nothing unless start_plane() has run.
+    """
+    plane = writer
+    if plane is not None:
+        plane.on_tick(ticker, price, size, timestamp, bid, ask)
+
+def stop_plane():
+    global writer
+    plane, writer = writer, None
+    if plane is not None:
+        plane.close()
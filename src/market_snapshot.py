@@ -0,0 +1,212 @@
+# market_snapshot.py
+
+import json
+import os
+import struct
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from config.config import SNAPSHOT_PARAMS, STARTUP_PARAMS, TICKERS
+from data_fetcher import fetch_historical_range
+from process_websocket_data import historical_data, history_bars, initialize_ticker_history
+from resampler import resampler
+from logging_setup import get_logger
+
+# Configure logging
+logger = get_logger('market_snapshot')
+
+# File layout: MAGIC, uint32 header length, JSON header, then per ticker an int64
+# nanosecond timestamp array followed by a C-ordered float64 rows x columns
+# matrix, each block starting on an ALIGNMENT boundary so it can be viewed
+# straight out of a memory map. The rows are the resampler's closed 1-minute
+# base bars; the bar still forming is kept in the ticker's header entry.
+MAGIC = b'369SNAP1'
+VERSION = 2  # Version 1 snapshots held 15-minute historical_data frames and are ignored
+ALIGNMENT = 64
+GRANULARITY = 60  # Seconds per bar of the base series
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def save_snapshot(path=None, series=None):
+    """
+    Atomically write every ticker's 1-minute base series, forming bar included, to a binary snapshot.
+
+    The file is written to a temporary name, fsynced and renamed over the old
+    snapshot, so a crash mid-write leaves the previous snapshot intact.
+
+    :param path: str, snapshot file path (defaults to SNAPSHOT_PARAMS['path'])
+    :param series: CandleResampler to snapshot (defaults to the shared resampler)
+    :return: int, bytes written
+    """
+    path = path or SNAPSHOT_PARAMS['path']
+    series = resampler if series is None else series
+
+    entries, blocks = [], []
+    offset = 0
+    for ticker in series.tickers():
+        df, forming = series.base_snapshot(ticker)
+        if df.empty and forming is None:
+            continue
+        columns = [col for col in df.columns if col != 'timestamp' and pd.api.types.is_numeric_dtype(df[col])]
+        timestamps = pd.to_datetime(df['timestamp'], utc=True).dt.as_unit('ns').astype('int64').to_numpy()
+        values = np.ascontiguousarray(df[columns].to_numpy(dtype=np.float64))
+        offset = _align(offset)
+        entries.append({
+            'ticker': ticker,
+            'rows': len(df),
+            'columns': columns,
+            'dtypes': [str(df[col].dtype) for col in columns],
+            'forming': None if forming is None else [float(value) for value in forming],
+            'offset': offset
+        })
+        blocks.append((offset, timestamps.tobytes() + values.tobytes()))
+        offset += len(blocks[-1][1])
+
+    body = bytearray(offset)
+    for block_offset, payload in blocks:
+        body[block_offset:block_offset + len(payload)] = payload
+
+    header = json.dumps({
+        'version': VERSION,
+        'created_at': time.time(),
+        'granularity': GRANULARITY,
+        'crc32': zlib.crc32(body),
+        'entries': entries
+    }).encode()
+    prefix = MAGIC + struct.pack('<I', len(header)) + header
+    data_start = _align(len(prefix))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(prefix)
+        f.write(b'\0' * (data_start - len(prefix)))
+        f.write(body)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+    logger.info(f"Saved market snapshot with {len(entries)} tickers ({data_start + offset} bytes).")
+    return data_start + offset
+
+def load_snapshot(path=None):
+    """
+    Read a snapshot through a memory map.
+
+    :return: tuple (header dict, dict of ticker -> DataFrame of closed 1-minute bars), or
+             (None, {}) if the file is missing or fails validation; each ticker's forming
+             bar is in its header entry
+    """
+    path = path or SNAPSHOT_PARAMS['path']
+    if not os.path.exists(path):
+        return None, {}
+    try:
+        mapped = np.memmap(path, dtype=np.uint8, mode='r')
+        if bytes(mapped[:len(MAGIC)]) != MAGIC:
+            raise ValueError("bad magic")
+        header_length = struct.unpack('<I', bytes(mapped[len(MAGIC):len(MAGIC) + 4]))[0]
+        header_end = len(MAGIC) + 4 + header_length
+        header = json.loads(bytes(mapped[len(MAGIC) + 4:header_end]))
+        if header.get('version') != VERSION:
+            raise ValueError(f"unsupported version {header.get('version')}")
+        body = mapped[_align(header_end):]
+        if zlib.crc32(body) != header['crc32']:
+            raise ValueError("checksum mismatch")
+
+        frames = {}
+        for entry in header['entries']:
+            rows, columns = entry['rows'], entry['columns']
+            start = entry['offset']
+            timestamps = body[start:start + rows * 8].view(np.int64)
+            values_start = start + rows * 8
+            values = body[values_start:values_start + rows * len(columns) * 8].view(np.float64)
+            values = values.reshape(rows, len(columns))
+            df = pd.DataFrame(values, columns=columns)  # Copies out of the map
+            for col, dtype in zip(columns, entry['dtypes']):
+                if dtype != 'float64':
+                    df[col] = df[col].astype(dtype)
+            df.insert(0, 'timestamp', pd.to_datetime(timestamps, unit='ns', utc=True))
+            frames[entry['ticker']] = df
+        return header, frames
+    except Exception as e:
+        logger.error(f"Ignoring unreadable market snapshot {path}: {e}")
+        return None, {}
+
+def _fill_gap(ticker, df, forming):
+    """
+    Restore one ticker's base series, fetching only the 1-minute candles missing since the snapshot.
+
+    historical_data is then derived from the restored series, as on a cold start.
+    """
+    now = datetime.now(timezone.utc)
+    current_minute = pd.Timestamp(now.replace(second=0, microsecond=0))
+    if forming is not None and forming[0] < current_minute.timestamp():
+        # The minute has closed since; the exchange's candle for it replaces this partial bar if there is one
+        closed = pd.DataFrame([forming[1:]], columns=[col for col in df.columns if col != 'timestamp'])
+        closed.insert(0, 'timestamp', pd.to_datetime([forming[0]], unit='s', utc=True))
+        df = pd.concat([df, closed], ignore_index=True)
+        forming = None
+
+    if not df.empty:
+        # The newest saved bar is fetched again in case it was saved before all its trades arrived
+        gap = fetch_historical_range(ticker, df['timestamp'].iloc[-1].to_pydatetime(), now, granularity=GRANULARITY)
+        if gap is not None:
+            gap = gap[gap['timestamp'] < current_minute]  # The current minute is rebuilt from ticks
+            df = pd.concat([df, gap[[col for col in df.columns if col in gap.columns]]], ignore_index=True)
+    resampler.load_base(ticker, df, forming=forming)
+
+    bars = history_bars(ticker)
+    if bars is None:
+        raise ValueError("no 15-minute bars in the restored series")
+    historical_data[ticker] = bars
+
+def warm_start(path=None, tickers=None):
+    """
+    Restore the base series and historical_data from the snapshot, fetching only the gap since it was taken.
+
+    Tickers missing from the snapshot, or all tickers if the snapshot is older
+    than SNAPSHOT_PARAMS['max_age'], get a full history download instead.
+
+    :return: dict with restored, refetched and seconds
+    """
+    start = time.monotonic()
+    tickers = TICKERS if tickers is None else tickers
+    header, frames = load_snapshot(path)
+    snapshot_age = time.time() - header['created_at'] if header else None
+    if snapshot_age is not None and snapshot_age > SNAPSHOT_PARAMS['max_age']:
+        logger.info(f"Market snapshot is {snapshot_age:.0f}s old; refetching full history.")
+        frames = {}
+
+    forming = {entry['ticker']: entry.get('forming') for entry in header['entries']} if header else {}
+    restored = [ticker for ticker in tickers if ticker in frames]
+    missing = [ticker for ticker in tickers if ticker not in frames]
+    with ThreadPoolExecutor(max_workers=STARTUP_PARAMS['history_workers']) as executor:
+        futures = {executor.submit(_fill_gap, ticker, frames[ticker], forming[ticker]): ticker for ticker in restored}
+        futures.update((executor.submit(initialize_ticker_history, ticker), ticker) for ticker in missing)
+        fallback = []
+        for future, ticker in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                # One ticker's bad snapshot entry or gap fetch must not fail the whole warm start
+                logger.error(f"Restoring {ticker} from the snapshot failed; fetching its full history: {e}")
+                fallback.append(ticker)
+        for future in [executor.submit(initialize_ticker_history, ticker) for ticker in fallback]:
+            future.result()
+    restored = [ticker for ticker in restored if ticker not in fallback]
+    missing += fallback
+
+    seconds = time.monotonic() - start
+    logger.info(
+        f"Warm start restored {len(restored)} tickers from snapshot and fetched {len(missing)} in {seconds:.2f}s."
+    )
+    return {'restored': len(restored), 'refetched': len(missing), 'seconds': seconds}
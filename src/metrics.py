@@ -0,0 +1,342 @@
+# metrics.py
+
+import threading
+from bisect import bisect_left
+from functools import wraps
+from threading import get_ident
+from time import perf_counter
+from config.config import METRICS_PARAMS
+from logging_setup import get_logger
+
+# Configure logging
+logger = get_logger('metrics')
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+class Timer:
+    """
+    Observes elapsed seconds into a histogram; usable as a context manager or decorator.
+    """
+
+    __slots__ = ('_histogram', '_start')
+
+    def __init__(self, histogram):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._histogram.observe(perf_counter() - self._start)
+
+    def __call__(self, func):
+        observe = self._histogram.observe
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(perf_counter() - start)
+        return wrapper
+
+class CounterValue:
+    """
+    A monotonically increasing value.
+
+    Each thread increments its own shard, so the hot path takes no lock;
+    get() sums the shards.
+    """
+
+    __slots__ = ('_shards', '_lock')
+
+    def __init__(self):
+        self._shards = {}  # Thread ident -> [value]
+        self._lock = threading.Lock()
+
+    def _new_shard(self):
+        with self._lock:
+            return self._shards.setdefault(get_ident(), [0.0])
+
+    def inc(self, amount=1):
+        shard = self._shards.get(get_ident()) or self._new_shard()
+        shard[0] += amount
+
+    def get(self):
+        return sum(shard[0] for shard in list(self._shards.values()))
+
+class GaugeValue:
+    __slots__ = ('_value', '_lock', '_function')
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+        self._function = None
+
+    def set(self, value):
+        self._value = value
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self._value -= amount
+
+    def set_function(self, function):
+        """
+        Compute the value with `function()` whenever the metrics are read.
+        """
+        self._function = function
+
+    def get(self):
+        if self._function is not None:
+            try:
+                return float(self._function())
+            except Exception:
+                return float('nan')
+        return self._value
+
+class HistogramValue:
+    """
+    Bucketed observations with their sum and maximum, sharded per thread like CounterValue.
+    """
+
+    __slots__ = ('bounds', '_shards', '_lock')
+
+    def __init__(self, bounds):
+        self.bounds = list(bounds)
+        self._shards = {}  # Thread ident -> [bucket counts (last is +Inf), sum, max]
+        self._lock = threading.Lock()
+
+    def _new_shard(self):
+        with self._lock:
+            return self._shards.setdefault(get_ident(), [[0] * (len(self.bounds) + 1), 0.0, 0.0])
+
+    def observe(self, value):
+        shard = self._shards.get(get_ident()) or self._new_shard()
+        shard[0][bisect_left(self.bounds, value)] += 1
+        shard[1] += value
+        if value > shard[2]:
+            shard[2] = value
+
+    def time(self):
+        return Timer(self)
+
+    def get(self):
+        """
+        Return (per-bucket counts, sum, max) summed over the thread shards.
+        """
+        counts = [0] * (len(self.bounds) + 1)
+        total_sum = maximum = 0.0
+        for shard_counts, shard_sum, shard_max in list(self._shards.values()):
+            for i, count in enumerate(shard_counts):
+                counts[i] += count
+            total_sum += shard_sum
+            maximum = max(maximum, shard_max)
+        return counts, total_sum, maximum
+
+    def percentile(self, fraction):
+        """
+        Return the upper bound of the bucket containing the given fraction of observations.
+        """
+        counts, _, maximum = self.get()
+        total = sum(counts)
+        if not total:
+            return None
+        seen = 0
+        for bound, count in zip(self.bounds, counts):
+            seen += count
+            if seen >= fraction * total:
+                return min(bound, maximum)
+        return maximum
+
+    def snapshot(self):
+        counts, total_sum, maximum = self.get()
+        count = sum(counts)
+        return {
+            'count': count,
+            'sum': total_sum,
+            'avg': total_sum / count if count else None,
+            'p50': self.percentile(0.5),
+            'p90': self.percentile(0.9),
+            'p99': self.percentile(0.99),
+            'max': maximum
+        }
+
+class Metric:
+    """
+    A named metric family. Values are kept per label combination; a family
+    without labels forwards inc/set/observe to its single value.
+
+    On hot paths bind the labelled value once (`hist.labels('name')`) and keep
+    the reference, so each event costs a dict lookup and one bisect.
+    """
+
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=(), **options):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.options = options
+        self._values = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_value(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **labels):
+        if labels:
+            values = tuple(labels[name] for name in self.labelnames)
+        key = tuple(str(value) for value in values)
+        value = self._values.get(key)
+        if value is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                value = self._values.setdefault(key, self._new_value())
+        return value
+
+    def items(self):
+        return list(self._values.items())
+
+    def __getattr__(self, name):
+        # Forward inc/set/observe/time/... of label-less metrics to their single value
+        if name != '_default' and '_default' in self.__dict__:
+            return getattr(self._default, name)
+        raise AttributeError(name)
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def _new_value(self):
+        return CounterValue()
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def _new_value(self):
+        return GaugeValue()
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def _new_value(self):
+        return HistogramValue(self.options.get('buckets') or METRICS_PARAMS['buckets'])
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class MetricsRegistry:
+    """
+    Holds every metric family and renders them in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, help_text, labelnames, **options):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, labelnames, **options)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered with a different type or labels.")
+            return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._get_or_create(Counter, name, help_text, labelnames)
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._get_or_create(Gauge, name, help_text, labelnames)
+
+    def histogram(self, name, help_text, labelnames=(), buckets=None):
+        return self._get_or_create(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        """
+        Return all metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for name, metric in sorted(self._metrics.items()):
+            lines.append(f'# HELP {name} {metric.help}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for values, value in sorted(metric.items()):
+                if metric.kind != 'histogram':
+                    lines.append(f'{name}{_format_labels(metric.labelnames, values)} {_format_number(value.get())}')
+                    continue
+                counts, total_sum, _ = value.get()
+                cumulative = 0
+                for bound, count in zip(value.bounds + [float('inf')], counts):
+                    cumulative += count
+                    le = f'le="{_format_number(float(bound))}"'
+                    lines.append(f'{name}_bucket{_format_labels(metric.labelnames, values, le)} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(metric.labelnames, values)} {_format_number(total_sum)}')
+                lines.append(f'{name}_count{_format_labels(metric.labelnames, values)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = MetricsRegistry()
+
+def counter(name, help_text, labelnames=()):
+    return REGISTRY.counter(name, help_text, labelnames)
+
+def gauge(name, help_text, labelnames=()):
+    return REGISTRY.gauge(name, help_text, labelnames)
+
+def histogram(name, help_text, labelnames=(), buckets=None):
+    return REGISTRY.histogram(name, help_text, labelnames, buckets)
+
+def start_http_server(host=None, port=None):
+    """
+    Serve /metrics from a daemon thread.
+
+    :return: ThreadingHTTPServer, already serving
+    """
+    # Deferred: http.server pulls in http.client and email, which every
+    # instrumented module would otherwise pay for at import
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = REGISTRY.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(
+        (host or METRICS_PARAMS['host'], METRICS_PARAMS['port'] if port is None else port), MetricsHandler
+    )
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True)
+    thread.start()
+    logger.info(f"Serving metrics on http://{server.server_address[0]}:{server.server_address[1]}/metrics")
+    return server
@@ -1,48 +1,370 @@
 #notifier.py
 import smtplib
 from email.mime.text import MIMEText
-from config.config import EMAIL_ADDRESS, EMAIL_PASSWORD, PHONE_NUMBER
-import logging
-import os
-from twilio.rest import Client
-from config.config import TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE_NUMBER, PHONE_NUMBER
-
-# Configure logging
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-LOGS_DIR = os.path.join(BASE_DIR, 'logs')
-if not os.path.exists(LOGS_DIR):
-    os.makedirs(LOGS_DIR)
-
-logging.basicConfig(
-    filename=os.path.join(LOGS_DIR, 'notifier.log'),
-    level=logging.INFO,
-    format='%(asctime)s:%(levelname)s:%(message)s'
-)
+import atexit
+import queue
+import threading
+import time
+from config.config import NOTIFICATION_PARAMS, get_settings
+from logging_setup import get_logger
 
-def send_email(subject, body):
-    msg = MIMEText(body)
-    msg['Subject'] = subject
-    msg['From'] = EMAIL_ADDRESS
-    msg['To'] = EMAIL_ADDRESS
-
-    try:
-        # Send the email via SMTP server
-        with smtplib.SMTP('smtp.gmail.com', 587) as server:
+# Configure logging (also written to logs/notifier.log, see LOGGING_PARAMS)
+logger = get_logger('notifier')
+
+class SmtpTransport:
+    """
+    Email transport that keeps one authenticated SMTP session open and reuses it.
+
+    The session is reopened when the server drops it or after it has been idle
+    for longer than idle_timeout. For local testing point it at a debugging
+    server (e.g. `python -m aiosmtpd -n -l localhost:1025`) with starttls=False
+    and no credentials.
+    """
+
+    def __init__(self, host, port, username=None, password=None, sender=None, recipient=None,
+                 starttls=True, idle_timeout=240, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender or username
+        self.recipient = recipient or self.sender
+        self.starttls = starttls
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._server = None
+        self._last_used = 0.0
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
             server.starttls()
-            server.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
-            server.send_message(msg)
-        logging.info(f"Email sent: {subject}")
-    except Exception as e:
-        logging.error(f"Failed to send email: {e}")
+        if self.username and self.password:
+            server.login(self.username, self.password)
+        logger.info(f"SMTP session opened to {self.host}:{self.port}")
+        return server
 
-def send_sms(message):
-    client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-    try:
-        message = client.messages.create(
-            body=message,
-            from_=TWILIO_PHONE_NUMBER,
-            to=PHONE_NUMBER
+    def send(self, subject, body):
+        msg = MIMEText(body)
+        msg['Subject'] = subject
+        msg['From'] = self.sender
+        msg['To'] = self.recipient
+
+        if self._server is not None and time.monotonic() - self._last_used > self.idle_timeout:
+            self.close()
+        if self._server is None:
+            self._server = self._connect()
+        try:
+            self._server.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # The server closed the pooled session; reconnect once and resend
+            self._server = self._connect()
+            self._server.send_message(msg)
+        self._last_used = time.monotonic()
+
+    def close(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            pass
+        self._server = None
+
+class TwilioSmsTransport:
+    """
+    SMS transport that builds the Twilio client once, on first use.
+    """
+
+    def __init__(self, account_sid, auth_token, from_number, to_number):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.from_number = from_number
+        self.to_number = to_number
+        self._client = None
+
+    def send(self, subject, body):
+        if self._client is None:
+            from twilio.rest import Client
+            self._client = Client(self.account_sid, self.auth_token)
+        message = self._client.messages.create(
+            body=body,
+            from_=self.from_number,
+            to=self.to_number
         )
-        logging.info(f"SMS sent to {PHONE_NUMBER}: {message.sid}")
-    except Exception as e:
-        logging.error(f"Failed to send SMS: {e}")
\ No newline at end of file
+        logger.info(f"SMS sent to {self.to_number}: {message.sid}")
+
+    def close(self):
+        pass
+
+class InMemoryTransport:
+    """
+    Transport that records messages instead of sending them.
+
+    Used as a stub SMS/email transport in tests and paper trading.
+    """
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, subject, body):
+        self.sent.append((subject, body))
+
+    def close(self):
+        pass
+
+class RateLimiter:
+    """
+    Token bucket allowing `per_minute` messages per minute with bursts of the same size.
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.refill_rate = per_minute / 60.0
+        self.last_refill = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.refill_rate)
+        self.last_refill = now
+
+    def next_available(self, now):
+        """
+        Return the monotonic time at which a token will be available.
+        """
+        self._refill(now)
+        if self.tokens >= 1:
+            return now
+        return now + (1 - self.tokens) / self.refill_rate
+
+    def consume(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+class _ChannelState:
+    def __init__(self):
+        self.messages = []  # Pending (subject, body) pairs
+        self.attempts = 0  # Failed delivery attempts for the pending batch
+        self.due = None  # Monotonic time at which the pending batch is flushed
+        self.last_flush = float('-inf')
+
+class NotificationDispatcher:
+    """
+    Background notification service.
+
+    Callers enqueue messages with submit(), which never blocks. A single worker
+    thread delivers them through the channel transports, merging bursts that
+    arrive within coalesce_window seconds into one digest message, honouring a
+    per-channel rate limit and retrying failed deliveries with exponential
+    backoff without holding up the other channels. On stop() whatever is still
+    pending goes out as one final digest per channel, even if that exceeds the
+    rate limit, and is logged if it cannot be delivered.
+    """
+
+    _STOP = object()
+
+    def __init__(self, transports, rate_limits=None, coalesce_window=10.0, queue_size=1000,
+                 max_retries=5, initial_backoff=1):
+        self.transports = transports
+        self.rate_limiters = {
+            channel: RateLimiter(per_minute) for channel, per_minute in (rate_limits or {}).items()
+        }
+        self.coalesce_window = coalesce_window
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.stats = {'queued': 0, 'sent': 0, 'coalesced': 0, 'dropped': 0, 'failed': 0, 'retried': 0}
+        self._stats_lock = threading.Lock()  # Updated by submitting threads and the worker
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._channels = {channel: _ChannelState() for channel in transports}
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='notification-dispatcher', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=10):
+        """
+        Flush pending notifications and stop the worker thread.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(self._STOP)
+        thread.join(timeout)
+        if thread.is_alive():
+            # Still delivering the final digest; closing its transports now would cut it off
+            logger.warning(f"Notification worker still sending after {timeout}s; leaving transports open.")
+            return
+        for transport in self.transports.values():
+            transport.close()
+
+    def submit(self, channel, subject, body):
+        """
+        Queue a notification for delivery.
+
+        :param channel: str, 'email' or 'sms'
+        :param subject: str, the message subject (ignored by SMS)
+        :param body: str, the message body
+        :return: bool, True if the message was queued
+        """
+        if channel not in self.transports:
+            logger.error(f"Unknown notification channel: {channel}")
+            return False
+        if self._thread is None:
+            self.start()
+        try:
+            self._queue.put_nowait((channel, subject, body))
+        except queue.Full:
+            self._count('dropped')
+            logger.error(f"Notification queue full, dropping {channel} message: {subject}")
+            return False
+        self._count('queued')
+        return True
+
+    def _count(self, key, n=1):
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def get_stats(self):
+        """
+        Return a consistent copy of the delivery counters.
+        """
+        with self._stats_lock:
+            return dict(self.stats)
+
+    def _run(self):
+        while True:
+            now = time.monotonic()
+            due_times = [state.due for state in self._channels.values() if state.due is not None]
+            timeout = max(0.0, min(due_times) - now) if due_times else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is self._STOP:
+                for channel, state in self._channels.items():
+                    if state.messages:
+                        self._flush(channel, state, time.monotonic(), final=True)
+                return
+
+            now = time.monotonic()
+            if item is not None:
+                channel, subject, body = item
+                state = self._channels[channel]
+                state.messages.append((subject, body))
+                if state.due is None:
+                    # Send the first message of a quiet period immediately, then hold
+                    # anything that follows until the coalesce window has passed.
+                    state.due = max(now, state.last_flush + self.coalesce_window)
+
+            for channel, state in self._channels.items():
+                if state.due is not None and state.due <= now:
+                    self._flush(channel, state, now)
+
+    def _flush(self, channel, state, now, final=False):
+        """
+        Deliver a channel's pending messages as one message.
+
+        :param final: bool, shutting down: ignore the rate limit and do not retry
+        """
+        limiter = self.rate_limiters.get(channel)
+        if limiter is not None and not final:
+            available_at = limiter.next_available(now)
+            if available_at > now:
+                # Over the rate limit: keep gathering messages until a token frees up
+                state.due = available_at
+                return
+            limiter.consume(now)
+
+        messages = state.messages
+        if len(messages) == 1:
+            subject, body = messages[0]
+        else:
+            subject = f"{len(messages)} notifications: {messages[0][0]}"
+            body = '\n\n'.join(
+                f"[{message_subject}]\n{message_body}" if message_subject else message_body
+                for message_subject, message_body in messages
+            )
+
+        try:
+            self.transports[channel].send(subject, body)
+        except Exception as e:
+            state.attempts += 1
+            if final or state.attempts > self.max_retries:
+                self._count('failed', len(messages))
+                logger.error(
+                    f"Giving up on {channel} notification after {state.attempts} attempts: {e}. "
+                    f"Undelivered: {[message_subject or message_body for message_subject, message_body in messages]}"
+                )
+            else:
+                backoff = self.initial_backoff * 2 ** (state.attempts - 1)
+                self._count('retried')
+                logger.warning(f"Failed to send {channel} notification: {e}. Retrying in {backoff} seconds...")
+                state.due = now + backoff
+                return
+        else:
+            with self._stats_lock:
+                self.stats['sent'] += 1
+                self.stats['coalesced'] += len(messages) - 1
+            logger.info(f"{channel} notification sent: {subject}")
+
+        state.messages = []
+        state.attempts = 0
+        state.due = None
+        state.last_flush = now
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+def get_dispatcher():
+    """
+    Return the process-wide notification dispatcher, starting it on first use.
+    """
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            settings = get_settings()
+            transports = {
+                'email': SmtpTransport(
+                    settings.SMTP_HOST,
+                    settings.SMTP_PORT,
+                    username=settings.EMAIL_ADDRESS,
+                    password=settings.EMAIL_PASSWORD,
+                    starttls=settings.SMTP_STARTTLS,
+                    idle_timeout=NOTIFICATION_PARAMS['smtp_idle_timeout']
+                ),
+                'sms': TwilioSmsTransport(
+                    settings.TWILIO_ACCOUNT_SID,
+                    settings.TWILIO_AUTH_TOKEN,
+                    settings.TWILIO_PHONE_NUMBER,
+                    settings.PHONE_NUMBER
+                )
+            }
+            _dispatcher = NotificationDispatcher(
+                transports,
+                rate_limits=NOTIFICATION_PARAMS['rate_limits'],
+                coalesce_window=NOTIFICATION_PARAMS['coalesce_window'],
+                queue_size=NOTIFICATION_PARAMS['queue_size'],
+                max_retries=NOTIFICATION_PARAMS['max_retries'],
+                initial_backoff=NOTIFICATION_PARAMS['initial_backoff']
+            )
+            _dispatcher.start()
+            atexit.register(_dispatcher.stop)
+        return _dispatcher
+
+def send_email(subject, body):
+    """
+    Queue an email notification; delivery happens on the dispatcher thread.
+    """
+    return get_dispatcher().submit('email', subject, body)
+
+def send_sms(message):
+    """
+    Queue an SMS notification; delivery happens on the dispatcher thread.
+    """
+    return get_dispatcher().submit('sms', None, message)
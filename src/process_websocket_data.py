@@ -1,61 +1,82 @@
 # process_websocket_data.py
 
 import pandas as pd
-from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from indicators import calculate_indicators
-from data_fetcher import fetch_historical_data
-import logging
+from data_fetcher import fetch_historical_range
+from resampler import resampler
+from market_data_plane import publish_tick
+from metrics import histogram
+from tracing import tracer
+from logging_setup import get_logger
 
 # Configure logging
-logger = logging.getLogger('websocket_data_processor')
-logger.setLevel(logging.WARNING)
-handler = logging.StreamHandler()
-formatter = logging.Formatter('%(asctime)s:%(levelname)s:%(message)s')
-handler.setFormatter(formatter)
-if not logger.handlers:
-    logger.addHandler(handler)
+logger = get_logger('websocket_data_processor')
 
 # Initialize data structures for historical data
 historical_data = {}
 
 # List of tickers to fetch historical data for
-from config.config import TICKERS
+from config.config import TICKERS, STARTUP_PARAMS, RESAMPLER_PARAMS
 
-def initialize_historical_data():
+HISTORY_BARS = 300  # 15-minute bars each historical_data frame is seeded with
+
+def initialize_ticker_history(ticker):
     """
-    Fetch historical data for each ticker and store it in the historical_data dictionary.
+    Seed one ticker's 1-minute base series and derive its historical_data frame from it.
     """
-    for ticker in TICKERS:
-        try:
-            # Fetch historical data with sufficient data points
-            df = fetch_historical_data(
-                ticker=ticker,
-                granularity=900,  # 15 minutes in seconds
-                limit=300  # Fetch at least 300 data points
-            )
-
-            if df is not None and not df.empty:
-                # Ensure the DataFrame has the required columns
-                required_columns = ['timestamp', 'open', 'high', 'low', 'close']
-                if not all(col in df.columns for col in required_columns):
-                    logger.error(f"Historical data for {ticker} does not contain all required columns.")
-                    continue
-
-                # Convert 'timestamp' to datetime with UTC
-                df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True)
-
-                # Ensure numeric columns are of type float
-                numeric_cols = ['open', 'high', 'low', 'close']
-                df[numeric_cols] = df[numeric_cols].astype(float)
-
-                # Store the DataFrame in the historical_data dictionary
-                historical_data[ticker] = df
-                logger.info(f"Historical data for {ticker} initialized.")
-            else:
-                logger.warning(f"No historical data fetched for {ticker}.")
-        except Exception as e:
-            logger.error(f"Error fetching historical data for {ticker}: {e}")
+    try:
+        initialize_base_series(ticker)
+        df = history_bars(ticker)
+        if df is not None:
+            historical_data[ticker] = df
+            logger.info(f"Historical data for {ticker} initialized.")
+        else:
+            logger.warning(f"No historical data fetched for {ticker}.")
+    except Exception as e:
+        logger.error(f"Error fetching historical data for {ticker}: {e}")
 
+def history_bars(ticker, limit=HISTORY_BARS):
+    """
+    Return the latest closed 15-minute bars for a ticker from the resampler, or None if it has none.
+
+    These replace separate 15-minute candle requests, so historical_data and
+    the stored candlesticks agree with every other timeframe.
+    """
+    df = resampler.bars(ticker, 15, limit=limit)
+    return None if df.empty else df
+
+def initialize_base_series(ticker):
+    """
+    Seed the resampler with recent 1-minute candles for one ticker.
+    """
+    end_time = datetime.now(timezone.utc)
+    start_time = end_time - timedelta(minutes=RESAMPLER_PARAMS['history_minutes'])
+    df = fetch_historical_range(ticker, start_time, end_time, granularity=60)
+    if df is None:
+        logger.warning(f"No 1-minute history fetched for {ticker}.")
+        return
+    # The newest candle is still forming; it is rebuilt from ticks instead
+    current_minute = end_time.replace(second=0, microsecond=0)
+    resampler.load_base(ticker, df[df['timestamp'] < current_minute])
+
+def initialize_historical_data(tickers=None):
+    """
+    Fetch historical data for every ticker in parallel and store it in the historical_data dictionary.
+
+    :param tickers: list of tickers, defaults to TICKERS
+    :return: dict, the shared historical_data dictionary
+    """
+    tickers = TICKERS if tickers is None else tickers
+    with ThreadPoolExecutor(max_workers=STARTUP_PARAMS['history_workers']) as executor:
+        list(executor.map(initialize_ticker_history, tickers))
+    return historical_data
+
+PROCESS_SECONDS = histogram('process_websocket_data_seconds', 'Time spent folding one websocket message into market data.')
+
+@PROCESS_SECONDS.labels().time()
+@tracer.traced('process_websocket_data', ticker_param=None)
 def process_websocket_data(data):
     try:
         # Check if the message type is 'ticker'
@@ -66,20 +87,27 @@ def process_websocket_data(data):
         price = float(data['price'])
         timestamp = data.get('time', datetime.now(timezone.utc).isoformat())
 
-        # Initialize historical data if not already done
+        size = float(data.get('last_size') or 0.0)
+        epoch = datetime.fromisoformat(timestamp.replace('Z', '+00:00')).timestamp()
+
+        # Initialize historical data if not already done; before the tick is
+        # folded in, since seeding replaces the ticker's base series
         if product_id not in historical_data:
             logger.warning(f"No historical data for {product_id}. Fetching now...")
-            df = fetch_historical_data(
-                ticker=product_id,
-                granularity=900,  # 15 minutes in seconds
-                limit=300  # Adjust as needed
-            )
-            if df is not None and not df.empty:
+            initialize_base_series(product_id)
+            df = history_bars(product_id)
+            if df is not None:
                 historical_data[product_id] = df
             else:
                 # Initialize empty DataFrame if unable to fetch historical data
                 historical_data[product_id] = pd.DataFrame(columns=['timestamp', 'open', 'high', 'low', 'close'])
 
+        # Feed the 1-minute base series every other timeframe is built from
+        resampler.on_tick(product_id, price, size, epoch)
+        # Share the tick with strategy worker processes (no-op unless the plane is running)
+        publish_tick(product_id, price, size, epoch, float(data.get('best_bid') or 'nan'),
+                     float(data.get('best_ask') or 'nan'))
+
         # Create a new row with the current price for all OHLC columns
 
         new_row = pd.DataFrame({
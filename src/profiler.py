@@ -0,0 +1,302 @@
+# profiler.py
+
+import math
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from config.config import PROFILER_PARAMS
+from logging_setup import get_logger
+
+# Configure logging
+logger = get_logger('profiler')
+
+CONTENT_TYPE = 'text/plain; charset=utf-8'
+
+# Leaf frames of threads blocked in a wait rather than running; dropped unless
+# include_idle is set so the profile shows where CPU goes
+IDLE_FRAMES = frozenset([
+    ('threading.py', 'wait'), ('threading.py', '_wait_for_tstate_lock'), ('queue.py', 'get'),
+    ('selectors.py', 'select'), ('socket.py', 'readinto'), ('socket.py', 'accept'), ('ssl.py', 'read'),
+    ('socketserver.py', 'serve_forever'), ('base_events.py', '_run_once'), ('connection.py', 'wait'),
+    ('handlers.py', 'dequeue'), ('main.py', 'main')
+])
+
+class ProfileBusyError(RuntimeError):
+    """Raised when a profile is requested while another one is running."""
+
+class Profile:
+    """
+    Stack samples collected by one profiling run.
+
+    `stacks` counts (thread name, stack) pairs, the stack being a tuple of frame
+    labels from the thread's entry point to the frame that was running.
+    """
+
+    def __init__(self, interval, include_idle):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.stacks = Counter()
+        self.samples = 0
+        self.started = time.time()
+        self.elapsed = 0.0
+        self.sampling_seconds = 0.0  # Time the sampler itself spent walking stacks
+        self.path = None
+
+    def threads(self):
+        """
+        Return samples per thread name, busiest first.
+        """
+        totals = Counter()
+        for (thread_name, _), count in self.stacks.items():
+            totals[thread_name] += count
+        return totals.most_common()
+
+    def top_functions(self, limit=10):
+        """
+        Return the frames that were running most often (self time), busiest first.
+        """
+        totals = Counter()
+        for (_, stack), count in self.stacks.items():
+            totals[stack[-1]] += count
+        return totals.most_common(limit)
+
+    def collapsed(self):
+        """
+        Render the samples in the collapsed-stack format read by flamegraph.pl,
+        speedscope and similar tools: `thread;outer;...;inner count` per line.
+        """
+        lines = []
+        for (thread_name, stack), count in sorted(self.stacks.items(), key=lambda item: -item[1]):
+            lines.append(f"{';'.join((thread_name,) + stack)} {count}")
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        overhead = self.sampling_seconds / self.elapsed if self.elapsed else 0.0
+        lines = [
+            f"Profile of {self.elapsed:.1f}s at {self.interval * 1000:.0f}ms: {self.samples} samples, "
+            f"{sum(self.stacks.values())} thread stacks, sampler overhead {overhead:.2%}"
+            + (f", written to {self.path}" if self.path else ''),
+            '  Samples by thread:'
+        ]
+        lines += [f"    {name:<32}{count:>8}" for name, count in self.threads()]
+        lines.append('  Top functions (self):')
+        lines += [f"    {count:>8}  {frame}" for frame, count in self.top_functions()]
+        return '\n'.join(lines)
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler for every thread of the running bot.
+
+    A sampler thread reads the current frame of every other thread with
+    sys._current_frames() at a fixed interval and counts the stacks it sees per
+    thread name. Nothing is traced or instrumented, so threads that are not
+    being sampled run at full speed and the profiled code needs no changes;
+    the cost is the sampler's own stack walking, reported with each profile.
+    Only one profile runs at a time.
+    """
+
+    def __init__(self, params=None):
+        self.params = PROFILER_PARAMS if params is None else params
+        self._labels = {}  # Code object -> frame label
+        self._lock = threading.Lock()
+        self._running = None
+        self.last_profile = None
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def _sample(self, profile, own_ident):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        label = self._label
+        stacks = profile.stacks
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            code = frame.f_code
+            if not profile.include_idle and (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(label(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            stacks[(names.get(ident, f'thread-{ident}'), tuple(stack))] += 1
+
+    def profile(self, duration=None, interval=None, include_idle=None, output_dir=None):
+        """
+        Sample every thread for `duration` seconds and write the collapsed stacks.
+
+        Blocks the calling thread for the duration.
+
+        :param duration: float, seconds to sample (capped at max_duration)
+        :param interval: float, seconds between samples
+        :param include_idle: bool, keep samples of threads blocked in waits and sleeps
+        :param output_dir: str, directory for the .collapsed file, or '' to not write one
+        :return: Profile
+        :raises ProfileBusyError: if a profile is already running
+        :raises ValueError: if duration or interval is negative, NaN or infinite
+        """
+        params = self.params
+        for name, value in (('duration', duration), ('interval', interval)):
+            # min/max below would pass NaN through: a NaN duration never ends, a NaN interval busy-loops
+            if value is not None and not (math.isfinite(value) and value >= 0):
+                raise ValueError(f"{name} must be a finite, non-negative number of seconds, got {value}.")
+        duration = min(params['duration'] if duration is None else duration, params['max_duration'])
+        interval = max(params['interval'] if interval is None else interval, 0.001)
+        include_idle = params['include_idle'] if include_idle is None else include_idle
+        output_dir = params['output_dir'] if output_dir is None else output_dir
+
+        if not self._lock.acquire(blocking=False):
+            raise ProfileBusyError("A profile is already running.")
+        try:
+            profile = Profile(interval, include_idle)
+            self._running = profile
+            logger.info(f"Profiling all threads for {duration:.1f}s every {interval * 1000:.0f}ms.")
+            own_ident = threading.get_ident()
+            start = time.perf_counter()
+            deadline = start + duration
+            next_sample = start
+            while True:
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                if now < next_sample:
+                    time.sleep(min(next_sample, deadline) - now)
+                    continue
+                self._sample(profile, own_ident)
+                profile.samples += 1
+                profile.sampling_seconds += time.perf_counter() - now
+                next_sample += interval
+                if next_sample < now:
+                    next_sample = now + interval  # Fell behind; don't burst to catch up
+            profile.elapsed = time.perf_counter() - start
+            if output_dir:
+                profile.path = self._write(profile, output_dir)
+            logger.info(profile.summary())
+            self.last_profile = profile
+            return profile
+        finally:
+            self._running = None
+            self._lock.release()
+
+    def _write(self, profile, output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.gmtime(profile.started))
+        path = os.path.join(output_dir, f'profile-{stamp}.collapsed')
+        with open(path, 'w') as f:
+            f.write(profile.collapsed())
+        return path
+
+    def start(self, duration=None, interval=None, include_idle=None):
+        """
+        Run profile() in a background thread.
+
+        :return: bool, False if a profile is already running
+        """
+        if self._running is not None:
+            logger.warning("Profile requested while one is already running; ignored.")
+            return False
+
+        def run():
+            try:
+                self.profile(duration, interval, include_idle)
+            except ProfileBusyError:
+                logger.warning("Profile requested while one is already running; ignored.")
+            except Exception as e:
+                logger.error(f"Profiling failed: {e}")
+
+        threading.Thread(target=run, name='profiler', daemon=True).start()
+        return True
+
+profiler = SamplingProfiler()
+
+def install_signal_handler(signal_name=None):
+    """
+    Start a profile with the default settings whenever the process receives the signal.
+
+    Must be called from the main thread. `kill -USR1 <pid>` then writes a
+    collapsed-stack file to PROFILER_PARAMS['output_dir'].
+
+    :param signal_name: str, e.g. 'SIGUSR1' (defaults to PROFILER_PARAMS['signal'])
+    :return: bool, False if the platform has no such signal
+    """
+    signal_name = signal_name or PROFILER_PARAMS['signal']
+    signum = getattr(signal, signal_name, None)
+    if signum is None:
+        logger.warning(f"{signal_name} is not available on this platform; profiling by signal is disabled.")
+        return False
+    # The handler runs on the main thread between bytecodes, so it only hands off
+    signal.signal(signum, lambda received, frame: profiler.start())
+    logger.info(f"Send {signal_name} to pid {os.getpid()} to profile all threads.")
+    return True
+
+def start_http_server(host=None, port=None):
+    """
+    Serve profiles on demand from a daemon thread.
+
+    GET /profile?seconds=10&interval=0.005&idle=1 samples for the given time and
+    responds with the collapsed stacks (also written to the output directory);
+    the request returns 409 if a profile is already running. GET /profile/last
+    returns the previous profile's summary. Bind to localhost only: stacks
+    reveal the bot's internals.
+
+    :return: ThreadingHTTPServer, already serving
+    """
+    # Deferred: only the running bot serves profiles
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, urlsplit
+
+    class ProfileHandler(BaseHTTPRequestHandler):
+        def _send(self, status, text):
+            body = text.encode()
+            self.send_response(status)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path == '/profile/last':
+                profile = profiler.last_profile
+                self._send(200, profile.summary() + '\n' if profile else 'No profile has been taken yet.\n')
+                return
+            if url.path != '/profile':
+                self.send_error(404)
+                return
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            try:
+                duration = float(query['seconds']) if 'seconds' in query else None
+                interval = float(query['interval']) if 'interval' in query else None
+            except ValueError:
+                self._send(400, 'seconds and interval must be numbers.\n')
+                return
+            if any(value is not None and not (math.isfinite(value) and value >= 0) for value in (duration, interval)):
+                self._send(400, 'seconds and interval must be finite and non-negative.\n')
+                return
+            include_idle = query['idle'] not in ('0', 'false') if 'idle' in query else None
+            try:
+                profile = profiler.profile(duration, interval, include_idle)
+            except ProfileBusyError as e:
+                self._send(409, f'{e}\n')
+                return
+            self._send(200, profile.collapsed())
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(
+        (host or PROFILER_PARAMS['host'], PROFILER_PARAMS['port'] if port is None else port), ProfileHandler
+    )
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='profiler-http', daemon=True)
+    thread.start()
+    logger.info(f"Serving profiles on http://{server.server_address[0]}:{server.server_address[1]}/profile")
+    return server
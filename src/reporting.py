@@ -1,37 +1,31 @@
 # reporting.py
-import sqlite3
 from datetime import datetime, timedelta
 from notifier import send_email, send_sms
+from trade_analytics import get_daily_pnl
 
 def send_daily_report():
-    # Connect to the database
-    conn = sqlite3.connect('src/trading_bot.db')
-    cursor = conn.cursor()
+    # Report the previous full UTC day from the daily_pnl rollup
+    report_day = (datetime.utcnow() - timedelta(days=1)).strftime('%Y-%m-%d')
+    by_ticker = get_daily_pnl(report_day, group_by='ticker')
 
-    # Calculate the time range for the last 24 hours
-    end_time = datetime.utcnow()
-    start_time = end_time - timedelta(hours=24)
-
-    # Fetch the number of trades
-    cursor.execute("""
-        SELECT COUNT(*) FROM trades
-        WHERE timestamp BETWEEN ? AND ?
-    """, (start_time.isoformat(), end_time.isoformat()))
-    trade_count = cursor.fetchone()[0]
-
-    # Fetch the total P&L
-    cursor.execute("""
-        SELECT SUM(pnl) FROM trades
-        WHERE timestamp BETWEEN ? AND ?
-    """, (start_time.isoformat(), end_time.isoformat()))
-    total_pnl = cursor.fetchone()[0] or 0
-
-    conn.close()
+    trade_count = sum(stats['trade_count'] for stats in by_ticker.values())
+    total_pnl = sum(stats['net_pnl'] for stats in by_ticker.values())
+    wins = sum(stats['wins'] for stats in by_ticker.values())
+    win_rate = wins / trade_count if trade_count else 0.0
 
     # Prepare the report
     subject = "Daily P&L Report"
-    body = f"Date: {end_time.strftime('%Y-%m-%d')}\nNumber of Trades: {trade_count}\nTotal P&L: ${total_pnl:.2f}"
+    body = (
+        f"Date: {report_day}\n"
+        f"Number of Trades: {trade_count}\n"
+        f"Total P&L: ${total_pnl:.2f}\n"
+        f"Win Rate: {win_rate * 100:.1f}%"
+    )
+    ticker_lines = '\n'.join(
+        f"{ticker}: {stats['trade_count']} trades, ${stats['net_pnl']:.2f}"
+        for ticker, stats in sorted(by_ticker.items(), key=lambda item: item[1]['net_pnl'])
+    )
 
     # Send notifications
-    send_email(subject, body)
-    send_sms(body)
\ No newline at end of file
+    send_email(subject, f"{body}\n\n{ticker_lines}" if ticker_lines else body)
+    send_sms(body)
@@ -0,0 +1,339 @@
+# resampler.py
+
+import threading
+import time
+import numpy as np
+from config.config import RESAMPLER_PARAMS
+from logging_setup import get_logger
+
+# Configure logging
+logger = get_logger('resampler')
+
+FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+class BarBuffer:
+    """
+    Append-only OHLCV bars in NumPy arrays, keeping at most `capacity` bars.
+
+    Storage is twice the capacity so the oldest bars only need to be dropped
+    (one copy) every `capacity` appends.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.timestamp = np.zeros(2 * capacity, dtype=np.int64)  # Bar open, epoch seconds
+        self.values = np.zeros((2 * capacity, len(FIELDS)), dtype=np.float64)
+        self.size = 0
+
+    def append(self, timestamp, values):
+        if self.size == len(self.timestamp):
+            keep = self.capacity
+            self.timestamp[:keep] = self.timestamp[self.size - keep:self.size]
+            self.values[:keep] = self.values[self.size - keep:self.size]
+            self.size = keep
+        self.timestamp[self.size] = timestamp
+        self.values[self.size] = values
+        self.size += 1
+
+    def extend(self, timestamps, values):
+        for timestamp, row in zip(timestamps, values):
+            self.append(timestamp, row)
+
+    def view(self):
+        start = max(0, self.size - self.capacity)
+        return self.timestamp[start:self.size], self.values[start:self.size]
+
+    def last_timestamp(self):
+        return int(self.timestamp[self.size - 1]) if self.size else None
+
+def aggregate(timestamps, values, minutes):
+    """
+    Aggregate sorted bars into `minutes`-long bars aligned to the epoch.
+
+    :param timestamps: int64 array of bar open times in epoch seconds
+    :param values: float64 array of shape (n, 5) with open, high, low, close, volume
+    :param minutes: int, target bar length in minutes
+    :return: tuple (bucket open timestamps, aggregated values)
+    """
+    if not len(timestamps):
+        return timestamps[:0], values[:0]
+    period = minutes * 60
+    buckets = timestamps // period
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+    ends = np.append(starts[1:], len(timestamps)) - 1
+    result = np.empty((len(starts), len(FIELDS)), dtype=np.float64)
+    result[:, 0] = values[starts, 0]
+    result[:, 1] = np.maximum.reduceat(values[:, 1], starts)
+    result[:, 2] = np.minimum.reduceat(values[:, 2], starts)
+    result[:, 3] = values[ends, 3]
+    result[:, 4] = np.add.reduceat(values[:, 4], starts)
+    return buckets[starts] * period, result
+
+class _TickerSeries:
+    def __init__(self, timeframes, max_base_bars):
+        self.base = BarBuffer(max_base_bars)
+        self.forming_minute = None  # Open time of the 1-minute bar being built from ticks
+        self.forming = None  # [open, high, low, close, volume]
+        self.frames = {minutes: BarBuffer(max(16, max_base_bars // minutes)) for minutes in timeframes}
+        self.frame_forming = dict.fromkeys(timeframes)  # minutes -> [bucket, open, high, low, close, volume]
+        self.late_ticks = 0
+
+class CandleResampler:
+    """
+    Builds every timeframe from one 1-minute base series per ticker.
+
+    Ticks update the forming 1-minute bar; when a minute closes its bar is
+    appended to the base series and merged into the forming bar of each
+    configured timeframe (5m/15m/1h by default), which is appended in turn
+    when its own period closes. Any other bar length, and the Strategy 2
+    checkpoint windows, are aggregated from the base series on request, so
+    all timeframes agree with each other.
+    """
+
+    def __init__(self, timeframes=None, max_base_bars=None):
+        self.timeframes = list(RESAMPLER_PARAMS['timeframes'] if timeframes is None else timeframes)
+        self.max_base_bars = RESAMPLER_PARAMS['max_base_bars'] if max_base_bars is None else max_base_bars
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _get_series(self, ticker):
+        series = self._series.get(ticker)
+        if series is None:
+            series = self._series[ticker] = _TickerSeries(self.timeframes, self.max_base_bars)
+        return series
+
+    def load_base(self, ticker, df, forming=None):
+        """
+        Replace a ticker's base series with 1-minute candles and rebuild every timeframe.
+
+        :param ticker: str, the trading pair
+        :param df: DataFrame with timestamp, open, high, low, close and optionally volume columns
+        :param forming: list [minute, open, high, low, close, volume] of the 1-minute bar still
+                        forming, as returned by base_snapshot(); later ticks keep extending it
+        """
+        df = df.sort_values('timestamp').drop_duplicates('timestamp', keep='last')
+        timestamps = df['timestamp'].dt.as_unit('s').astype('int64').to_numpy()
+        values = np.zeros((len(df), len(FIELDS)), dtype=np.float64)
+        for i, field in enumerate(FIELDS):
+            if field in df.columns:
+                values[:, i] = df[field].to_numpy(dtype=np.float64)
+
+        with self._lock:
+            series = self._series[ticker] = _TickerSeries(self.timeframes, self.max_base_bars)
+            series.base.extend(timestamps, values)
+            if forming is not None and (not len(timestamps) or forming[0] > timestamps[-1]):
+                series.forming_minute = int(forming[0])
+                series.forming = [float(value) for value in forming[1:]]
+            if not len(timestamps):
+                return
+            last_minute_end = int(timestamps[-1]) + 60
+            for minutes in self.timeframes:
+                buckets, aggregated = aggregate(timestamps, values, minutes)
+                # The newest bucket is still forming unless its period has fully elapsed
+                if buckets[-1] + minutes * 60 > last_minute_end:
+                    series.frame_forming[minutes] = [int(buckets[-1]), *aggregated[-1]]
+                    buckets, aggregated = buckets[:-1], aggregated[:-1]
+                series.frames[minutes].extend(buckets, aggregated)
+        logger.info(f"Loaded {len(timestamps)} 1-minute bars for {ticker}.")
+
+    def on_tick(self, ticker, price, size=0.0, timestamp=None):
+        """
+        Fold a trade or ticker update into the forming 1-minute bar.
+
+        :param ticker: str, the trading pair
+        :param price: float, the trade price
+        :param size: float, the traded size
+        :param timestamp: float, epoch seconds of the trade
+        """
+        minute = int(timestamp // 60) * 60
+        with self._lock:
+            series = self._get_series(ticker)
+            if series.forming_minute is None or minute > series.forming_minute:
+                if series.forming is not None:
+                    self._close_minute(series)
+                last_closed = series.base.last_timestamp()
+                if last_closed is not None and minute <= last_closed:
+                    series.late_ticks += 1
+                    return
+                series.forming_minute = minute
+                series.forming = [price, price, price, price, size]
+            elif minute < series.forming_minute:
+                series.late_ticks += 1  # The minute this tick belongs to is already closed
+            else:
+                forming = series.forming
+                if price > forming[1]:
+                    forming[1] = price
+                if price < forming[2]:
+                    forming[2] = price
+                forming[3] = price
+                forming[4] += size
+
+    def close_elapsed(self, now=None):
+        """
+        Close every forming 1-minute bar whose minute has ended, for tickers that have gone quiet.
+
+        :param now: float, current epoch seconds (defaults to time.time())
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            for series in self._series.values():
+                if series.forming is not None and now >= series.forming_minute + 60:
+                    self._close_minute(series)
+
+    def _close_minute(self, series):
+        minute, bar = series.forming_minute, series.forming
+        series.base.append(minute, bar)
+        series.forming = None
+        for minutes in self.timeframes:
+            bucket = minute - minute % (minutes * 60)
+            forming = series.frame_forming[minutes]
+            if forming is not None and forming[0] != bucket:
+                series.frames[minutes].append(forming[0], forming[1:])
+                forming = None
+            if forming is None:
+                series.frame_forming[minutes] = [bucket, *bar]
+            else:
+                forming[2] = max(forming[2], bar[1])
+                forming[3] = min(forming[3], bar[2])
+                forming[4] = bar[3]
+                forming[5] += bar[4]
+            if minute + 60 == bucket + minutes * 60:
+                # Last minute of the period: the bar is complete now
+                completed = series.frame_forming[minutes]
+                series.frames[minutes].append(completed[0], completed[1:])
+                series.frame_forming[minutes] = None
+
+    def bars(self, ticker, minutes, include_partial=False, limit=None):
+        """
+        Return `minutes`-long OHLCV bars for a ticker as a DataFrame.
+
+        :param minutes: int, bar length; 1 returns the base series, and lengths
+                        that are not maintained incrementally are aggregated on the fly
+        :param include_partial: bool, append the bar that is still forming
+        :param limit: int, return only the most recent bars
+        """
+        import pandas as pd
+
+        with self._lock:
+            series = self._series.get(ticker)
+            if series is None:
+                timestamps, values = np.zeros(0, dtype=np.int64), np.zeros((0, len(FIELDS)))
+            elif minutes == 1 or minutes not in series.frames:
+                timestamps, values = (array.copy() for array in series.base.view())
+                if include_partial and series.forming is not None:
+                    timestamps = np.append(timestamps, series.forming_minute)
+                    values = np.vstack([values, series.forming])
+                if minutes != 1:
+                    complete_until = timestamps[-1] + 60 if len(timestamps) else 0
+                    timestamps, values = aggregate(timestamps, values, minutes)
+                    if not include_partial and len(timestamps) and timestamps[-1] + minutes * 60 > complete_until:
+                        timestamps, values = timestamps[:-1], values[:-1]
+            else:
+                timestamps, values = (array.copy() for array in series.frames[minutes].view())
+                if include_partial:
+                    partial = self._partial(series, minutes)
+                    if partial is not None:
+                        timestamps = np.append(timestamps, partial[0])
+                        values = np.vstack([values, partial[1:]])
+
+        if limit is not None:
+            timestamps, values = timestamps[-limit:], values[-limit:]
+        df = pd.DataFrame(values, columns=FIELDS)
+        df.insert(0, 'timestamp', pd.to_datetime(timestamps, unit='s', utc=True))
+        return df
+
+    def _partial(self, series, minutes):
+        forming = series.frame_forming[minutes]
+        bar = series.forming
+        if bar is None:
+            return forming
+        bucket = series.forming_minute - series.forming_minute % (minutes * 60)
+        if forming is None or forming[0] != bucket:
+            return [bucket, *bar]
+        return [bucket, forming[1], max(forming[2], bar[1]), min(forming[3], bar[2]), bar[3], forming[5] + bar[4]]
+
+    def checkpoint_ohlc(self, ticker, hour_start, checkpoint_minutes=None):
+        """
+        Return OHLCV for the first N minutes of an hour for each checkpoint N.
+
+        :param hour_start: float, epoch seconds of the start of the hour
+        :param checkpoint_minutes: list of ints, defaults to RESAMPLER_PARAMS['checkpoint_minutes']
+        :return: dict with keys such as 'open_5m' and 'close_50m', matching the
+                 strategy2_data columns; checkpoints without data are omitted
+        """
+        checkpoint_minutes = RESAMPLER_PARAMS['checkpoint_minutes'] if checkpoint_minutes is None else checkpoint_minutes
+        hour_start = int(hour_start)
+        with self._lock:
+            series = self._series.get(ticker)
+            if series is None:
+                return {}
+            timestamps, values = series.base.view()
+            first, last = np.searchsorted(timestamps, [hour_start, hour_start + 3600])
+            offsets = timestamps[first:last] - hour_start
+            window = values[first:last].copy()
+        if not len(offsets):
+            return {}
+
+        highs = np.maximum.accumulate(window[:, 1])
+        lows = np.minimum.accumulate(window[:, 2])
+        volumes = np.cumsum(window[:, 4])
+        ends = np.searchsorted(offsets, np.asarray(checkpoint_minutes) * 60) - 1
+        result = {}
+        for minute, end in zip(checkpoint_minutes, ends):
+            if end < 0:
+                continue
+            result[f'open_{minute}m'] = window[0, 0]
+            result[f'high_{minute}m'] = highs[end]
+            result[f'low_{minute}m'] = lows[end]
+            result[f'close_{minute}m'] = window[end, 3]
+            result[f'volume_{minute}m'] = volumes[end]
+        return result
+
+    def base_snapshot(self, ticker):
+        """
+        Return a ticker's closed 1-minute bars together with the bar still forming.
+
+        Both are read under one lock, so a minute closing in between is neither
+        lost nor counted twice.
+
+        :return: tuple (DataFrame like bars(ticker, 1), [minute, open, high, low, close, volume] or None)
+        """
+        import pandas as pd
+
+        with self._lock:
+            series = self._series.get(ticker)
+            if series is None:
+                timestamps, values, forming = np.zeros(0, dtype=np.int64), np.zeros((0, len(FIELDS))), None
+            else:
+                timestamps, values = (array.copy() for array in series.base.view())
+                forming = None if series.forming is None else [series.forming_minute, *series.forming]
+        df = pd.DataFrame(values, columns=FIELDS)
+        df.insert(0, 'timestamp', pd.to_datetime(timestamps, unit='s', utc=True))
+        return df, forming
+
+    def tickers(self):
+        with self._lock:
+            return list(self._series)
+
+    def last_price(self, ticker):
+        """
+        Return the latest price seen for a ticker (forming bar, else last closed bar), or None if there is none.
+        """
+        with self._lock:
+            series = self._series.get(ticker)
+            if series is None:
+                return None
+            if series.forming is not None:
+                return series.forming[3]
+            if series.base.size:
+                return float(series.base.values[series.base.size - 1, 3])
+            return None
+
+    def stats(self):
+        with self._lock:
+            return {
+                ticker: {'base_bars': min(series.base.size, series.base.capacity), 'late_ticks': series.late_ticks}
+                for ticker, series in self._series.items()
+            }
+
+resampler = CandleResampler()
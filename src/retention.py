@@ -0,0 +1,273 @@
+# retention.py
+
+import argparse
+import fnmatch
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+import pandas as pd
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import RETENTION_PARAMS
+import db_manager
+from archive import archive_rows
+from logging_setup import get_logger
+
+# Configure logging
+logger = get_logger('retention')
+
+def _database_size(conn):
+    page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+    page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+    free_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+    return page_size * page_count, free_pages
+
+def _quote(column):
+    return column if column == 'rowid' else f'"{column}"'
+
+def _row_key(conn, table):
+    """
+    Return the columns identifying a row: rowid, or the primary key of a WITHOUT ROWID table.
+    """
+    try:
+        conn.execute(f'SELECT rowid FROM "{table}" LIMIT 0')
+        return ['rowid']
+    except sqlite3.OperationalError:
+        columns = conn.execute(f'PRAGMA table_info("{table}")').fetchall()
+        return [column[1] for column in sorted(columns, key=lambda column: column[5]) if column[5]]
+
+def _ensure_timestamp_index(conn, table, column):
+    """
+    Create an index on the timestamp column unless an index already starts with it,
+    so each chunk finds its oldest rows without scanning the table.
+    """
+    for index in conn.execute(f'PRAGMA index_list("{table}")').fetchall():
+        first = conn.execute(f'PRAGMA index_info("{index[1]}")').fetchone()
+        if first is not None and first[2] == column:
+            return
+    conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{table}_{column}" ON "{table}" ("{column}")')
+    conn.commit()
+    logger.info(f"Created retention index on {table}({column}).")
+
+def _resolve_tables(conn, policies):
+    """
+    Expand glob patterns in the policy table names against the database.
+    """
+    names = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    resolved = {}
+    for pattern, policy in policies.items():
+        for name in fnmatch.filter(names, pattern):
+            resolved.setdefault(name, policy)
+    return resolved
+
+def _incremental_vacuum_enabled(conn):
+    return conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+
+def enable_incremental_vacuum(db_path=None):
+    """
+    Switch a database created without auto_vacuum to incremental mode.
+
+    The mode change needs one full VACUUM, which rewrites the whole file and
+    blocks every writer until it finishes, so it is a maintenance step run
+    with the bot stopped (`python src/retention.py --enable-incremental-vacuum`),
+    never part of the nightly run. Afterwards each run only returns the pages
+    it freed.
+
+    :return: bool, True if the database was converted
+    """
+    conn = sqlite3.connect(db_path or db_manager.DB_PATH)
+    try:
+        if _incremental_vacuum_enabled(conn):
+            return False
+        size, _ = _database_size(conn)
+        logger.info(f"Converting the {size / 1e6:.1f} MB database to incremental auto_vacuum (full VACUUM).")
+        start = time.monotonic()
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute('VACUUM')
+        logger.info(f"Database converted in {time.monotonic() - start:.2f}s.")
+        return True
+    finally:
+        conn.close()
+
+class RetentionManager:
+    """
+    Applies per-table retention to the live database.
+
+    Rows older than a table's max age are removed oldest first in chunks of
+    `chunk_rows`: each chunk selects the rows' keys through the timestamp
+    index, copies them to the Parquet archive if the table is archived,
+    deletes them by key and commits, then pauses briefly, so the write lock
+    is never held for long. Afterwards freed pages are returned to the file
+    system with an incremental vacuum, the planner statistics are refreshed
+    with PRAGMA optimize and the run is recorded in retention_runs. A
+    database created before auto_vacuum was enabled keeps its free pages
+    for reuse until it is converted with enable_incremental_vacuum().
+
+    Timestamps are ISO strings compared as text, which sorts chronologically
+    for both the naive and the '+00:00' formats used in the database; the
+    cutoff is formatted without fractional seconds so it is a prefix of both.
+    """
+
+    def __init__(self, db_path=None, policies=None, chunk_rows=None, chunk_pause=None,
+                 vacuum_pages=None, archive_root=None):
+        self.db_path = db_path
+        self.policies = RETENTION_PARAMS['tables'] if policies is None else policies
+        self.chunk_rows = RETENTION_PARAMS['chunk_rows'] if chunk_rows is None else chunk_rows
+        self.chunk_pause = RETENTION_PARAMS['chunk_pause'] if chunk_pause is None else chunk_pause
+        self.vacuum_pages = RETENTION_PARAMS['vacuum_pages'] if vacuum_pages is None else vacuum_pages
+        self.archive_root = archive_root
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path or db_manager.DB_PATH)
+
+    def _prune_table(self, conn, table, policy, cutoff):
+        timestamp_column = policy['timestamp']
+        dataset = policy.get('archive')
+        _ensure_timestamp_index(conn, table, timestamp_column)
+        key = _row_key(conn, table)
+        key_list = ', '.join(_quote(column) for column in key)
+        select_columns = f'{key_list}, *' if dataset else key_list
+        select_sql = (
+            f'SELECT {select_columns} FROM "{table}" WHERE "{timestamp_column}" < ? '
+            f'ORDER BY "{timestamp_column}" LIMIT ?'
+        )
+        delete_sql = f'DELETE FROM "{table}" WHERE ' + ' AND '.join(f'{_quote(column)} = ?' for column in key)
+        ticker = table[len('candlesticks_'):].replace('_', '-') if table.startswith('candlesticks_') else None
+        column_types = {row[1]: row[2] for row in conn.execute(f'PRAGMA table_info("{table}")')} if dataset else None
+
+        deleted = archived = 0
+        while True:
+            cursor = conn.execute(select_sql, (cutoff, self.chunk_rows))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            keys = [row[:len(key)] for row in rows]
+            if dataset:
+                columns = [description[0] for description in cursor.description][len(key):]
+                chunk = pd.DataFrame([row[len(key):] for row in rows], columns=columns)
+                archived += archive_rows(chunk, dataset, ticker, timestamp_column, self.archive_root,
+                                         column_types)
+            conn.executemany(delete_sql, keys)
+            conn.commit()
+            deleted += len(rows)
+            if len(rows) < self.chunk_rows:
+                break
+            time.sleep(self.chunk_pause)
+        return deleted, archived
+
+    def run(self, now=None, record=True):
+        """
+        Apply retention to every configured table.
+
+        :param now: datetime (naive UTC), defaults to now
+        :param record: bool, store the report in retention_runs
+        :return: dict with started_at, duration, deleted and archived per table,
+                 and database size and free pages before and after
+        """
+        now = now or datetime.utcnow()
+        start = time.monotonic()
+        conn = self._connect()
+        try:
+            size_before, _ = _database_size(conn)
+            incremental = _incremental_vacuum_enabled(conn)
+            deleted, archived = {}, {}
+            for table, policy in _resolve_tables(conn, self.policies).items():
+                cutoff = (now - timedelta(hours=policy['max_age_hours'])).strftime('%Y-%m-%dT%H:%M:%S')
+                try:
+                    deleted[table], archived[table] = self._prune_table(conn, table, policy, cutoff)
+                except Exception as e:
+                    conn.rollback()
+                    logger.error(f"Retention failed for {table}: {e}")
+
+            if incremental:
+                # The pragma frees one page per step; cursor.execute stops after the first
+                # step, while executescript runs it to completion
+                conn.executescript(f'PRAGMA incremental_vacuum({int(self.vacuum_pages)});')
+            else:
+                logger.warning(
+                    "Database is not in incremental auto_vacuum mode; freed pages stay in the file. "
+                    "Run `python src/retention.py --enable-incremental-vacuum` with the bot stopped."
+                )
+            conn.execute('PRAGMA optimize')
+            size_after, free_pages = _database_size(conn)
+            report = {
+                'started_at': now.isoformat(),
+                'duration': time.monotonic() - start,
+                'deleted': deleted,
+                'archived': {table: rows for table, rows in archived.items() if rows},
+                'size_before': size_before,
+                'size_after': size_after,
+                'free_pages': free_pages
+            }
+            if record:
+                conn.execute('''
+                    INSERT INTO retention_runs (
+                        started_at, duration, rows_deleted, rows_archived,
+                        size_before, size_after, free_pages, details
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    report['started_at'],
+                    report['duration'],
+                    sum(deleted.values()),
+                    sum(archived.values()),
+                    size_before,
+                    size_after,
+                    free_pages,
+                    json.dumps({'deleted': deleted, 'archived': report['archived']})
+                ))
+                conn.commit()
+        finally:
+            conn.close()
+
+        logger.info(
+            f"Retention removed {sum(deleted.values())} rows ({sum(archived.values())} archived) "
+            f"in {report['duration']:.2f}s; database {size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB."
+        )
+        return report
+
+def run_retention():
+    """
+    Scheduler entry point: apply the configured retention to the live database.
+    """
+    try:
+        return RetentionManager().run()
+    except Exception as e:
+        logger.error(f"Error while applying database retention: {e}")
+        return None
+
+def get_retention_history(limit=30):
+    """
+    Return the most recent retention runs, newest first.
+    """
+    conn = sqlite3.connect(db_manager.DB_PATH)
+    conn.row_factory = sqlite3.Row
+    rows = conn.execute('SELECT * FROM retention_runs ORDER BY id DESC LIMIT ?', (limit,)).fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply database retention or show past runs.')
+    parser.add_argument('--history', type=int, metavar='N', help='Show the last N retention runs instead.')
+    parser.add_argument('--enable-incremental-vacuum', action='store_true',
+                        help='Convert an existing database to incremental auto_vacuum with a full VACUUM '
+                             '(stop the bot first) instead.')
+    args = parser.parse_args()
+    if args.enable_incremental_vacuum:
+        converted = enable_incremental_vacuum()
+        print("Database converted." if converted else "Database already uses incremental auto_vacuum.")
+    elif args.history:
+        for run in get_retention_history(args.history):
+            print(
+                f"{run['started_at']}  deleted {run['rows_deleted']:>8}  archived {run['rows_archived']:>8}  "
+                f"{run['duration']:7.2f}s  size {run['size_before'] / 1e6:8.1f} -> {run['size_after'] / 1e6:8.1f} MB"
+            )
+    else:
+        print(json.dumps(RetentionManager().run(), indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+# risk_gate.py
+
+import itertools
+import threading
+import time
+from collections import deque
+from config.config import PRE_TRADE_RISK_PARAMS, RISK_MANAGEMENT_PARAMS
+from db_manager import get_open_trades, register_trade_open_listener, register_trade_close_listener
+from risk_manager import risk_engine
+from logging_setup import get_logger
+
+# Configure logging
+logger = get_logger('risk_gate')
+
+class PreTradeRiskGate:
+    """
+    In-memory pre-trade checks run in the order path before an order is sent.
+
+    Open positions and their notional are tracked from the db_manager trade
+    open/close hooks, and the times of placed orders are kept in a one-minute
+    deque, so a check is a handful of dict lookups and comparisons. Sells are
+    never blocked by exposure or loss limits since they reduce risk and are not
+    tracked as positions; they only count towards the order rate.
+
+    check() runs before the order path touches the network and, when it
+    allows an order, reserves the order's slot under the gate lock: a place
+    in the one-minute order rate and, for a buy, an open position with its
+    notional. Concurrent strategy threads therefore cannot all pass a limit
+    before any of them is counted. The reservation belongs to the calling
+    thread until release(): record_order() keeps the rate slot once the
+    exchange accepted the order, and the trade-open hook turns the reserved
+    position into the logged one. Anything still reserved is returned by
+    release(), which the order path calls when it finishes, and by the
+    thread's next check().
+    """
+
+    RULES = ('consecutive_losses', 'net_loss_24h', 'order_rate', 'open_positions',
+             'ticker_notional', 'total_notional')
+
+    def __init__(self, limits=None, loss_limits=None, engine=None):
+        self.limits = dict(PRE_TRADE_RISK_PARAMS if limits is None else limits)
+        self.loss_limits = dict(RISK_MANAGEMENT_PARAMS if loss_limits is None else loss_limits)
+        self.engine = risk_engine if engine is None else engine
+        self.rejections = dict.fromkeys(self.RULES, 0)
+        self.accepted = 0
+        self._positions = {}  # trade_id -> (ticker, notional)
+        self._ticker_notional = {}
+        self._total_notional = 0.0
+        self._order_times = deque()
+        self._reserved = {}  # reservation key -> (ticker, notional) of buys checked but not yet logged
+        self._reservation_keys = itertools.count()
+        self._local = threading.local()  # .reservation: the calling thread's _Reservation
+        self._lock = threading.Lock()
+
+    def rebuild(self):
+        """
+        Load open positions from the database. Call once at startup.
+        """
+        with self._lock:
+            self._positions.clear()
+            self._ticker_notional.clear()
+            self._total_notional = 0.0
+            for ticker, notional in self._reserved.values():
+                self._add_notional(ticker, notional)
+            for trade in get_open_trades():
+                # Same rule as on_trade_open; rows logged before the side was stored count as buys
+                if trade['side'] not in (None, 'BUY'):
+                    continue
+                self._add_position(trade['id'], trade['ticker'], trade['buy_price'], trade['buy_amount'])
+        logger.info(
+            f"Pre-trade gate loaded {len(self._positions)} open positions, "
+            f"total notional {self._total_notional:.2f}."
+        )
+
+    def _add_notional(self, ticker, notional):
+        self._ticker_notional[ticker] = self._ticker_notional.get(ticker, 0.0) + notional
+        self._total_notional += notional
+
+    def _remove_notional(self, ticker, notional):
+        self._ticker_notional[ticker] -= notional
+        self._total_notional -= notional
+        if not self._positions and not self._reserved:
+            self._total_notional = 0.0  # Drop accumulated float error whenever nothing is held
+
+    def _add_position(self, trade_id, ticker, price, amount):
+        notional = (price or 0.0) * (amount or 0.0)
+        self._positions[trade_id] = (ticker, notional)
+        self._add_notional(ticker, notional)
+
+    def on_trade_open(self, trade):
+        if trade['side'] != 'BUY':
+            return
+        reservation = getattr(self._local, 'reservation', None)
+        with self._lock:
+            if reservation is not None and reservation.key in self._reserved:
+                # The order this thread checked was logged: its reservation becomes the position
+                ticker, notional = self._reserved.pop(reservation.key)
+                self._remove_notional(ticker, notional)
+            self._add_position(trade['id'], trade['ticker'], trade['price'], trade['amount'])
+
+    def on_trade_close(self, trade):
+        with self._lock:
+            position = self._positions.pop(trade['id'], None)
+            if position is None:
+                return
+            self._remove_notional(*position)
+
+    def _reject(self, rule, ticker, side, detail):
+        self.rejections[rule] += 1
+        logger.warning(f"Pre-trade gate rejected {side} order for {ticker} ({rule}): {detail}")
+        return False, rule
+
+    def check(self, ticker, side, amount, price, strategy):
+        """
+        Decide whether an order may be sent.
+
+        :param ticker: str, the trading pair
+        :param side: str, 'BUY' or 'SELL'
+        :param amount: float, the order size in base currency
+        :param price: float, the last known price used to value the order, or None to skip the
+                      notional limits (check them with check_notional once a price is known)
+        :param strategy: str, the strategy placing the order
+        :return: tuple (bool, str or None), whether the order is allowed and the rule that rejected it
+        """
+        self.release()  # A thread sends one order at a time; drop whatever its last check left
+        now = time.monotonic()
+        is_buy = side.upper() == 'BUY'
+
+        if is_buy:
+            consecutive_losses = self.engine.consecutive_losses(strategy)
+            if consecutive_losses >= self.loss_limits['MAX_CONSECUTIVE_LOSSES']:
+                return self._reject('consecutive_losses', ticker, side, f"{consecutive_losses} consecutive losses")
+            net_pnl = self.engine.net_pnl_24h(strategy)
+            if net_pnl <= -self.loss_limits['MAX_NET_LOSS_24H']:
+                return self._reject('net_loss_24h', ticker, side, f"24h net P&L {net_pnl:.2f}")
+
+        with self._lock:
+            order_times = self._order_times
+            while order_times and order_times[0] <= now - 60:
+                order_times.popleft()
+            if len(order_times) >= self.limits['max_orders_per_minute']:
+                return self._reject('order_rate', ticker, side, f"{len(order_times)} orders in the last minute")
+
+            if is_buy:
+                positions = len(self._positions) + len(self._reserved)
+                if positions >= self.limits['max_open_positions']:
+                    return self._reject('open_positions', ticker, side, f"{positions} positions open or pending")
+                if price is not None:
+                    allowed, rule = self._check_notional(ticker, side, amount, price)
+                    if not allowed:
+                        return allowed, rule
+            reservation = _Reservation(now)
+            order_times.append(now)
+            if is_buy:
+                reservation.key = next(self._reservation_keys)
+                notional = amount * price if price is not None else 0.0
+                self._reserved[reservation.key] = (ticker, notional)
+                self._add_notional(ticker, notional)
+            self._local.reservation = reservation
+        return True, None
+
+    def _check_notional(self, ticker, side, amount, price):
+        notional = amount * price
+        ticker_notional = self._ticker_notional.get(ticker, 0.0) + notional
+        if ticker_notional > self.limits['max_ticker_notional']:
+            return self._reject('ticker_notional', ticker, side, f"exposure would be {ticker_notional:.2f}")
+        total_notional = self._total_notional + notional
+        if total_notional > self.limits['max_total_notional']:
+            return self._reject('total_notional', ticker, side, f"total exposure would be {total_notional:.2f}")
+        return True, None
+
+    def check_notional(self, ticker, side, amount, price):
+        """
+        Check the exposure limits alone, for buys priced only after check() ran.
+
+        When allowed, the notional is added to the position check() reserved.
+
+        :return: tuple (bool, str or None), as check()
+        """
+        if side.upper() != 'BUY':
+            return True, None
+        reservation = getattr(self._local, 'reservation', None)
+        with self._lock:
+            allowed, rule = self._check_notional(ticker, side, amount, price)
+            if allowed and reservation is not None and reservation.key in self._reserved:
+                reserved_ticker, notional = self._reserved[reservation.key]
+                self._reserved[reservation.key] = (reserved_ticker, notional + amount * price)
+                self._add_notional(reserved_ticker, amount * price)
+            return allowed, rule
+
+    def record_order(self):
+        """
+        Keep the calling thread's reserved rate slot: the exchange accepted the order.
+        """
+        reservation = getattr(self._local, 'reservation', None)
+        with self._lock:
+            if reservation is None:
+                self._order_times.append(time.monotonic())  # Sent without a check()
+            else:
+                reservation.recorded = True
+            self.accepted += 1
+
+    def release(self):
+        """
+        Return whatever the calling thread's last check() reserved and was not used.
+
+        The rate slot is kept if record_order() was called, and the position if
+        the trade was logged; everything else is released. Safe to call more than once.
+        """
+        reservation = getattr(self._local, 'reservation', None)
+        if reservation is None:
+            return
+        self._local.reservation = None
+        with self._lock:
+            if not reservation.recorded:
+                try:
+                    self._order_times.remove(reservation.order_time)
+                except ValueError:
+                    pass  # Already aged out of the one-minute window
+            position = self._reserved.pop(reservation.key, None)
+            if position is not None:
+                self._remove_notional(*position)
+
+    def stats(self):
+        """
+        Return gate counters and current exposure.
+        """
+        with self._lock:
+            return {
+                'accepted': self.accepted,
+                'rejections': dict(self.rejections),
+                'open_positions': len(self._positions),
+                'reserved_positions': len(self._reserved),
+                'total_notional': self._total_notional,
+                'ticker_notional': dict(self._ticker_notional)
+            }
+
+class _Reservation:
+    __slots__ = ('order_time', 'key', 'recorded')
+
+    def __init__(self, order_time):
+        self.order_time = order_time
+        self.key = None  # Key in PreTradeRiskGate._reserved for a buy
+        self.recorded = False
+
+pre_trade_gate = PreTradeRiskGate()
+register_trade_open_listener(pre_trade_gate.on_trade_open)
+register_trade_close_listener(pre_trade_gate.on_trade_close)
@@ -1,30 +1,140 @@
 # risk_manager.py
 
-from datetime import datetime, timedelta
-from db_manager import get_trades
+import heapq
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from db_manager import (
+    get_closed_trades_since, get_loss_streak, get_trade_strategies, register_trade_close_listener
+)
 from config.config import RISK_MANAGEMENT_PARAMS
 from notifier import send_email
-import logging
-import os
-
-# Configure logging
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-LOGS_DIR = os.path.join(BASE_DIR, 'logs')
-if not os.path.exists(LOGS_DIR):
-    os.makedirs(LOGS_DIR)
-
-from logging.handlers import RotatingFileHandler
-
-log_file = os.path.join(LOGS_DIR, 'risk_manager.log')
-logger = logging.getLogger('risk_manager')
-logger.setLevel(logging.INFO)
-handler = RotatingFileHandler(
-    log_file, maxBytes=5 * 1024 * 1024, backupCount=5
-)
-formatter = logging.Formatter('%(asctime)s:%(levelname)s:%(message)s')
-handler.setFormatter(formatter)
-if not logger.handlers:
-    logger.addHandler(handler)
+from logging_setup import get_logger
+
+# Configure logging (also written to logs/risk_manager.log, see LOGGING_PARAMS)
+logger = get_logger('risk_manager')
+
+WINDOW_SECONDS = 24 * 60 * 60
+
+def _to_epoch(timestamp):
+    """
+    Convert a naive UTC ISO timestamp as stored in the trades table to epoch seconds.
+    """
+    return datetime.fromisoformat(timestamp).replace(tzinfo=timezone.utc).timestamp()
+
+class StrategyRiskState:
+    """
+    Running risk counters for one strategy.
+
+    Keeps the current consecutive-loss streak and the P&L of trades bought in the
+    last 24 hours as a min-heap on buy time with a running sum, so expiring old
+    trades and reading the window total are both amortized O(1).
+    """
+
+    def __init__(self, window_seconds=WINDOW_SECONDS):
+        self.window_seconds = window_seconds
+        self.consecutive_losses = 0
+        self.window = []  # (buy_epoch, profit_loss) heap
+        self.window_pnl = 0.0
+
+    def record_close(self, buy_epoch, profit_loss, now=None):
+        if profit_loss < 0:
+            self.consecutive_losses += 1
+        else:
+            self.consecutive_losses = 0
+        self.add_to_window(buy_epoch, profit_loss, now)
+
+    def add_to_window(self, buy_epoch, profit_loss, now=None):
+        now = time.time() if now is None else now
+        if buy_epoch < now - self.window_seconds:
+            return
+        heapq.heappush(self.window, (buy_epoch, profit_loss))
+        self.window_pnl += profit_loss
+
+    def net_pnl(self, now=None):
+        now = time.time() if now is None else now
+        cutoff = now - self.window_seconds
+        while self.window and self.window[0][0] < cutoff:
+            _, profit_loss = heapq.heappop(self.window)
+            self.window_pnl -= profit_loss
+        if not self.window:
+            self.window_pnl = 0.0  # Drop accumulated float error whenever the window empties
+        return self.window_pnl
+
+class RiskEngine:
+    """
+    In-memory risk state for all strategies.
+
+    A strategy's state is rebuilt from the database the first time it is needed
+    and is then kept current by the trade-close hook in db_manager, so risk
+    checks never scan the trades table.
+    """
+
+    def __init__(self, window_seconds=WINDOW_SECONDS):
+        self.window_seconds = window_seconds
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def rebuild(self, strategies=None):
+        """
+        Rebuild risk state from the database.
+
+        :param strategies: list of strategy names, or None for every strategy with trades
+        """
+        if strategies is None:
+            strategies = get_trade_strategies()
+        for strategy in strategies:
+            state = StrategyRiskState(self.window_seconds)
+            now = time.time()
+            since = datetime.utcfromtimestamp(now - self.window_seconds).isoformat()
+            with self._lock:
+                # Hold the lock while reading so a concurrent close is either in the
+                # rows read here or applied afterwards by on_trade_close.
+                state.consecutive_losses = get_loss_streak(strategy)
+                for buy_timestamp, profit_loss in get_closed_trades_since(strategy, since):
+                    state.add_to_window(_to_epoch(buy_timestamp), profit_loss, now)
+                self._states[strategy] = state
+            logger.info(
+                f"Risk state rebuilt for {strategy}: {state.consecutive_losses} consecutive losses, "
+                f"24h net P&L {state.net_pnl(now):.2f}."
+            )
+
+    def _get_state(self, strategy):
+        state = self._states.get(strategy)
+        if state is None:
+            self.rebuild([strategy])
+            state = self._states[strategy]
+        return state
+
+    def on_trade_close(self, trade):
+        """
+        Trade-close hook registered with db_manager.
+        """
+        if trade['profit_loss'] is None:
+            return
+        with self._lock:
+            state = self._states.get(trade['strategy'])
+            if state is None:
+                # Not loaded yet; the committed trade is picked up by the rebuild
+                return
+            state.record_close(_to_epoch(trade['buy_timestamp']), trade['profit_loss'])
+
+    def consecutive_losses(self, strategy):
+        return self._get_state(strategy).consecutive_losses
+
+    def net_pnl_24h(self, strategy):
+        state = self._get_state(strategy)
+        with self._lock:
+            return state.net_pnl()
+
+risk_engine = RiskEngine()
+register_trade_close_listener(risk_engine.on_trade_close)
+
+def initialize_risk_state():
+    """
+    Load risk state for every strategy from the database. Call once at startup.
+    """
+    risk_engine.rebuild()
 
 def check_risk_management(strategy):
     """
@@ -37,29 +147,18 @@ def check_risk_management(strategy):
     max_consecutive_losses = RISK_MANAGEMENT_PARAMS['MAX_CONSECUTIVE_LOSSES']
     max_net_loss_24h = RISK_MANAGEMENT_PARAMS['MAX_NET_LOSS_24H']
 
-    trades = get_trades(strategy)
     # Check for consecutive losses
-    consecutive_losses = 0
-    for trade in reversed(trades):
-        if trade['profit_loss'] is not None and trade['profit_loss'] < 0:
-            consecutive_losses += 1
-            if consecutive_losses >= max_consecutive_losses:
-                send_email(
-                    subject=f"Trading Halted for {strategy}",
-                    body=f"Trading halted due to {consecutive_losses} consecutive losses."
-                )
-                logger.warning(f"Trading halted for {strategy} due to {consecutive_losses} consecutive losses.")
-                return False
-        else:
-            consecutive_losses = 0
+    consecutive_losses = risk_engine.consecutive_losses(strategy)
+    if consecutive_losses >= max_consecutive_losses:
+        send_email(
+            subject=f"Trading Halted for {strategy}",
+            body=f"Trading halted due to {consecutive_losses} consecutive losses."
+        )
+        logger.warning(f"Trading halted for {strategy} due to {consecutive_losses} consecutive losses.")
+        return False
 
     # Check for net loss over 24 hours
-    now = datetime.utcnow()
-    start_time = now - timedelta(hours=24)
-    net_loss = sum(
-        trade['profit_loss'] for trade in trades
-        if trade['profit_loss'] is not None and datetime.fromisoformat(trade['buy_timestamp']) >= start_time
-    )
+    net_loss = risk_engine.net_pnl_24h(strategy)
     if net_loss <= -max_net_loss_24h:
         send_email(
             subject=f"Trading Halted for {strategy}",
@@ -68,4 +167,4 @@ def check_risk_management(strategy):
         logger.warning(f"Trading halted for {strategy} due to net loss of ${abs(net_loss)} over 24 hours.")
         return False
 
-    return True  # Trading can continue
\ No newline at end of file
+    return True  # Trading can continue
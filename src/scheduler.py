@@ -0,0 +1,231 @@
+# scheduler.py
+
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config.config import SCHEDULER_PARAMS
+from metrics import histogram
+from logging_setup import get_logger
+
+# Configure logging
+logger = get_logger('scheduler')
+
+JOB_LAG_SECONDS = histogram('scheduler_job_lag_seconds', 'Delay between a job\'s due time and its start.', ('job',))
+JOB_SECONDS = histogram('scheduler_job_seconds', 'Scheduled job run time.', ('job',))
+
+class Job:
+    """
+    A recurring job and its timing statistics.
+
+    Aligned jobs fire at wall-clock multiples of `interval` seconds since the
+    epoch plus `offset` (so interval=900 fires at :00, :15, :30 and :45 UTC);
+    unaligned jobs fire every `interval` seconds from when they were added.
+    """
+
+    def __init__(self, name, func, args, kwargs, interval, align, offset, jitter):
+        self.name = name
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.interval = interval
+        self.align = align
+        self.offset = offset
+        self.jitter = jitter
+        self.cancelled = False
+        self.running = False
+        self.due_wall = None  # Intended wall-clock fire time of the next run
+        self.deadline = None  # Monotonic deadline of the next run, including jitter
+        self.runs = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.failures = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+        self.last_lag = 0.0
+        self.last_duration = 0.0
+
+    def arm(self, wall_now, mono_now, after_wall=None):
+        """
+        Compute the next due time strictly after `after_wall` (or now) and its monotonic deadline.
+        """
+        if after_wall is not None:
+            due_wall = after_wall + self.interval
+        elif self.align:
+            slots = (wall_now - self.offset) // self.interval + 1
+            due_wall = slots * self.interval + self.offset
+        else:
+            due_wall = wall_now + self.interval
+        if due_wall < wall_now:
+            # Missed slots (suspend, long GC pause, clock step): skip to the next future one
+            missed = int((wall_now - due_wall) // self.interval) + 1
+            self.skipped += missed
+            due_wall += missed * self.interval
+        self.due_wall = due_wall
+        jitter = random.uniform(0, self.jitter) if self.jitter else 0.0
+        # Map the wall-clock target onto the monotonic clock at arming time, so the
+        # wait itself is immune to wall-clock adjustments while each run re-anchors
+        # to the wall clock and cannot drift.
+        self.deadline = mono_now + (due_wall - wall_now) + jitter
+
+    def stats(self):
+        return {
+            'interval': self.interval,
+            'runs': self.runs,
+            'overruns': self.overruns,
+            'skipped': self.skipped,
+            'failures': self.failures,
+            'avg_lag_ms': self.lag_total / self.runs * 1000 if self.runs else 0.0,
+            'max_lag_ms': self.lag_max * 1000,
+            'last_lag_ms': self.last_lag * 1000,
+            'last_duration_ms': self.last_duration * 1000,
+            'next_run_in_s': self.deadline - time.monotonic() if self.deadline is not None else None
+        }
+
+class Scheduler:
+    """
+    Single heap-based scheduler for all periodic work in the bot.
+
+    One timer thread sleeps on a condition variable until the earliest
+    monotonic deadline, then hands due jobs to a worker pool. Lag (how late a
+    job started against its deadline) is recorded per job, and a job that is
+    still running when it comes due again is counted as an overrun and skipped
+    rather than queued up behind itself.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = SCHEDULER_PARAMS['workers'] if workers is None else workers
+        self._heap = []
+        self._jobs = {}
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._executor = None
+        self._running = False
+
+    def every(self, interval, func, *args, name=None, align=False, offset=0.0, jitter=0.0, **kwargs):
+        """
+        Schedule func(*args, **kwargs) to run every `interval` seconds.
+
+        :param interval: float, seconds between runs
+        :param name: str, unique job name (defaults to the function name)
+        :param align: bool, fire on wall-clock multiples of interval instead of relative to now
+        :param offset: float, seconds added to each aligned slot (e.g. a candle settle delay)
+        :param jitter: float, maximum random delay added to each run to spread load
+        :return: Job
+        """
+        job = Job(name or func.__name__, func, args, kwargs, interval, align, offset, jitter)
+        with self._cond:
+            if job.name in self._jobs:
+                raise ValueError(f"A job named {job.name} is already scheduled.")
+            job.arm(time.time(), time.monotonic())
+            self._jobs[job.name] = job
+            heapq.heappush(self._heap, (job.deadline, next(self._counter), job))
+            self._cond.notify()
+        logger.info(f"Scheduled {job.name} every {interval}s (align={align}, offset={offset}).")
+        return job
+
+    def at_bar_close(self, granularity, func, *args, settle_delay=None, name=None, **kwargs):
+        """
+        Schedule func to run at every candle close of `granularity` seconds plus a settle delay.
+        """
+        if settle_delay is None:
+            settle_delay = SCHEDULER_PARAMS['bar_settle_delay']
+        return self.every(granularity, func, *args, name=name, align=True, offset=settle_delay, **kwargs)
+
+    def daily_at(self, time_str, func, *args, name=None, **kwargs):
+        """
+        Schedule func to run every day at `time_str` ('HH:MM' or 'HH:MM:SS', UTC).
+        """
+        parts = [int(part) for part in time_str.split(':')]
+        offset = parts[0] * 3600 + parts[1] * 60 + (parts[2] if len(parts) > 2 else 0)
+        return self.every(86400, func, *args, name=name, align=True, offset=offset, **kwargs)
+
+    def cancel(self, name):
+        with self._cond:
+            job = self._jobs.pop(name, None)
+            if job is not None:
+                job.cancelled = True
+                self._cond.notify()
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='scheduler-worker')
+            self._thread = threading.Thread(target=self._run, name='scheduler', daemon=True)
+            self._thread.start()
+        logger.info("Scheduler started.")
+
+    def stop(self, wait=True):
+        with self._cond:
+            if not self._running:
+                return
+            self._running = False
+            self._cond.notify()
+        self._thread.join()
+        self._executor.shutdown(wait=wait)
+
+    def _run(self):
+        with self._cond:
+            while self._running:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                deadline, _, job = self._heap[0]
+                now = time.monotonic()
+                if job.cancelled:
+                    heapq.heappop(self._heap)
+                    continue
+                if deadline > now:
+                    self._cond.wait(deadline - now)
+                    continue
+                heapq.heappop(self._heap)
+                self._dispatch(job, now)
+                job.arm(time.time(), time.monotonic(), after_wall=job.due_wall)
+                heapq.heappush(self._heap, (job.deadline, next(self._counter), job))
+
+    def _dispatch(self, job, now):
+        if job.running:
+            job.overruns += 1
+            logger.warning(f"Job {job.name} is still running from its previous run; skipping this run.")
+            return
+        job.running = True
+        self._executor.submit(self._execute, job, job.deadline)
+
+    def _execute(self, job, deadline):
+        start = time.monotonic()
+        lag = start - deadline
+        job.last_lag = lag
+        job.lag_total += lag
+        job.lag_max = max(job.lag_max, lag)
+        JOB_LAG_SECONDS.labels(job.name).observe(max(lag, 0.0))
+        if lag > SCHEDULER_PARAMS['lag_warning']:
+            logger.warning(f"Job {job.name} started {lag * 1000:.1f} ms late.")
+        try:
+            job.func(*job.args, **job.kwargs)
+        except Exception as e:
+            job.failures += 1
+            logger.error(f"Job {job.name} raised an error: {e}")
+        finally:
+            job.last_duration = time.monotonic() - start
+            JOB_SECONDS.labels(job.name).observe(job.last_duration)
+            job.runs += 1
+            job.running = False
+            if job.last_duration > job.interval:
+                logger.warning(
+                    f"Job {job.name} took {job.last_duration:.1f}s, longer than its {job.interval}s interval."
+                )
+
+    def get_stats(self):
+        """
+        Return timing statistics for every scheduled job.
+        """
+        with self._cond:
+            return {name: job.stats() for name, job in self._jobs.items()}
+
+# Shared scheduler instance; threads are only started by start()
+scheduler = Scheduler()
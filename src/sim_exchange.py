@@ -0,0 +1,666 @@
+# sim_exchange.py
+
+import argparse
+import heapq
+import itertools
+import json
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import DB_FILE, SIM_EXCHANGE_PARAMS, TICKERS
+from logging_setup import get_logger
+
+# Configure logging
+logger = get_logger('sim_exchange')
+
+class SimulatedExchangeError(Exception):
+    """
+    Raised where the real API would return an error response.
+    """
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat().replace('+00:00', 'Z')
+
+def _epoch(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+class SimOrder:
+    __slots__ = ('id', 'product_id', 'side', 'type', 'price', 'size', 'filled_size', 'executed_value',
+                 'fill_fees', 'status', 'done_reason', 'reject_reason', 'post_only', 'time_in_force',
+                 'created_at', 'done_at', 'hold')
+
+    def __init__(self, product_id, side, order_type, price, size, post_only, time_in_force, created_at):
+        self.id = str(uuid.uuid4())
+        self.product_id = product_id
+        self.side = side
+        self.type = order_type
+        self.price = price
+        self.size = size
+        self.filled_size = 0.0
+        self.executed_value = 0.0
+        self.fill_fees = 0.0
+        self.status = 'pending'
+        self.done_reason = None
+        self.reject_reason = None
+        self.post_only = post_only
+        self.time_in_force = time_in_force
+        self.created_at = created_at
+        self.done_at = None
+        self.hold = 0.0  # Funds reserved while the order rests
+
+    def to_dict(self):
+        order = {
+            'id': self.id,
+            'order_id': self.id,
+            'product_id': self.product_id,
+            'side': self.side,
+            'type': self.type,
+            'size': str(self.size),
+            'filled_size': str(self.filled_size),
+            'executed_value': str(self.executed_value),
+            'fill_fees': str(self.fill_fees),
+            'status': self.status,
+            'post_only': self.post_only,
+            'time_in_force': self.time_in_force,
+            'created_at': _iso(self.created_at),
+            'settled': self.status == 'done'
+        }
+        if self.price is not None:
+            order['price'] = str(self.price)
+        if self.done_at is not None:
+            order['done_at'] = _iso(self.done_at)
+            order['done_reason'] = self.done_reason
+        if self.reject_reason is not None:
+            order['reject_reason'] = self.reject_reason
+        return order
+
+class SimulatedExchange:
+    """
+    In-process stand-in for the exchange client used by trade_executor, utils and data_fetcher.
+
+    Implements get_product_order_book, get_product_ticker, place_order,
+    get_order, cancel_order, get_accounts, get_product_candles, get_products
+    and get_products_stats with the response shapes of the Coinbase Exchange
+    API. Prices come from replayed candles (see MarketReplay): every tick sets
+    the top of book around the traded price and fills resting limit orders the
+    price has traded through, at their limit price with the maker fee. Market
+    orders and limit orders that cross the book fill immediately at the best
+    price with the taker fee; post-only orders that would cross are rejected,
+    as on the exchange.
+
+    Every call can be delayed by `latency_ms` (+/- `latency_jitter_ms`) and
+    fail with probability `error_rate`; orders are additionally rejected with
+    probability `reject_rate`. One lock guards the engine, so strategy threads
+    and the market feed can call it concurrently.
+    """
+
+    def __init__(self, balances=None, candles=None, spread_bps=None, depth=None, book_size=None,
+                 maker_fee=None, taker_fee=None, latency_ms=None, latency_jitter_ms=None,
+                 reject_rate=None, error_rate=None, seed=None):
+        params = SIM_EXCHANGE_PARAMS
+        self.spread = (params['spread_bps'] if spread_bps is None else spread_bps) / 10000
+        self.depth = params['depth'] if depth is None else depth
+        self.book_size = params['book_size'] if book_size is None else book_size
+        self.maker_fee = params['maker_fee'] if maker_fee is None else maker_fee
+        self.taker_fee = params['taker_fee'] if taker_fee is None else taker_fee
+        self.latency = (params['latency_ms'] if latency_ms is None else latency_ms) / 1000
+        self.latency_jitter = (params['latency_jitter_ms'] if latency_jitter_ms is None else latency_jitter_ms) / 1000
+        self.reject_rate = params['reject_rate'] if reject_rate is None else reject_rate
+        self.error_rate = params['error_rate'] if error_rate is None else error_rate
+        self._random = random.Random(params['seed'] if seed is None else seed)
+        self._balances = {currency: float(amount)
+                          for currency, amount in (params['balances'] if balances is None else balances).items()}
+        self._holds = {}
+        self._orders = {}
+        self._bids = {}  # product -> heap of (-price, seq, order)
+        self._asks = {}  # product -> heap of (price, seq, order)
+        self._prices = {}  # product -> (price, size, timestamp)
+        self._volumes = {}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self.candles = {} if candles is None else candles  # product -> DataFrame of base candles
+        self.now = time.time()
+        self.replay_start = None  # Set by get_simulated_exchange when candles are aligned to now
+        self.stats = {'placed': 0, 'filled': 0, 'canceled': 0, 'rejected': 0, 'injected_rejections': 0,
+                      'injected_errors': 0, 'ticks': 0}
+
+    # Fault injection
+
+    def _call(self, can_reject=False):
+        if self.latency or self.latency_jitter:
+            delay = self.latency + self._random.uniform(-self.latency_jitter, self.latency_jitter)
+            if delay > 0:
+                time.sleep(delay)
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.stats['injected_errors'] += 1
+            raise SimulatedExchangeError('Service unavailable (injected)', status=503)
+        if can_reject and self.reject_rate and self._random.random() < self.reject_rate:
+            self.stats['injected_rejections'] += 1
+            raise SimulatedExchangeError('Order rejected (injected)', status=400)
+
+    # Market data
+
+    def _book(self, product_id):
+        last = self._prices.get(product_id)
+        if last is None:
+            raise SimulatedExchangeError(f'NotFound: no market data for {product_id}', status=404)
+        price = last[0]
+        return price * (1 - self.spread / 2), price * (1 + self.spread / 2)
+
+    def on_tick(self, product_id, price, size, timestamp):
+        """
+        Apply a trade from the market feed: move the book and fill resting orders it trades through.
+        """
+        with self._lock:
+            self.now = timestamp
+            self._prices[product_id] = (price, size, timestamp)
+            self._volumes[product_id] = self._volumes.get(product_id, 0.0) + size
+            self.stats['ticks'] += 1
+            bids = self._bids.get(product_id)
+            while bids and -bids[0][0] >= price:
+                order = heapq.heappop(bids)[2]
+                if order.status == 'open':
+                    self._fill(order, order.price, self.maker_fee)
+            asks = self._asks.get(product_id)
+            while asks and asks[0][0] <= price:
+                order = heapq.heappop(asks)[2]
+                if order.status == 'open':
+                    self._fill(order, order.price, self.maker_fee)
+
+    def get_product_order_book(self, product_id, level=1):
+        self._call()
+        with self._lock:
+            bid, ask = self._book(product_id)
+            levels = 1 if level == 1 else self.depth
+            step = (ask - bid) or bid * 1e-8
+            return {
+                'sequence': self.stats['ticks'],
+                'bids': [[str(bid - i * step), str(self.book_size), 1] for i in range(levels)],
+                'asks': [[str(ask + i * step), str(self.book_size), 1] for i in range(levels)]
+            }
+
+    def get_product_ticker(self, product_id):
+        self._call()
+        with self._lock:
+            bid, ask = self._book(product_id)
+            price, size, timestamp = self._prices[product_id]
+            return {
+                'trade_id': self.stats['ticks'],
+                'price': str(price),
+                'size': str(size),
+                'bid': str(bid),
+                'ask': str(ask),
+                'volume': str(self._volumes.get(product_id, 0.0)),
+                'time': _iso(timestamp)
+            }
+
+    def get_products(self):
+        """
+        Return every product with candles, shaped like GET /products.
+        """
+        self._call()
+        products = []
+        for product_id in sorted(self.candles):
+            base, _, quote = product_id.partition('-')
+            products.append({
+                'id': product_id, 'base_currency': base, 'quote_currency': quote, 'status': 'online',
+                'trading_disabled': False, 'cancel_only': False, 'post_only': False, 'limit_only': False
+            })
+        return products
+
+    def get_products_stats(self):
+        """
+        Return 24h open/high/low/last/volume for every product, shaped like GET /products/stats.
+
+        Computed from the candles up to the replay clock.
+        """
+        self._call()
+        stats = {}
+        for product_id, df in list(self.candles.items()):
+            times = df['time'].to_numpy()
+            window = df[(times >= self.now - 86400) & (times < self.now)]
+            if window.empty:
+                continue
+            stats[product_id] = {'stats_24hour': {
+                'open': str(window['open'].iloc[0]),
+                'high': str(window['high'].max()),
+                'low': str(window['low'].min()),
+                'last': str(window['close'].iloc[-1]),
+                'volume': str(window['volume'].sum())
+            }}
+        return stats
+
+    def get_product_candles(self, product_id, start=None, end=None, granularity=60):
+        """
+        Return candles as [time, low, high, open, close, volume] rows, newest first.
+
+        Candles after the replay clock are never returned, so strategies cannot see ahead.
+        """
+        self._call()
+        df = self.candles.get(product_id)
+        if df is None or df.empty:
+            return []
+        end_ts = min(_epoch(end) if end is not None else self.now, self.now)
+        start_ts = _epoch(start) if start is not None else end_ts - 300 * granularity
+        times = df['time'].to_numpy()
+        window = df[(times >= start_ts - granularity) & (times < end_ts)]
+        if window.empty:
+            return []
+        buckets = (window['time'] // granularity * granularity).astype('int64')
+        grouped = window.groupby(buckets.to_numpy(), sort=True).agg(
+            low=('low', 'min'), high=('high', 'max'), open=('open', 'first'),
+            close=('close', 'last'), volume=('volume', 'sum')
+        )
+        # Only whole buckets inside the range, like the exchange
+        grouped = grouped[(grouped.index >= start_ts) & (grouped.index + granularity <= end_ts)]
+        return [
+            [int(row.Index), row.low, row.high, row.open, row.close, row.volume]
+            for row in grouped.iloc[::-1].itertuples()
+        ]
+
+    # Orders
+
+    def _reject(self, order, reason):
+        order.status = 'rejected'
+        order.reject_reason = reason
+        order.done_at = self.now
+        self.stats['rejected'] += 1
+        return order.to_dict()
+
+    def _fill(self, order, price, fee_rate):
+        base, quote = order.product_id.split('-')
+        value = price * order.size
+        fee = value * fee_rate
+        self._release(order)
+        if order.side == 'buy':
+            self._balances[quote] = self._balances.get(quote, 0.0) - value - fee
+            self._balances[base] = self._balances.get(base, 0.0) + order.size
+        else:
+            self._balances[base] = self._balances.get(base, 0.0) - order.size
+            self._balances[quote] = self._balances.get(quote, 0.0) + value - fee
+        order.filled_size = order.size
+        order.executed_value = value
+        order.fill_fees = fee
+        order.status = 'done'
+        order.done_reason = 'filled'
+        order.done_at = self.now
+        self.stats['filled'] += 1
+
+    def _available(self, currency):
+        return self._balances.get(currency, 0.0) - self._holds.get(currency, 0.0)
+
+    def _reserve(self, order, currency, amount):
+        if self._available(currency) < amount:
+            return False
+        self._holds[currency] = self._holds.get(currency, 0.0) + amount
+        order.hold = amount
+        return True
+
+    def _release(self, order):
+        if order.hold:
+            base, quote = order.product_id.split('-')
+            currency = quote if order.side == 'buy' else base
+            self._holds[currency] -= order.hold
+            order.hold = 0.0
+
+    def place_order(self, product_id, side, size, order_type='limit', price=None, post_only=False,
+                    time_in_force='GTC', **kwargs):
+        """
+        Place an order; returns the order as get_order would.
+
+        :raises SimulatedExchangeError: for an unknown product or an injected failure
+        """
+        self._call(can_reject=True)
+        side = side.lower()
+        size = float(size)
+        price = float(price) if price is not None else None
+        with self._lock:
+            bid, ask = self._book(product_id)
+            order = SimOrder(product_id, side, order_type, price, size, bool(post_only), time_in_force, self.now)
+            self._orders[order.id] = order
+            self.stats['placed'] += 1
+            base, quote = product_id.split('-')
+            if size <= 0 or (order_type == 'limit' and (price is None or price <= 0)):
+                return self._reject(order, 'invalid size or price')
+
+            best = ask if side == 'buy' else bid
+            crosses = order_type == 'market' or (price >= ask if side == 'buy' else price <= bid)
+            if crosses and order.post_only:
+                return self._reject(order, 'post only')
+            fill_price = best if crosses else price
+            fee_rate = self.taker_fee if crosses else self.maker_fee
+            if side == 'buy':
+                funded = self._reserve(order, quote, fill_price * size * (1 + fee_rate))
+            else:
+                funded = self._reserve(order, base, size)
+            if not funded:
+                return self._reject(order, 'Insufficient funds')
+
+            if crosses:
+                self._fill(order, best, self.taker_fee)
+            elif time_in_force in ('IOC', 'FOK'):
+                self._release(order)
+                order.status = 'done'
+                order.done_reason = 'canceled'
+                order.done_at = self.now
+                self.stats['canceled'] += 1
+            else:
+                order.status = 'open'
+                if side == 'buy':
+                    heapq.heappush(self._bids.setdefault(product_id, []), (-price, next(self._seq), order))
+                else:
+                    heapq.heappush(self._asks.setdefault(product_id, []), (price, next(self._seq), order))
+            return order.to_dict()
+
+    def get_order(self, order_id):
+        self._call()
+        with self._lock:
+            order = self._orders.get(order_id)
+            if order is None:
+                raise SimulatedExchangeError(f'NotFound: order {order_id}', status=404)
+            return order.to_dict()
+
+    def cancel_order(self, order_id):
+        """
+        Cancel an open order; the heap entry is dropped lazily when it reaches the top.
+        """
+        self._call()
+        with self._lock:
+            order = self._orders.get(order_id)
+            if order is None or order.status != 'open':
+                raise SimulatedExchangeError(f'Order {order_id} is not open', status=404 if order is None else 400)
+            self._release(order)
+            order.status = 'done'
+            order.done_reason = 'canceled'
+            order.done_at = self.now
+            self.stats['canceled'] += 1
+            return order_id
+
+    def get_accounts(self):
+        self._call()
+        with self._lock:
+            return [
+                {
+                    'id': currency,
+                    'currency': currency,
+                    'balance': str(balance),
+                    'hold': str(self._holds.get(currency, 0.0)),
+                    'available': str(balance - self._holds.get(currency, 0.0))
+                }
+                for currency, balance in sorted(self._balances.items())
+            ]
+
+    # Replay
+
+    def load_candles(self, candles):
+        """
+        Register base candles for replay and the candles endpoint.
+
+        :param candles: dict of ticker -> DataFrame with time (epoch seconds), open, high, low, close, volume
+        """
+        for ticker, df in candles.items():
+            self.candles[ticker] = df.sort_values('time').reset_index(drop=True)
+
+    def replay(self, start=None, speed=None, granularity=None):
+        """
+        Return a MarketReplay over the loaded candles from `start` (epoch seconds) on.
+        """
+        params = SIM_EXCHANGE_PARAMS
+        return MarketReplay(self, start=start, speed=params['replay_speed'] if speed is None else speed,
+                            granularity=granularity or params['granularity'])
+
+    def run_feed(self, on_message, start=None, speed=None, stop_event=None):
+        """
+        Drive a websocket-style message handler from the replay until it ends.
+
+        Sends a 'subscriptions' message first and then one 'ticker' message per
+        tick, as JSON strings in the exchange's format, calling on_message(None, message).
+        """
+        on_message(None, json.dumps({'type': 'subscriptions', 'channels': [
+            {'name': 'ticker', 'product_ids': sorted(self.candles)}
+        ]}))
+        replay = self.replay(start=start, speed=speed)
+        for product_id, price, size, timestamp in replay.ticks(stop_event):
+            bid, ask = self._book(product_id)
+            on_message(None, json.dumps({
+                'type': 'ticker',
+                'sequence': self.stats['ticks'],
+                'product_id': product_id,
+                'price': str(price),
+                'best_bid': str(bid),
+                'best_ask': str(ask),
+                'last_size': str(size),
+                'time': _iso(timestamp)
+            }))
+        logger.info(f"Market replay finished after {self.stats['ticks']} ticks.")
+
+class MarketReplay:
+    """
+    Turns base candles into a time-ordered stream of ticks across all tickers.
+
+    Each candle becomes four trades (open, then low and high in the order that
+    matches its direction, then close) spread over the candle, each with a
+    quarter of its volume. With speed > 0 the replay sleeps so that simulated
+    time advances `speed` times faster than wall time; speed 0 replays as fast
+    as possible.
+    """
+
+    def __init__(self, exchange, start=None, speed=0, granularity=60):
+        self.exchange = exchange
+        self.start = start
+        self.speed = speed
+        self.granularity = granularity
+
+    def _events(self):
+        import numpy as np
+
+        times, prices, sizes, products = [], [], [], []
+        offsets = np.array([0.0, 0.25, 0.5, 0.75]) * self.granularity
+        for product_id, df in self.exchange.candles.items():
+            if self.start is not None:
+                df = df[df['time'] >= self.start]
+            if df.empty:
+                continue
+            rising = (df['close'] >= df['open']).to_numpy()
+            opens, highs, lows, closes = (df[col].to_numpy(dtype=float) for col in ('open', 'high', 'low', 'close'))
+            path = np.column_stack([
+                opens, np.where(rising, lows, highs), np.where(rising, highs, lows), closes
+            ])
+            times.append((df['time'].to_numpy(dtype=float)[:, None] + offsets).ravel())
+            prices.append(path.ravel())
+            sizes.append(np.repeat(df['volume'].to_numpy(dtype=float) / 4, 4))
+            products.append(np.full(path.size, product_id, dtype=object))
+        if not times:
+            return []
+        times, prices = np.concatenate(times), np.concatenate(prices)
+        sizes, products = np.concatenate(sizes), np.concatenate(products)
+        order = np.argsort(times, kind='stable')
+        return zip(products[order], prices[order].tolist(), sizes[order].tolist(), times[order].tolist())
+
+    def ticks(self, stop_event=None):
+        """
+        Apply each tick to the exchange and yield it as (product_id, price, size, timestamp).
+        """
+        wall_start = sim_start = None
+        for product_id, price, size, timestamp in self._events():
+            if stop_event is not None and stop_event.is_set():
+                return
+            if self.speed:
+                if wall_start is None:
+                    wall_start, sim_start = time.monotonic(), timestamp
+                delay = (timestamp - sim_start) / self.speed - (time.monotonic() - wall_start)
+                if delay > 0:
+                    time.sleep(delay)
+            self.exchange.on_tick(product_id, price, size, timestamp)
+            yield product_id, price, size, timestamp
+
+    def run(self, stop_event=None):
+        """
+        Replay every tick into the exchange without publishing them; returns the tick count.
+        """
+        count = 0
+        for _ in self.ticks(stop_event):
+            count += 1
+        return count
+
+def synthetic_candles(tickers=None, minutes=24 * 60, end=None, granularity=60, seed=0, start_price=100.0,
+                      volatility=0.001):
+    """
+    Generate random-walk candles for load tests when no market data is at hand.
+
+    :return: dict of ticker -> DataFrame with time, open, high, low, close, volume
+    """
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    end = int((end or time.time()) // granularity * granularity)
+    times = end - granularity * np.arange(minutes, 0, -1)
+    candles = {}
+    for ticker in TICKERS if tickers is None else tickers:
+        steps = rng.normal(0.0, volatility, size=(minutes, 4))
+        path = start_price * np.exp(np.cumsum(steps.ravel())).reshape(minutes, 4)
+        opens = np.concatenate([[start_price], path[:-1, 3]])
+        closes = path[:, 3]
+        highs = np.maximum.reduce([opens, closes, path[:, 0], path[:, 1], path[:, 2]])
+        lows = np.minimum.reduce([opens, closes, path[:, 0], path[:, 1], path[:, 2]])
+        candles[ticker] = pd.DataFrame({
+            'time': times, 'open': opens, 'high': highs, 'low': lows, 'close': closes,
+            'volume': rng.gamma(2.0, 50.0, size=minutes)
+        })
+    return candles
+
+def _to_epoch_frame(df):
+    import pandas as pd
+
+    df = df.copy()
+    df['time'] = pd.to_datetime(df['timestamp'], utc=True).astype('int64') // 10 ** 9
+    return df[['time', 'open', 'high', 'low', 'close', 'volume']].astype(float)
+
+def archived_candles(tickers=None, start=None, end=None, root=None):
+    """
+    Load candles written by the retention archiver (see archive.py).
+    """
+    from archive import read_archive
+
+    df = read_archive('candles', tickers=tickers, start=start, end=end, root=root)
+    if df.empty:
+        return {}
+    return {ticker: _to_epoch_frame(group) for ticker, group in df.groupby('ticker')}
+
+def database_candles(tickers=None, db_path=None):
+    """
+    Load candles from the candlesticks_* tables written by data_fetcher.
+    """
+    import pandas as pd
+
+    candles = {}
+    conn = sqlite3.connect(db_path or DB_FILE)
+    try:
+        for ticker in TICKERS if tickers is None else tickers:
+            table = f"candlesticks_{ticker.replace('-', '_')}"
+            try:
+                df = pd.read_sql_query(f'SELECT * FROM {table} ORDER BY timestamp', conn)
+            except Exception:
+                continue
+            if not df.empty:
+                candles[ticker] = _to_epoch_frame(df)
+    finally:
+        conn.close()
+    return candles
+
+def align_to_now(candles, replay_start):
+    """
+    Shift candle times so that `replay_start` falls on the current wall-clock minute.
+
+    Lets the unmodified bot, whose history requests are relative to now, run
+    against replayed data: everything before replay_start is history and the
+    rest is replayed as live ticks.
+    """
+    shift = time.time() // 60 * 60 - replay_start
+    for df in candles.values():
+        df['time'] = df['time'] + shift
+    return replay_start + shift
+
+_exchange = None
+_exchange_lock = threading.Lock()
+
+def get_simulated_exchange():
+    """
+    Return the process-wide simulated exchange, loading market data from SIM_EXCHANGE_PARAMS on first use.
+    """
+    global _exchange
+    with _exchange_lock:
+        if _exchange is None:
+            params = SIM_EXCHANGE_PARAMS
+            source = params['source']
+            if source == 'archive':
+                candles = archived_candles(TICKERS)
+            elif source == 'database':
+                candles = database_candles(TICKERS)
+            else:
+                candles = synthetic_candles(TICKERS, minutes=params['history_minutes'] + params['replay_minutes'])
+            exchange = SimulatedExchange()
+            exchange.load_candles(candles)
+            if candles:
+                first = min(df['time'].iloc[0] for df in exchange.candles.values())
+                replay_start = align_to_now(exchange.candles, first + params['history_minutes'] * 60)
+                exchange.now = replay_start
+                # Seed the book with the last price before the replay starts
+                for ticker, df in exchange.candles.items():
+                    history = df[df['time'] < replay_start]
+                    if not history.empty:
+                        exchange.on_tick(ticker, float(history['close'].iloc[-1]), 0.0, replay_start)
+                exchange.replay_start = replay_start
+            logger.info(f"Simulated exchange loaded {len(candles)} tickers from {source} data.")
+            _exchange = exchange
+        return _exchange
+
+def run_feed(on_message, stop_event=None):
+    """
+    Feed the websocket message handler from the simulated exchange's replay.
+    """
+    exchange = get_simulated_exchange()
+    exchange.run_feed(on_message, start=exchange.replay_start, stop_event=stop_event)
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay market data through the simulated exchange.')
+    parser.add_argument('--source', choices=['synthetic', 'archive', 'database'], default=SIM_EXCHANGE_PARAMS['source'])
+    parser.add_argument('--speed', type=float, default=0, help='Simulated seconds per wall second; 0 for as fast as possible.')
+    args = parser.parse_args()
+
+    if args.source == 'archive':
+        candles = archived_candles(TICKERS)
+    elif args.source == 'database':
+        candles = database_candles(TICKERS)
+    else:
+        candles = synthetic_candles(TICKERS)
+    exchange = SimulatedExchange()
+    exchange.load_candles(candles)
+    start = time.perf_counter()
+    ticks = exchange.replay(speed=args.speed).run()
+    elapsed = time.perf_counter() - start
+    print(f"Replayed {ticks} ticks for {len(candles)} tickers in {elapsed:.2f}s ({ticks / max(elapsed, 1e-9):.0f} ticks/s)")
+
+if __name__ == '__main__':
+    main()
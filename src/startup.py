@@ -0,0 +1,130 @@
+# startup.py
+
+import threading
+import time
+from config.config import STARTUP_PARAMS
+from logging_setup import get_logger
+
+# Configure logging
+logger = get_logger('startup')
+
+class Component:
+    """
+    A startup step with its prerequisites and timing.
+
+    By default a component is ready once its start function returns. Long-running
+    components (strategy loops, the websocket) set `background=True`, so their
+    start function keeps running in its own thread, and either become ready as
+    soon as they are launched or when `ready_event` is set by the component itself.
+    """
+
+    def __init__(self, name, start, requires=(), background=False, ready_event=None):
+        self.name = name
+        self.start = start
+        self.requires = tuple(requires)
+        self.background = background
+        self.ready_event = ready_event
+        self.ready = threading.Event()
+        self.failed = None
+        self.started_at = None
+        self.ready_at = None
+
+class StartupOrchestrator:
+    """
+    Starts components as soon as everything they require is ready.
+
+    Every component gets a thread that waits on its prerequisites' ready events,
+    so independent steps (e.g. DB initialization and history warm-up) overlap
+    and dependents start the moment their inputs are available instead of after
+    a fixed sleep.
+    """
+
+    def __init__(self, timeout=None):
+        self.timeout = STARTUP_PARAMS['component_timeout'] if timeout is None else timeout
+        self.components = {}
+        self.t0 = None
+
+    def add(self, name, start, requires=(), background=False, ready_event=None):
+        for dependency in requires:
+            if dependency not in self.components:
+                raise ValueError(f"Component {name} requires unknown component {dependency}.")
+        self.components[name] = Component(name, start, requires, background, ready_event)
+        return self.components[name]
+
+    def _launch(self, component):
+        for dependency in component.requires:
+            required = self.components[dependency]
+            if not required.ready.wait(self.timeout) or required.failed:
+                component.failed = f"prerequisite {dependency} {'failed' if required.failed else 'not ready'}"
+                logger.error(f"Not starting {component.name}: {component.failed}.")
+                component.ready.set()
+                return
+
+        component.started_at = time.monotonic()
+        if component.background:
+            thread = threading.Thread(target=self._run_background, args=(component,),
+                                      name=component.name, daemon=True)
+            thread.start()
+            if component.ready_event is not None and not component.ready_event.wait(self.timeout):
+                component.failed = f"not ready after {self.timeout}s"
+                logger.error(f"{component.name} {component.failed}.")
+        else:
+            try:
+                component.start()
+            except Exception as e:
+                component.failed = str(e)
+                logger.error(f"{component.name} failed to start: {e}")
+        component.ready_at = time.monotonic()
+        component.ready.set()
+
+    def _run_background(self, component):
+        try:
+            component.start()
+        except Exception as e:
+            logger.error(f"{component.name} stopped with an error: {e}")
+
+    def run(self):
+        """
+        Start all components and block until each is ready or has failed.
+
+        :return: bool, True if every component became ready
+        """
+        self.t0 = time.monotonic()
+        threads = [
+            threading.Thread(target=self._launch, args=(component,), name=f"startup-{name}", daemon=True)
+            for name, component in self.components.items()
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        logger.info(self.report())
+        return not any(component.failed for component in self.components.values())
+
+    def timings(self):
+        """
+        Return per-component timings in seconds relative to the start of run().
+        """
+        timings = {}
+        for name, component in self.components.items():
+            started = component.started_at - self.t0 if component.started_at is not None else None
+            ready = component.ready_at - self.t0 if component.ready_at is not None else None
+            timings[name] = {
+                'started': started,
+                'ready': ready,
+                'duration': ready - started if started is not None and ready is not None else None,
+                'failed': component.failed
+            }
+        return timings
+
+    def report(self):
+        lines = ['Startup timing (seconds since start):']
+        for name, timing in sorted(self.timings().items(), key=lambda item: item[1]['ready'] or 0):
+            if timing['failed']:
+                lines.append(f"  {name:<16} FAILED: {timing['failed']}")
+            else:
+                lines.append(
+                    f"  {name:<16} started {timing['started']:7.3f}  ready {timing['ready']:7.3f}  "
+                    f"took {timing['duration']:7.3f}"
+                )
+        return '\n'.join(lines)
@@ -0,0 +1,193 @@
+# strategy2_capture.py
+
+import threading
+import time
+from datetime import datetime, timezone
+from config.config import STRATEGY2_CAPTURE_PARAMS
+import db_manager
+from db_manager import STRATEGY2_CHECKPOINT_MINUTES, save_strategy2_hour
+from resampler import resampler
+from logging_setup import get_logger
+
+# Configure logging
+logger = get_logger('strategy2_capture')
+
+CHECKPOINT_FIELDS = ('open', 'high', 'low', 'close')
+
+def hour_timestamp(hour_start):
+    """
+    Format an epoch hour start like the other timestamps in the database (naive UTC ISO).
+    """
+    return datetime.fromtimestamp(hour_start, timezone.utc).replace(tzinfo=None).isoformat()
+
+def hour_start(timestamp):
+    """
+    Return the epoch start of the hour an ISO timestamp falls in (naive timestamps are UTC).
+    """
+    moment = datetime.fromisoformat(str(timestamp).replace('Z', '+00:00'))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp() // 3600) * 3600
+
+class _PendingHour:
+    def __init__(self):
+        self.timestamp = None  # strategy2_data timestamp as Strategy 2 wrote it
+        self.data = {}  # strategy2_data columns
+        self.checkpoints = {}  # minute -> {'open', 'high', 'low', 'close', 'volume'}
+
+class CheckpointRecorder:
+    """
+    Accumulates a Strategy 2 hour in memory and writes it once when the hour closes.
+
+    Strategy 2 hands its rows to log() and update() (through the module-level
+    log_strategy2_data and update_strategy2_data) instead of writing them.
+    Only hours it recorded are kept; at hour close any of their checkpoints
+    not recorded explicitly is filled in from the resampler's 1-minute series
+    and the hour is written with db_manager.save_strategy2_hour, one insert
+    per ticker and hour instead of an insert followed by an UPDATE of the
+    wide row at every checkpoint.
+    """
+
+    def __init__(self, source=None, checkpoint_minutes=STRATEGY2_CHECKPOINT_MINUTES):
+        self.source = resampler if source is None else source
+        self.checkpoint_minutes = tuple(checkpoint_minutes)
+        self._pending = {}  # (ticker, hour_start) -> _PendingHour
+        self._lock = threading.Lock()
+
+    def record(self, ticker, hour_start, minute=None, open=None, high=None, low=None, close=None, volume=None, **data):
+        """
+        Record a checkpoint (when `minute` is given) and/or extra strategy2_data columns for an hour.
+
+        :param ticker: str, the trading pair
+        :param hour_start: int, epoch seconds of the start of the hour
+        :param minute: int, checkpoint minute the OHLC values belong to
+        :param data: other strategy2_data columns, e.g. the hour's open/high/low/close
+        """
+        with self._lock:
+            pending = self._pending.setdefault((ticker, int(hour_start)), _PendingHour())
+            if minute is not None:
+                pending.checkpoints[minute] = {
+                    'open': open, 'high': high, 'low': low, 'close': close, 'volume': volume
+                }
+            pending.data.update(data)
+
+    def update(self, ticker, timestamp, data):
+        """
+        Take a strategy2_data update for the hour starting at `timestamp`.
+
+        Same arguments as db_manager.update_strategy2_data; open_5m-style
+        columns become checkpoints, other columns are written with the hour.
+        """
+        start = hour_start(timestamp)
+        with self._lock:
+            pending = self._pending.setdefault((ticker, start), _PendingHour())
+            if pending.timestamp is None:
+                pending.timestamp = timestamp
+            for column, value in data.items():
+                if column in ('ticker', 'timestamp'):
+                    continue
+                field, _, suffix = column.partition('_')
+                if field in CHECKPOINT_FIELDS and suffix.endswith('m') and suffix[:-1].isdigit():
+                    pending.checkpoints.setdefault(int(suffix[:-1]), {})[field] = value
+                else:
+                    pending.data[column] = value
+
+    def log(self, data):
+        """
+        Take a new strategy2_data row; same argument as db_manager.log_strategy2_data.
+        """
+        self.update(data['ticker'], data['timestamp'], data)
+
+    def _fill_from_source(self, ticker, hour_start, pending, now=None):
+        # In an hour still open, only checkpoints whose minute has passed are complete
+        elapsed = [minute for minute in self.checkpoint_minutes if now is None or hour_start + minute * 60 <= now]
+        missing = [minute for minute in elapsed if minute not in pending.checkpoints]
+        hour_closed = now is None or hour_start + 3600 <= now
+        values = self.source.checkpoint_ohlc(ticker, hour_start, missing + ([60] if hour_closed else []))
+        for minute in missing:
+            if f'open_{minute}m' in values:
+                pending.checkpoints[minute] = {
+                    field: values[f'{field}_{minute}m'] for field in CHECKPOINT_FIELDS + ('volume',)
+                }
+        if 'open_60m' in values:
+            for field in CHECKPOINT_FIELDS:
+                pending.data.setdefault(field, values[f'{field}_60m'])
+
+    def flush_hour(self, ticker, hour_start, now=None):
+        """
+        Complete and write one ticker's hour.
+
+        :param now: float, current epoch seconds when the hour may still be open;
+                    None treats the hour as closed
+        :return: bool, True if a row was written
+        """
+        hour_start = int(hour_start)
+        with self._lock:
+            pending = self._pending.pop((ticker, hour_start), None) or _PendingHour()
+        self._fill_from_source(ticker, hour_start, pending, now)
+        if not pending.checkpoints and not pending.data:
+            return False
+
+        data = dict(pending.data)
+        for minute, values in pending.checkpoints.items():
+            if minute in STRATEGY2_CHECKPOINT_MINUTES:
+                for field in CHECKPOINT_FIELDS:
+                    data[f'{field}_{minute}m'] = values.get(field)
+        timestamp = pending.timestamp or hour_timestamp(hour_start)
+        try:
+            save_strategy2_hour(ticker, timestamp, data, pending.checkpoints)
+        except Exception as e:
+            logger.error(f"Failed to save Strategy 2 checkpoints for {ticker} at {timestamp}: {e}")
+            return False
+        return True
+
+    def flush_completed(self, now=None):
+        """
+        Write every hour Strategy 2 recorded that has ended.
+
+        :param now: float, current epoch seconds (defaults to time.time())
+        :return: int, the number of hours written
+        """
+        now = time.time() if now is None else now
+        previous_hour = int(now // 3600) * 3600 - 3600
+        with self._lock:
+            due = sorted(key for key in self._pending if key[1] <= previous_hour)
+        written = sum(self.flush_hour(ticker, hour_start) for ticker, hour_start in due)
+        if due:
+            logger.info(f"Saved Strategy 2 checkpoints for {written} of {len(due)} ticker hours.")
+        return written
+
+    def flush_all(self, now=None):
+        """
+        Write every hour Strategy 2 recorded, including the one still open, e.g. on shutdown.
+
+        :param now: float, current epoch seconds (defaults to time.time())
+        :return: int, the number of hours written
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            pending = sorted(self._pending)
+        written = sum(self.flush_hour(ticker, hour_start, now) for ticker, hour_start in pending)
+        if pending:
+            logger.info(f"Saved Strategy 2 checkpoints for {written} of {len(pending)} pending ticker hours.")
+        return written
+
+checkpoint_recorder = CheckpointRecorder()
+
+def log_strategy2_data(data):
+    """
+    Record a new strategy2_data row: buffered until hour close when capture is enabled, else written now.
+    """
+    if STRATEGY2_CAPTURE_PARAMS['enabled']:
+        checkpoint_recorder.log(data)
+    else:
+        db_manager.log_strategy2_data(data)
+
+def update_strategy2_data(ticker, timestamp, data):
+    """
+    Record checkpoint columns for an hour: buffered when capture is enabled, else an UPDATE of the row.
+    """
+    if STRATEGY2_CAPTURE_PARAMS['enabled']:
+        checkpoint_recorder.update(ticker, timestamp, data)
+    else:
+        db_manager.update_strategy2_data(ticker, timestamp, data)
@@ -7,11 +7,11 @@ import json
 # Add the parent directory to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from auth import get_client
+from auth import get_shared_client
 from config.config import SANDBOX_MODE
 
 # Get the REST client
-client = get_client()
+client = get_shared_client()
 
 # If SANDBOX_MODE is True, adjust the API base URL
 if SANDBOX_MODE:
@@ -0,0 +1,250 @@
+# tracing.py
+
+import inspect
+import itertools
+from array import array
+import threading
+from functools import wraps
+from time import perf_counter_ns
+from config.config import TRACING_PARAMS
+from logging_setup import get_logger
+
+# Configure logging
+logger = get_logger('tracing')
+
+# Pipeline stages in the order a tick passes through them; other names are
+# added on first use
+STAGES = (
+    'websocket_message', 'process_websocket_data', 'calculate_indicators', 'strategy',
+    'place_order', 'exchange_place_order', 'log_trade_open'
+)
+
+class Trace:
+    """
+    One tick's journey through the pipeline, timed from when its message arrived.
+    """
+
+    __slots__ = ('trace_id', 'ticker', 'start_ns')
+
+    def __init__(self, trace_id, ticker, start_ns):
+        self.trace_id = trace_id
+        self.ticker = ticker
+        self.start_ns = start_ns
+
+class _Span:
+    __slots__ = ('_tracer', '_trace', '_stage', '_start', '_previous')
+
+    def __init__(self, tracer, trace, stage):
+        self._tracer = tracer
+        self._trace = trace
+        self._stage = stage
+
+    def __enter__(self):
+        local = self._tracer._local
+        self._previous = getattr(local, 'trace', None)
+        local.trace = self._trace  # Nested spans join the same trace
+        self._start = perf_counter_ns()
+        return self._trace
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._tracer._record(self._trace, self._stage, self._start, perf_counter_ns())
+        self._tracer._local.trace = self._previous
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+_NO_SPAN = _NoSpan()
+
+class Tracer:
+    """
+    Per-decision latency tracing from the websocket tick to the recorded order.
+
+    websocket_client.on_message begins a trace for every ticker message and
+    stages wrapped with span()/traced() record their duration and how long
+    after the tick they finished. The trace is current for the thread handling
+    the message; threads that act on the data later (strategy loops, order
+    placement) pick up the latest trace of the ticker they work on, as long as
+    it is younger than max_handoff_age, so a decision is attributed to the tick
+    that last updated its inputs.
+
+    Spans go into a fixed-size ring buffer of typed array columns; recording
+    one is a handful of array stores and takes no lock.
+    """
+
+    def __init__(self, capacity=None, enabled=None, max_handoff_age=None):
+        self.capacity = capacity or TRACING_PARAMS['capacity']
+        self.enabled = TRACING_PARAMS['enabled'] if enabled is None else enabled
+        handoff = TRACING_PARAMS['max_handoff_age'] if max_handoff_age is None else max_handoff_age
+        self.max_handoff_ns = int(handoff * 1e9)
+        self.stages = list(STAGES)
+        self._stage_ids = {stage: i for i, stage in enumerate(STAGES)}
+        self._stage_lock = threading.Lock()
+        self._local = threading.local()
+        self._latest = {}  # Ticker -> latest Trace
+        self._trace_ids = itertools.count(1)
+        self._slots = itertools.count()
+        self._trace_col = array('q', bytes(8 * self.capacity))  # 0 marks an unused slot
+        self._stage_col = array('h', bytes(2 * self.capacity))
+        self._offset_col = array('q', bytes(8 * self.capacity))  # Span end, ns after the tick
+        self._duration_col = array('q', bytes(8 * self.capacity))
+
+    def begin(self, ticker, start_ns=None):
+        """
+        Start a trace for a tick and make it current for this thread.
+
+        :param ticker: str, the product the tick is for
+        :param start_ns: int, perf_counter_ns() when the message arrived (defaults to now)
+        :return: Trace, or None if tracing is disabled
+        """
+        if not self.enabled:
+            return None
+        trace = Trace(next(self._trace_ids), ticker, perf_counter_ns() if start_ns is None else start_ns)
+        self._local.trace = trace
+        self._latest[ticker] = trace
+        return trace
+
+    def end(self, trace, stage):
+        """
+        Record `stage` as running from the tick until now and clear the thread's current trace.
+        """
+        if trace is not None:
+            self._record(trace, stage, trace.start_ns, perf_counter_ns())
+        self._local.trace = None
+
+    def current(self):
+        return getattr(self._local, 'trace', None)
+
+    def _resolve(self, ticker):
+        trace = getattr(self._local, 'trace', None)
+        if trace is None and ticker is not None:
+            trace = self._latest.get(ticker)
+            if trace is not None and perf_counter_ns() - trace.start_ns > self.max_handoff_ns:
+                trace = None
+        return trace
+
+    def span(self, stage, ticker=None):
+        """
+        Context manager timing a stage of the current trace.
+
+        Without a current trace the latest trace for `ticker` is used and made
+        current inside the block; with neither, the span is a no-op.
+        """
+        trace = self._resolve(ticker) if self.enabled else None
+        if trace is None:
+            return _NO_SPAN
+        return _Span(self, trace, stage)
+
+    def traced(self, stage, ticker_param='ticker'):
+        """
+        Decorator form of span(); the ticker is taken from the argument named `ticker_param`.
+
+        :param stage: str, the stage name
+        :param ticker_param: str or None, the parameter holding the ticker; None to only
+                             join a trace that is already current
+        """
+        def decorator(func):
+            position = None
+            if ticker_param is not None:
+                position = list(inspect.signature(func).parameters).index(ticker_param)
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                ticker = None
+                if position is not None:
+                    ticker = args[position] if len(args) > position else kwargs.get(ticker_param)
+                with self.span(stage, ticker):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _stage_id(self, stage):
+        stage_id = self._stage_ids.get(stage)
+        if stage_id is None:
+            with self._stage_lock:
+                stage_id = self._stage_ids.setdefault(stage, len(self.stages))
+                if stage_id == len(self.stages):
+                    self.stages.append(stage)
+        return stage_id
+
+    def _record(self, trace, stage, start_ns, end_ns):
+        i = next(self._slots) % self.capacity
+        self._trace_col[i] = 0  # Invalidate the slot while it is rewritten
+        self._stage_col[i] = self._stage_id(stage)
+        self._offset_col[i] = end_ns - trace.start_ns
+        self._duration_col[i] = end_ns - start_ns
+        self._trace_col[i] = trace.trace_id
+
+    def spans(self):
+        """
+        Return the buffered spans.
+
+        :return: dict of column name -> NumPy array: trace_id, stage (name), since_tick_ms, duration_ms
+        """
+        import numpy as np  # Deferred: only needed when the buffer is read
+
+        trace_ids = np.array(self._trace_col, dtype=np.int64)
+        used = trace_ids > 0
+        stage_names = np.array(self.stages, dtype=object)
+        return {
+            'trace_id': trace_ids[used],
+            'stage': stage_names[np.array(self._stage_col, dtype=np.int16)[used]],
+            'since_tick_ms': np.array(self._offset_col, dtype=np.int64)[used] / 1e6,
+            'duration_ms': np.array(self._duration_col, dtype=np.int64)[used] / 1e6
+        }
+
+    def breakdown(self):
+        """
+        Return per-stage latency percentiles in milliseconds.
+
+        `duration` is the time spent in the stage and `since_tick` how long after
+        the tick the stage finished, so since_tick of log_trade_open is the
+        tick-to-order latency.
+
+        :return: dict of stage -> dict with count and p50/p90/p99/max of duration and since_tick
+        """
+        import numpy as np
+
+        spans = self.spans()
+        result = {}
+        for stage in self.stages:
+            mask = spans['stage'] == stage
+            count = int(mask.sum())
+            if not count:
+                continue
+            stats = {'count': count}
+            for column, prefix in (('duration_ms', 'duration'), ('since_tick_ms', 'since_tick')):
+                p50, p90, p99 = np.percentile(spans[column][mask], [50, 90, 99])
+                stats[f'{prefix}_p50_ms'] = float(p50)
+                stats[f'{prefix}_p90_ms'] = float(p90)
+                stats[f'{prefix}_p99_ms'] = float(p99)
+                stats[f'{prefix}_max_ms'] = float(spans[column][mask].max())
+            result[stage] = stats
+        return result
+
+    def report(self):
+        lines = ['Tick-to-order latency by stage (ms):',
+                 f"  {'stage':<24}{'count':>8}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}"
+                 f"{'tick p50':>11}{'tick p99':>11}"]
+        for stage, stats in self.breakdown().items():
+            lines.append(
+                f"  {stage:<24}{stats['count']:>8}{stats['duration_p50_ms']:>10.3f}{stats['duration_p90_ms']:>10.3f}"
+                f"{stats['duration_p99_ms']:>10.3f}{stats['duration_max_ms']:>10.3f}"
+                f"{stats['since_tick_p50_ms']:>11.3f}{stats['since_tick_p99_ms']:>11.3f}"
+            )
+        return '\n'.join(lines)
+
+    def log_report(self):
+        logger.info(self.report())
+
+    def reset(self):
+        for i in range(self.capacity):
+            self._trace_col[i] = 0
+        self._latest.clear()
+
+tracer = Tracer()
@@ -0,0 +1,189 @@
+# trade_analytics.py
+
+import argparse
+import sqlite3
+import db_manager
+
+_SUMMARY_COLUMNS = '''
+    COUNT(*),
+    COUNT(profit_loss),
+    TOTAL(profit_loss),
+    TOTAL(CASE WHEN profit_loss > 0 THEN 1 ELSE 0 END),
+    TOTAL(CASE WHEN profit_loss < 0 THEN 1 ELSE 0 END),
+    TOTAL(CASE WHEN profit_loss > 0 THEN profit_loss ELSE 0 END),
+    TOTAL(CASE WHEN profit_loss < 0 THEN profit_loss ELSE 0 END),
+    TOTAL(buy_price * buy_amount),
+    TOTAL(sell_price * sell_amount)
+'''
+
+def _connect():
+    return sqlite3.connect(db_manager.DB_PATH)
+
+def _time_filter(column, start, end, clauses, params):
+    if start is not None:
+        clauses.append(f'{column} >= ?')
+        params.append(start)
+    if end is not None:
+        clauses.append(f'{column} < ?')
+        params.append(end)
+
+def _summary_from_row(row):
+    trades, closed, net_pnl, wins, losses, gross_profit, gross_loss, buy_volume, sell_volume = row
+    return {
+        'trades': trades,
+        'closed_trades': closed,
+        'net_pnl': net_pnl,
+        'wins': int(wins),
+        'losses': int(losses),
+        'win_rate': wins / closed if closed else 0.0,
+        'gross_profit': gross_profit,
+        'gross_loss': gross_loss,
+        'volume': buy_volume + sell_volume
+    }
+
+def get_trade_summary(strategy=None, start=None, end=None, by='buy'):
+    """
+    Aggregate trade counts, P&L, win rate and volume in SQL.
+
+    :param strategy: str, restrict to one strategy (uses the (strategy, buy_timestamp) index)
+    :param start: str, inclusive ISO timestamp lower bound
+    :param end: str, exclusive ISO timestamp upper bound
+    :param by: str, 'buy' to window on buy_timestamp or 'sell' to window on sell_timestamp
+    :return: dict with trades, closed_trades, net_pnl, wins, losses, win_rate, gross_profit, gross_loss, volume
+    """
+    column = 'buy_timestamp' if by == 'buy' else 'sell_timestamp'
+    clauses, params = [], []
+    if strategy is not None:
+        clauses.append('strategy = ?')
+        params.append(strategy)
+    _time_filter(column, start, end, clauses, params)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+
+    conn = _connect()
+    cursor = conn.cursor()
+    cursor.execute(f'SELECT {_SUMMARY_COLUMNS} FROM trades {where}', params)
+    summary = _summary_from_row(cursor.fetchone())
+    conn.close()
+    return summary
+
+def get_pnl_by_ticker(strategy=None, start=None, end=None):
+    """
+    Realized P&L per ticker for trades closed in [start, end).
+
+    Grouping on ticker walks the (ticker, strategy, sell_timestamp) index in order.
+
+    :return: dict mapping ticker to the same summary dict as get_trade_summary
+    """
+    clauses, params = ['sell_timestamp IS NOT NULL'], []
+    if strategy is not None:
+        clauses.append('strategy = ?')
+        params.append(strategy)
+    _time_filter('sell_timestamp', start, end, clauses, params)
+
+    conn = _connect()
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT ticker, {_SUMMARY_COLUMNS} FROM trades
+        WHERE {' AND '.join(clauses)}
+        GROUP BY ticker
+    ''', params)
+    result = {row[0]: _summary_from_row(row[1:]) for row in cursor.fetchall()}
+    conn.close()
+    return result
+
+def get_pnl_by_strategy(start=None, end=None):
+    """
+    Realized P&L per strategy for trades closed in [start, end).
+
+    Aggregates per (ticker, strategy) so the (ticker, strategy, sell_timestamp)
+    index can be skip-scanned, then folds the handful of group rows per strategy.
+
+    :return: dict mapping strategy to the same summary dict as get_trade_summary
+    """
+    clauses, params = ['sell_timestamp IS NOT NULL'], []
+    _time_filter('sell_timestamp', start, end, clauses, params)
+
+    conn = _connect()
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT strategy, {_SUMMARY_COLUMNS} FROM trades
+        WHERE {' AND '.join(clauses)}
+        GROUP BY ticker, strategy
+    ''', params)
+    totals = {}
+    for row in cursor.fetchall():
+        current = totals.get(row[0])
+        totals[row[0]] = row[1:] if current is None else tuple(a + b for a, b in zip(current, row[1:]))
+    conn.close()
+    return {strategy: _summary_from_row(row) for strategy, row in totals.items()}
+
+def count_open_positions(strategy=None):
+    """
+    Count open positions using the partial open-trade index.
+    """
+    conn = _connect()
+    cursor = conn.cursor()
+    if strategy is None:
+        cursor.execute('SELECT COUNT(*) FROM trades WHERE sell_timestamp IS NULL')
+    else:
+        cursor.execute(
+            'SELECT COUNT(*) FROM trades WHERE strategy = ? AND sell_timestamp IS NULL', (strategy,)
+        )
+    count = cursor.fetchone()[0]
+    conn.close()
+    return count
+
+def get_daily_pnl(start_day, end_day=None, strategy=None, group_by='ticker'):
+    """
+    Read pre-aggregated P&L from the daily_pnl rollup.
+
+    :param start_day: str, first UTC day to include, 'YYYY-MM-DD'
+    :param end_day: str, last UTC day to include (defaults to start_day)
+    :param strategy: str, restrict to one strategy
+    :param group_by: str, 'ticker', 'strategy' or 'day'
+    :return: dict mapping the group key to trade_count, gross_pnl, net_pnl, wins, losses, win_rate, volume
+    """
+    if group_by not in ('ticker', 'strategy', 'day'):
+        raise ValueError("group_by must be 'ticker', 'strategy' or 'day'.")
+    clauses = ['day >= ?', 'day <= ?']
+    params = [start_day, end_day or start_day]
+    if strategy is not None:
+        clauses.append('strategy = ?')
+        params.append(strategy)
+
+    conn = _connect()
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT {group_by}, TOTAL(trade_count), TOTAL(gross_pnl), TOTAL(net_pnl),
+               TOTAL(wins), TOTAL(losses), TOTAL(volume)
+        FROM daily_pnl
+        WHERE {' AND '.join(clauses)}
+        GROUP BY {group_by}
+    ''', params)
+    result = {}
+    for key, trade_count, gross_pnl, net_pnl, wins, losses, volume in cursor.fetchall():
+        result[key] = {
+            'trade_count': int(trade_count),
+            'gross_pnl': gross_pnl,
+            'net_pnl': net_pnl,
+            'wins': int(wins),
+            'losses': int(losses),
+            'win_rate': wins / trade_count if trade_count else 0.0,
+            'volume': volume
+        }
+    conn.close()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description='Trade analytics maintenance commands.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('rebuild-rollups', help='Backfill the daily_pnl rollup from the trades table.')
+    args = parser.parse_args()
+
+    if args.command == 'rebuild-rollups':
+        db_manager.initialize_db()
+        rows = db_manager.rebuild_daily_pnl()
+        print(f"Rebuilt daily_pnl with {rows} rows.")
+
+if __name__ == '__main__':
+    main()
@@ -2,24 +2,22 @@
 
 import time
 import threading
-import logging
 from datetime import datetime
-from auth import get_client
+from auth import get_shared_client
 from db_manager import log_trade_open, log_trade_close, get_latest_buy_trade
+from risk_gate import pre_trade_gate
 from utils import get_current_price  # Assuming utils.py contains this function
+from metrics import histogram
+from tracing import tracer
+from logging_setup import get_logger
 
 # Configure logging
-logger = logging.getLogger('trade_executor')
-logger.setLevel(logging.INFO)
-handler = logging.StreamHandler()
-formatter = logging.Formatter('%(asctime)s:%(levelname)s:%(message)s')
-handler.setFormatter(formatter)
-if not logger.handlers:
-    logger.addHandler(handler)
+logger = get_logger('trade_executor')
 
-# Initialize the authenticated client
-client = get_client()
+ORDER_SECONDS = histogram('order_operation_seconds', 'Time spent in order operations, including exchange calls.', ('operation',))
 
+@ORDER_SECONDS.labels('place_order').time()
+@tracer.traced('place_order')
 def place_order(ticker, side, amount, strategy, order_type='limit', time_in_force='GTC', make_order=True):
     """
     Place an order and return the order ID.
@@ -31,9 +29,22 @@ def place_order(ticker, side, amount, strategy, order_type='limit', time_in_forc
     :param order_type: str, 'limit' or 'market'
     :param time_in_force: str, e.g., 'GTC' (Good Till Canceled)
     :param make_order: bool, whether to place a maker order (limit order)
-    :return: str, the order ID
+    :return: str, the order ID, or None if the order failed or was rejected by the pre-trade gate
     """
     try:
+        # Deferred: resampler pulls in NumPy, which importing this module does not otherwise need
+        from resampler import resampler
+
+        # Reject the order before it reaches the network if it breaches a pre-trade limit;
+        # exposure is valued at the last streamed price. An allowed order holds its slot
+        # in the gate until it is recorded or released below
+        reference_price = resampler.last_price(ticker)
+        allowed, rule = pre_trade_gate.check(ticker, side, amount, reference_price, strategy)
+        if not allowed:
+            return None
+
+        client = get_shared_client()
+
         # Fetch order book to determine the best price
         order_book = client.get_product_order_book(ticker, level=1)
         if side.upper() == 'BUY':
@@ -45,6 +56,12 @@ def place_order(ticker, side, amount, strategy, order_type='limit', time_in_forc
             best_bid = float(order_book['bids'][0][0])
             price = round(best_bid * 1.0001, 8)  # Adjust precision as needed
 
+        if reference_price is None:
+            # No tick seen for this ticker yet: value the exposure at the book price instead
+            allowed, rule = pre_trade_gate.check_notional(ticker, side, amount, price)
+            if not allowed:
+                return None
+
         # Create the order payload
         order = {
             'product_id': ticker,
@@ -59,7 +76,9 @@ def place_order(ticker, side, amount, strategy, order_type='limit', time_in_forc
             order['time_in_force'] = time_in_force
 
         # Place the order
-        response = client.place_order(**order)
+        with tracer.span('exchange_place_order'):
+            response = client.place_order(**order)
+        pre_trade_gate.record_order()
         logger.info(f"Placed {order_type} {side} order for {ticker}: {response}")
 
         # Record the trade initiation in the database
@@ -78,7 +97,11 @@ def place_order(ticker, side, amount, strategy, order_type='limit', time_in_forc
     except Exception as e:
         logger.error(f"Error placing {order_type} {side} order for {ticker}: {e}")
         return None
+    finally:
+        # Frees the gate slot of an order that was rejected, failed or never logged
+        pre_trade_gate.release()
 
+@ORDER_SECONDS.labels('get_order').time()
 def is_order_filled(order_id):
     """
     Check if the order is fully filled.
@@ -87,7 +110,7 @@ def is_order_filled(order_id):
     :return: bool, True if filled, False otherwise
     """
     try:
-        order_status = client.get_order(order_id)
+        order_status = get_shared_client().get_order(order_id)
         status = order_status['status']
         filled_size = float(order_status.get('filled_size', 0))
         size = float(order_status.get('size', 0))
@@ -99,6 +122,7 @@ def is_order_filled(order_id):
         logger.error(f"Error checking order status for {order_id}: {e}")
         return False
 
+@ORDER_SECONDS.labels('cancel_order').time()
 def cancel_order(order_id):
     """
     Cancel the order.
@@ -107,7 +131,7 @@ def cancel_order(order_id):
     :return: bool, True if canceled successfully, False otherwise
     """
     try:
-        result = client.cancel_order(order_id)
+        result = get_shared_client().cancel_order(order_id)
         logger.info(f"Order {order_id} cancelled: {result}")
         return True
     except Exception as e:
@@ -128,6 +152,7 @@ def close_position(ticker, amount, strategy, order_type='limit', time_in_force='
     """
     return place_order(ticker, 'SELL', amount, strategy, order_type, time_in_force, make_order)
 
+@ORDER_SECONDS.labels('get_accounts').time()
 def get_holdings(currency):
     """
     Retrieve the available balance for a specific currency.
@@ -136,7 +161,7 @@ def get_holdings(currency):
     :return: float, the available balance
     """
     try:
-        accounts = client.get_accounts()
+        accounts = get_shared_client().get_accounts()
         for account in accounts:
             if account['currency'] == currency:
                 return float(account['balance'])
@@ -0,0 +1,320 @@
+# universe.py
+
+import threading
+import time
+from config.config import BUY_AMOUNTS, SIM_EXCHANGE_PARAMS, TICKERS, UNIVERSE_PARAMS, get_settings
+from client_registry import registry
+from logging_setup import get_logger
+
+# Configure logging
+logger = get_logger('universe')
+
+_universe_listeners = []
+
+def register_universe_listener(callback):
+    """
+    Register callback(added, removed), called with lists of products whenever the universe changes.
+    """
+    _universe_listeners.append(callback)
+
+def _base_url():
+    if get_settings().SANDBOX_MODE:
+        return 'https://api-public.sandbox.exchange.coinbase.com'
+    return 'https://api.exchange.coinbase.com'
+
+def _flag(df, column):
+    import numpy as np
+
+    if column not in df.columns:
+        return np.zeros(len(df), dtype=bool)
+    return df[column].fillna(False).astype(bool).to_numpy()
+
+def fetch_products(quote_currency=None):
+    """
+    Load every product open for trading in one request.
+
+    :param quote_currency: str, keep only products quoted in it (defaults to UNIVERSE_PARAMS['quote_currency'])
+    :return: DataFrame with id, base_currency and quote_currency
+    """
+    import pandas as pd
+
+    quote_currency = quote_currency or UNIVERSE_PARAMS['quote_currency']
+    if SIM_EXCHANGE_PARAMS['enabled']:
+        from sim_exchange import get_simulated_exchange
+        products = get_simulated_exchange().get_products()
+    else:
+        response = registry.get(f'{_base_url()}/products', endpoint='GET /products')
+        response.raise_for_status()
+        products = response.json()
+
+    df = pd.DataFrame(products)
+    if df.empty:
+        return pd.DataFrame(columns=['id', 'base_currency', 'quote_currency'])
+    tradable = (
+        (df['status'] == 'online') & (df['quote_currency'] == quote_currency)
+        & ~_flag(df, 'trading_disabled') & ~_flag(df, 'cancel_only') & ~_flag(df, 'post_only')
+    )
+    return df.loc[tradable, ['id', 'base_currency', 'quote_currency']].reset_index(drop=True)
+
+def fetch_product_stats():
+    """
+    Load 24h open/high/low/last/volume for every product from the bulk stats endpoint.
+
+    :return: DataFrame indexed by product id
+    """
+    import pandas as pd
+
+    if SIM_EXCHANGE_PARAMS['enabled']:
+        from sim_exchange import get_simulated_exchange
+        stats = get_simulated_exchange().get_products_stats()
+    else:
+        response = registry.get(f'{_base_url()}/products/stats', endpoint='GET /products/stats')
+        response.raise_for_status()
+        stats = response.json()
+
+    rows = {product: entry['stats_24hour'] for product, entry in stats.items() if entry.get('stats_24hour')}
+    columns = ['open', 'high', 'low', 'last', 'volume']
+    df = pd.DataFrame.from_dict(rows, orient='index', columns=columns)
+    return df.apply(pd.to_numeric, errors='coerce')
+
+def rank_products(products, stats, params=None):
+    """
+    Score products by 24h quote volume and volatility.
+
+    The score blends the percentile rank of each, weighted by volume_weight.
+    Products below min_volume_usd or min_volatility, or listed in exclude, are
+    marked ineligible.
+
+    :param products: DataFrame from fetch_products()
+    :param stats: DataFrame from fetch_product_stats()
+    :return: DataFrame indexed by product with volume_usd, volatility, change, score and eligible, best first
+    """
+    params = UNIVERSE_PARAMS if params is None else params
+    df = stats.reindex(products['id']).dropna(subset=['last', 'volume'])
+    df = df[df['last'] > 0].copy()
+    df['volume_usd'] = df['volume'] * df['last']
+    df['volatility'] = (df['high'] - df['low']) / df['last']
+    df['change'] = df['last'] / df['open'] - 1
+    weight = params['volume_weight']
+    df['score'] = weight * df['volume_usd'].rank(pct=True) + (1 - weight) * df['volatility'].rank(pct=True)
+    df['eligible'] = (
+        (df['volume_usd'] >= params['min_volume_usd']) & (df['volatility'] >= params['min_volatility'])
+        & ~df.index.isin(params['exclude'])
+    )
+    return df.sort_values('score', ascending=False)
+
+def stack_bars(frames, bars):
+    """
+    Stack the last `bars` candles of each frame into (products x bars) arrays.
+
+    Frames with fewer bars are left out.
+
+    :param frames: dict of product -> DataFrame with open, high, low, close and optionally volume
+    :return: tuple (list of products, dict of column -> 2-D float64 array)
+    """
+    import numpy as np
+
+    products, rows = [], []
+    for product, df in list(frames.items()):
+        if df is None or len(df) < bars:
+            continue
+        tail = df.iloc[-bars:]
+        volume = tail['volume'].to_numpy(dtype=np.float64) if 'volume' in tail.columns else np.ones(bars)
+        rows.append(np.vstack([tail[column].to_numpy(dtype=np.float64) for column in ('high', 'low', 'close')]
+                              + [volume]))
+        products.append(product)
+    if not rows:
+        empty = np.zeros((0, bars))
+        return [], {'high': empty, 'low': empty, 'close': empty, 'volume': empty}
+    block = np.stack(rows)  # products x 4 x bars
+    return products, {'high': block[:, 0], 'low': block[:, 1], 'close': block[:, 2], 'volume': block[:, 3]}
+
+def screen(high, low, close, volume, params=None):
+    """
+    Cheap vectorized screen over recent bars, one row per product.
+
+    A product passes if its average bar range is at least min_range_pct and
+    it has moved at least min_momentum over the window or its recent volume is
+    min_volume_ratio times the window average. NaN volumes count as average.
+
+    :return: tuple (bool array of survivors, float array of scores for ordering them)
+    """
+    import numpy as np
+
+    params = UNIVERSE_PARAMS['screen'] if params is None else params
+    with np.errstate(divide='ignore', invalid='ignore'):
+        momentum = close[:, -1] / close[:, 0] - 1
+        range_pct = np.nanmean((high - low) / close, axis=1)
+        volume_ratio = np.nanmean(volume[:, -params['recent_bars']:], axis=1) / np.nanmean(volume, axis=1)
+    volume_ratio = np.nan_to_num(volume_ratio, nan=1.0, posinf=1.0)
+    passed = (range_pct >= params['min_range_pct']) & (
+        (np.abs(momentum) >= params['min_momentum']) | (volume_ratio >= params['min_volume_ratio'])
+    )
+    score = np.nan_to_num(np.abs(momentum) / params['min_momentum'] + volume_ratio / params['min_volume_ratio'])
+    return passed, score
+
+def buy_amount(ticker):
+    """
+    Return the USD amount to buy for a ticker, falling back to default_buy_amount.
+    """
+    return BUY_AMOUNTS.get(ticker, UNIVERSE_PARAMS['default_buy_amount'])
+
+class Universe:
+    """
+    The set of products the bot watches, refreshed from the exchange.
+
+    refresh() loads all products and their 24h stats in two requests, ranks
+    them (see rank_products) and keeps the best max_products plus the pinned
+    tickers and any ticker with an open position. config.TICKERS is updated in
+    place, so every module that imported it sees the new universe; tickers
+    without history get it fetched on their first websocket tick.
+
+    screen_history() runs the cheap screen over the latest bars of every
+    watched ticker; `candidates` holds the survivors, best first, and
+    candidate_indicators() runs calculate_indicators on those only and keeps
+    the frames in `indicators`. Both run at startup and after every
+    15-minute close.
+
+    Strategies look for entries with strategy_tickers() and
+    indicators_for() instead of looping over TICKERS: with the universe
+    enabled that is the few screened candidates rather than every watched
+    product, so the indicator pipeline no longer runs for all of them.
+    """
+
+    def __init__(self, params=None):
+        self.params = UNIVERSE_PARAMS if params is None else params
+        self.ranked = None
+        self.candidates = []
+        self.indicators = {}  # candidate -> DataFrame with indicators, from the last screen
+        self.refreshed_at = None
+        self._lock = threading.Lock()
+
+    def _held_tickers(self):
+        from db_manager import get_open_trades
+
+        try:
+            return {trade['ticker'] for trade in get_open_trades()}
+        except Exception as e:
+            logger.error(f"Could not load open trades; keeping every current ticker: {e}")
+            return set(TICKERS)
+
+    def select(self, ranked):
+        """
+        Return the products to watch: pinned and held tickers, then the best eligible ones.
+        """
+        keep = list(self.params['pinned'])
+        keep += sorted(self._held_tickers() - set(keep))
+        selected = set(keep)
+        for product in ranked.index[ranked['eligible'].to_numpy()]:
+            if len(keep) >= self.params['max_products']:
+                break
+            if product not in selected:
+                keep.append(product)
+                selected.add(product)
+        return keep
+
+    def refresh(self):
+        """
+        Reload products and stats, re-rank and update config.TICKERS in place.
+
+        :return: list of watched products
+        """
+        start = time.monotonic()
+        try:
+            ranked = rank_products(fetch_products(), fetch_product_stats(), self.params)
+        except Exception as e:
+            logger.error(f"Universe refresh failed; keeping {len(TICKERS)} tickers: {e}")
+            return list(TICKERS)
+
+        with self._lock:
+            products = self.select(ranked)
+            added = [product for product in products if product not in TICKERS]
+            removed = [product for product in TICKERS if product not in products]
+            TICKERS[:] = products
+            for product in added:
+                BUY_AMOUNTS.setdefault(product, self.params['default_buy_amount'])
+            self.ranked = ranked
+            self.refreshed_at = time.time()
+
+        logger.info(
+            f"Universe refreshed in {time.monotonic() - start:.2f}s: {int(ranked['eligible'].sum())} of "
+            f"{len(ranked)} products eligible, watching {len(products)} (+{len(added)} -{len(removed)})."
+        )
+        if added or removed:
+            for callback in _universe_listeners:
+                try:
+                    callback(added, removed)
+                except Exception as e:
+                    logger.error(f"Universe listener failed: {e}")
+        return products
+
+    def screen_history(self, history=None):
+        """
+        Screen the latest bars of every watched ticker and store the survivors in `candidates`.
+
+        :param history: dict of ticker -> DataFrame (defaults to the live historical_data)
+        :return: list of surviving tickers, best first, at most max_candidates
+        """
+        import numpy as np
+
+        if history is None:
+            from process_websocket_data import historical_data as history
+        params = self.params['screen']
+        watched = set(TICKERS)
+        products, bars = stack_bars({ticker: df for ticker, df in list(history.items()) if ticker in watched},
+                                    params['bars'])
+        if not products:
+            self.candidates = []
+            return []
+        passed, score = screen(bars['high'], bars['low'], bars['close'], bars['volume'], params)
+        order = np.argsort(-score)
+        candidates = [products[i] for i in order if passed[i]][:params['max_candidates']]
+        self.candidates = candidates
+        logger.info(f"Screened {len(products)} tickers: {len(candidates)} candidates {candidates}.")
+        return candidates
+
+    def candidate_indicators(self, history=None):
+        """
+        Screen, then run the full indicator pipeline on the candidates only and keep the result in `indicators`.
+
+        :return: dict of ticker -> DataFrame with indicators
+        """
+        from indicators import calculate_indicators
+
+        if history is None:
+            from process_websocket_data import historical_data as history
+        indicators = {
+            ticker: calculate_indicators(history[ticker].copy())
+            for ticker in self.screen_history(history) if ticker in history
+        }
+        self.indicators = indicators
+        return indicators
+
+    def strategy_tickers(self):
+        """
+        Return the tickers strategies should evaluate for entries.
+
+        :return: list, the screened candidates when the universe is enabled, else every ticker in TICKERS
+        """
+        if not self.params['enabled']:
+            return list(TICKERS)
+        return list(self.candidates)
+
+    def indicators_for(self, ticker, history=None):
+        """
+        Return a ticker's indicator frame, from the last screen when it is a candidate, else computed now.
+
+        :param history: dict of ticker -> DataFrame (defaults to the live historical_data)
+        :return: DataFrame with indicators, or None without history for the ticker
+        """
+        df = self.indicators.get(ticker)
+        if df is not None:
+            return df
+        from indicators import calculate_indicators
+
+        if history is None:
+            from process_websocket_data import historical_data as history
+        df = history.get(ticker)
+        return None if df is None else calculate_indicators(df.copy())
+
+universe = Universe()
@@ -1,19 +1,10 @@
 # utils.py
 
-import logging
-from auth import get_client
+from auth import get_shared_client
+from logging_setup import get_logger
 
 # Configure logging
-logger = logging.getLogger('utils')
-logger.setLevel(logging.INFO)
-handler = logging.StreamHandler()
-formatter = logging.Formatter('%(asctime)s:%(levelname)s:%(message)s')
-handler.setFormatter(formatter)
-if not logger.handlers:
-    logger.addHandler(handler)
-
-# Initialize the authenticated client
-client = get_client()
+logger = get_logger('utils')
 
 def get_current_price(ticker):
     """
@@ -23,7 +14,7 @@ def get_current_price(ticker):
     :return: float, the current price
     """
     try:
-        ticker_data = client.get_product_ticker(product_id=ticker)
+        ticker_data = get_shared_client().get_product_ticker(product_id=ticker)
         return float(ticker_data['price'])
     except Exception as e:
         logger.error(f"Error fetching price for {ticker}: {e}")
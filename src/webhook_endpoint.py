@@ -1,19 +1,15 @@
 # webhook_endpoint.py
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 import threading
-import logging
+from config.config import WEBHOOK_SERVER_PARAMS, get_settings
+from metrics import REGISTRY, CONTENT_TYPE
+from logging_setup import get_logger
 
 app = Flask(__name__)
 
 # Configure logging
-logger = logging.getLogger('webhook_endpoint')
-logger.setLevel(logging.INFO)
-handler = logging.StreamHandler()
-formatter = logging.Formatter('%(asctime)s:%(levelname)s:%(message)s')
-handler.setFormatter(formatter)
-if not logger.handlers:
-    logger.addHandler(handler)
+logger = get_logger('webhook_endpoint')
 
 @app.route('/webhook', methods=['POST'])
 def webhook():
@@ -23,15 +19,36 @@ def webhook():
     process_webhook_data(data)
     return jsonify({'status': 'success'}), 200
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
 def process_webhook_data(data):
     # Implement your logic here
     pass
 
 def run_webhook_server():
-    app.run(host='0.0.0.0', port=5000)
+    app.run(host=WEBHOOK_SERVER_PARAMS['host'], port=WEBHOOK_SERVER_PARAMS['port'])
+
+def run_ingest_server():
+    from webhook_ingest import WebhookIngestServer
+    WebhookIngestServer(process_webhook_data).run()
 
 # To run the server in a separate thread
-def start_webhook_server():
-    server_thread = threading.Thread(target=run_webhook_server)
+def start_webhook_server(mode=None):
+    """
+    Start the webhook server in a daemon thread.
+
+    :param mode: str, 'async' for the aiohttp ingestion server or 'flask' for the
+                 Flask development server; defaults to the WEBHOOK_SERVER_MODE setting
+    """
+    mode = mode or get_settings().WEBHOOK_SERVER_MODE
+    if mode == 'async':
+        target = run_ingest_server
+    elif mode == 'flask':
+        target = run_webhook_server
+    else:
+        raise ValueError("Invalid webhook server mode. Use 'async' or 'flask'.")
+    server_thread = threading.Thread(target=target)
     server_thread.daemon = True
-    server_thread.start()
\ No newline at end of file
+    server_thread.start()
@@ -0,0 +1,220 @@
+# webhook_ingest.py
+
+import asyncio
+import json
+import queue
+import threading
+import time
+from collections import OrderedDict
+from aiohttp import web
+from config.config import WEBHOOK_SERVER_PARAMS
+from metrics import REGISTRY, CONTENT_TYPE, gauge
+from logging_setup import get_logger
+
+# Configure logging
+logger = get_logger('webhook_ingest')
+
+# Payload keys and headers checked, in order, for an event id to de-duplicate on
+EVENT_ID_KEYS = ('id', 'event_id', 'eventId')
+EVENT_ID_HEADERS = ('X-Event-Id', 'X-Request-Id', 'Idempotency-Key')
+
+class TTLCache:
+    """
+    Set of recently seen keys that forgets each key `ttl` seconds after it was added.
+
+    Entries are kept in insertion order, which is also expiry order, so expiring
+    is a pop from the front.
+    """
+
+    def __init__(self, ttl, max_size=100000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+    def _expire(self, now):
+        entries = self._entries
+        while entries:
+            key, expires_at = next(iter(entries.items()))
+            if expires_at > now and len(entries) <= self.max_size:
+                break
+            entries.popitem(last=False)
+
+    def __contains__(self, key):
+        self._expire(time.monotonic())
+        return key in self._entries
+
+    def add(self, key):
+        """
+        Record `key` and return True if it was not already present.
+        """
+        if key in self:
+            return False
+        self._entries[key] = time.monotonic() + self.ttl
+        return True
+
+    def __len__(self):
+        return len(self._entries)
+
+class WebhookIngestServer:
+    """
+    aiohttp webhook server that acknowledges quickly and processes in the background.
+
+    The request handler only parses and validates the JSON body, drops
+    redeliveries of recently seen event ids and puts the payload on a bounded
+    queue; worker threads drain the queue and run the (synchronous) processing
+    function, so slow processing never holds up senders. The event loop does
+    no per-event work once the payload is queued: no executor futures or
+    cross-thread wakeups compete with acknowledging the next request.
+    """
+
+    def __init__(self, process, host=None, port=None, queue_size=None, workers=None,
+                 dedupe_ttl=None, max_body_bytes=None):
+        params = WEBHOOK_SERVER_PARAMS
+        self.process = process
+        self.host = params['host'] if host is None else host
+        self.port = params['port'] if port is None else port
+        self.queue_size = params['queue_size'] if queue_size is None else queue_size
+        self.workers = params['workers'] if workers is None else workers
+        self.max_body_bytes = params['max_body_bytes'] if max_body_bytes is None else max_body_bytes
+        self.dedupe = TTLCache(params['dedupe_ttl'] if dedupe_ttl is None else dedupe_ttl)
+        self.stats = {'accepted': 0, 'duplicate': 0, 'rejected': 0, 'processed': 0, 'failed': 0}
+        self._ack_time_ns = 0  # From the body being read to the response being ready
+        self._body_wait_ns = 0  # From the handler starting until the body has arrived
+        self._queue = None
+        self._runner = None
+        self._threads = []
+        self._stats_lock = threading.Lock()  # processed/failed are counted from worker threads
+        self.loop = None
+        self.ready = threading.Event()
+
+    def _event_id(self, request, data):
+        for key in EVENT_ID_KEYS:
+            value = data.get(key)
+            if value is not None:
+                return str(value)
+        for header in EVENT_ID_HEADERS:
+            value = request.headers.get(header)
+            if value:
+                return value
+        return None
+
+    def _reject(self, status, reason):
+        self.stats['rejected'] += 1
+        return web.json_response({'status': 'rejected', 'reason': reason}, status=status)
+
+    async def handle_webhook(self, request):
+        if request.content_length is not None and request.content_length > self.max_body_bytes:
+            return self._reject(413, 'payload too large')
+        wait_start = time.perf_counter_ns()
+        body = await request.read()
+        # Clients often send the body in a packet after the headers; waiting for it is not ack work
+        start = time.perf_counter_ns()
+        self._body_wait_ns += start - wait_start
+        try:
+            try:
+                data = json.loads(body)
+            except ValueError:
+                return self._reject(400, 'invalid JSON')
+            if not isinstance(data, dict):
+                return self._reject(400, 'payload must be a JSON object')
+
+            event_id = self._event_id(request, data)
+            if event_id is not None and event_id in self.dedupe:
+                self.stats['duplicate'] += 1
+                return web.json_response({'status': 'duplicate'}, status=200)
+            try:
+                self._queue.put_nowait(data)
+            except queue.Full:
+                # Not recorded as seen, so the sender's retry is accepted once there is room
+                return self._reject(503, 'queue full')
+            if event_id is not None:
+                self.dedupe.add(event_id)
+            self.stats['accepted'] += 1
+            return web.json_response({'status': 'accepted'}, status=202)
+        finally:
+            self._ack_time_ns += time.perf_counter_ns() - start
+
+    async def handle_stats(self, request):
+        return web.json_response(self.get_stats())
+
+    def get_stats(self):
+        handled = sum(self.stats[key] for key in ('accepted', 'duplicate', 'rejected'))
+        return dict(
+            self.stats,
+            queued=self._queue.qsize() if self._queue is not None else 0,
+            dedupe_entries=len(self.dedupe),
+            avg_ack_us=self._ack_time_ns / handled / 1000 if handled else 0.0,
+            avg_body_wait_us=self._body_wait_ns / handled / 1000 if handled else 0.0
+        )
+
+    def _worker(self):
+        while True:
+            data = self._queue.get()
+            if data is None:
+                self._queue.task_done()
+                return
+            try:
+                self.process(data)
+                outcome = 'processed'
+            except Exception as e:
+                outcome = 'failed'
+                logger.error(f"Error processing webhook event: {e}")
+            finally:
+                self._queue.task_done()
+            with self._stats_lock:
+                self.stats[outcome] += 1
+
+    async def handle_metrics(self, request):
+        return web.Response(body=REGISTRY.render().encode(), headers={'Content-Type': CONTENT_TYPE})
+
+    def make_app(self):
+        app = web.Application(client_max_size=self.max_body_bytes)
+        app.router.add_post('/webhook', self.handle_webhook)
+        app.router.add_get('/webhook/stats', self.handle_stats)
+        app.router.add_get('/metrics', self.handle_metrics)
+        return app
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        gauge('webhook_queue_depth', 'Accepted webhook events waiting for a worker.').set_function(self._queue.qsize)
+        self._threads = [
+            threading.Thread(target=self._worker, name=f'webhook-worker-{i}', daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        if self.port == 0:
+            # Ephemeral port requested (benchmarks); report the one the OS picked
+            self.port = self._runner.addresses[0][1]
+        logger.info(f"Webhook ingestion server listening on {self.host}:{self.port}")
+        self.ready.set()
+
+    async def stop(self, drain_timeout=5):
+        """
+        Stop accepting requests, give queued events up to drain_timeout seconds, then stop workers.
+        """
+        if self._runner is not None:
+            await self._runner.cleanup()
+        deadline = time.monotonic() + drain_timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self._queue.unfinished_tasks:
+            logger.warning(f"Stopping with {self._queue.qsize()} webhook events unprocessed.")
+            return  # Daemon workers are left to finish the event in hand
+        for _ in self._threads:
+            self._queue.put(None)
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.stop()
+
+    def run(self):
+        asyncio.run(self.serve_forever())
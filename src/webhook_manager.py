@@ -2,29 +2,32 @@
 
 import sys
 import os
-import logging
-from cdp.client.models.webhook import WebhookEventType, WebhookEventFilter
-from cdp.cdp import Cdp
 
 # Ensure parent directory is in sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from auth import get_client
+from auth import get_shared_client
+from logging_setup import get_logger
 
 # Configure logging
-logger = logging.getLogger('webhook_manager')
-logger.setLevel(logging.INFO)
-handler = logging.StreamHandler()
-formatter = logging.Formatter('%(asctime)s:%(levelname)s:%(message)s')
-handler.setFormatter(formatter)
-if not logger.handlers:
-    logger.addHandler(handler)
-
-# Initialize the CDP client
-client = get_client()
-Cdp.initialize(client)
+logger = get_logger('webhook_manager')
+
+_cdp_initialized = False
+
+def get_cdp():
+    """
+    Return the Cdp SDK entry point, initializing it with the shared client on first use.
+    """
+    global _cdp_initialized
+    from cdp.cdp import Cdp
+    if not _cdp_initialized:
+        Cdp.initialize(get_shared_client())
+        _cdp_initialized = True
+    return Cdp
 
 def create_webhook():
+    from cdp.client.models.webhook import WebhookEventType, WebhookEventFilter
+
     notification_uri = "https://your-app.com/webhook"  # Replace with your actual webhook URL
     event_type = WebhookEventType.TRANSFER  # Change as needed
     network_id = "ethereum-goerli"  # Change as needed
@@ -45,6 +48,6 @@ def create_webhook():
         "event_filters": event_filters
     }
 
-    webhook = Cdp.api_clients.webhooks.create_webhook(create_webhook_request)
+    webhook = get_cdp().api_clients.webhooks.create_webhook(create_webhook_request)
     logger.info(f"Webhook created: {webhook}")
     return webhook
\ No newline at end of file
@@ -4,47 +4,118 @@ import websocket
 import json
 import logging
 import threading
-from config.config import TICKERS, SANDBOX_MODE
-from process_websocket_data import process_websocket_data   
+import time
+from config.config import SIM_EXCHANGE_PARAMS, TICKERS, UNIVERSE_PARAMS, WEBSOCKET_SHARD_PARAMS, get_settings
+from process_websocket_data import process_websocket_data
+from metrics import counter, histogram
+from tracing import tracer
+from logging_setup import get_logger
 
 # Configure logging
-logger = logging.getLogger('websocket_client')
-logger.setLevel(logging.WARNING)
-handler = logging.StreamHandler()
-formatter = logging.Formatter('%(asctime)s:%(levelname)s:%(message)s')
-handler.setFormatter(formatter)
-if not logger.handlers:
-    logger.addHandler(handler)
+logger = get_logger('websocket_client')
+
+# Set once the exchange confirms the ticker subscription
+subscribed = threading.Event()
+
+# The single connection, when not sharded; universe changes are sent on it
+_ws = None
+
+MESSAGES = counter('websocket_messages_total', 'Websocket messages received, by message type.', ('type',))
+MESSAGE_SECONDS = histogram('websocket_message_seconds', 'Time from a websocket message arriving until it has been handled.')
+_message_seconds = MESSAGE_SECONDS.labels()
+
+def handle_message(data, start):
+    """
+    Count, trace and process one parsed message.
+
+    :param data: dict, the decoded message
+    :param start: int, perf_counter_ns() when the message arrived
+    """
+    MESSAGES.labels(data.get('type')).inc()
+    if data.get('type') == 'subscriptions':
+        subscribed.set()
+    if logger.isEnabledFor(logging.INFO):  # Don't format every payload when the level is off
+        logger.info(f"Received message: {data}")
+    # Time this tick from arrival through every stage it triggers
+    trace = tracer.begin(data.get('product_id'), start) if data.get('type') == 'ticker' else None
+    try:
+        # Process the message and integrate with your trading strategies
+        process_websocket_data(data)
+    finally:
+        if trace is not None:
+            tracer.end(trace, 'websocket_message')
+    _message_seconds.observe((time.perf_counter_ns() - start) / 1e9)
 
 def on_message(ws, message):
-    data = json.loads(message)
-    logger.info(f"Received message: {data}")
-    # Process the message and integrate with your trading strategies
-    process_websocket_data(data)
+    start = time.perf_counter_ns()
+    handle_message(json.loads(message), start)
 
 def on_error(ws, error):
     logger.error(f"WebSocket error: {error}")
 
 def on_close(ws, close_status_code, close_msg):
+    global _ws
+    _ws = None
     logger.info("WebSocket connection closed.")
 
 def on_open(ws):
+    global _ws
     logger.info("WebSocket connection opened.")
+    _ws = ws
     subscribe_message = {
         "type": "subscribe",
         "channels": [{
             "name": "ticker",
-            "product_ids": TICKERS  # Use your list of valid tickers
+            "product_ids": TICKERS  # Use your list of valid tickers (updated in place by the universe)
         }]
     }
     ws.send(json.dumps(subscribe_message))
 
+def update_subscriptions(added, removed):
+    """
+    Subscribe added products and unsubscribe removed ones on the single connection.
+
+    Usable as a universe listener (see universe.register_universe_listener).
+    """
+    ws = _ws
+    if ws is None:
+        return  # Not open yet; on_open subscribes the updated TICKERS
+    for kind, products in (('unsubscribe', removed), ('subscribe', added)):
+        if not products:
+            continue
+        message = {"type": kind, "channels": [{"name": "ticker", "product_ids": list(products)}]}
+        try:
+            ws.send(json.dumps(message))
+        except websocket.WebSocketConnectionClosedException:
+            logger.warning(f"WebSocket closed before {kind} of {len(products)} products was sent.")
+    logger.info(f"Subscriptions updated: +{len(added)} -{len(removed)} products.")
+
 def run_websocket():
-    if SANDBOX_MODE:
+    if SIM_EXCHANGE_PARAMS['enabled']:
+        # Replayed ticks from the simulated exchange go through the same handler
+        from sim_exchange import run_feed
+        run_feed(on_message)
+        return
+
+    if get_settings().SANDBOX_MODE:
         websocket_url = 'wss://ws-feed-public.sandbox.exchange.coinbase.com'
     else:
         websocket_url = 'wss://ws-feed.exchange.coinbase.com'
 
+    if WEBSOCKET_SHARD_PARAMS['enabled']:
+        # Products spread over several connections, processed by a worker pool
+        from websocket_shards import SubscriptionManager
+        manager = SubscriptionManager(TICKERS, handle_message, websocket_url, ready_event=subscribed)
+        if UNIVERSE_PARAMS['enabled']:
+            from universe import register_universe_listener
+            register_universe_listener(manager.update_products)
+        manager.run()
+        return
+
+    if UNIVERSE_PARAMS['enabled']:
+        from universe import register_universe_listener
+        register_universe_listener(update_subscriptions)
+
     ws = websocket.WebSocketApp(
         websocket_url,
         on_open=on_open,
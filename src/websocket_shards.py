@@ -0,0 +1,478 @@
+# websocket_shards.py
+
+import json
+import math
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+import websocket
+from config.config import WEBSOCKET_SHARD_PARAMS
+from metrics import counter, gauge, histogram
+from scheduler import scheduler
+from logging_setup import get_logger
+
+# Configure logging
+logger = get_logger('websocket_shards')
+
+MESSAGES = counter('websocket_shard_messages_total', 'Websocket messages received, by connection.', ('connection',))
+LAG_SECONDS = histogram('websocket_shard_lag_seconds',
+                        'Delay from the exchange timestamp of a ticker message to its arrival, by connection.',
+                        ('connection',))
+QUEUE_SECONDS = histogram('websocket_shard_queue_seconds', 'Time a ticker message waited for a processing worker.')
+DROPPED = counter('websocket_shard_dropped_total', 'Ticker messages dropped before processing, by reason.', ('reason',))
+MOVED = counter('websocket_shard_moves_total', 'Products moved to another connection by rebalancing.')
+RATE = gauge('websocket_shard_rate', 'Messages per second over the last rebalance interval, by connection.',
+             ('connection',))
+LAG = gauge('websocket_shard_lag_ewma_seconds', 'Smoothed arrival lag of ticker messages, by connection.',
+            ('connection',))
+PRODUCTS = gauge('websocket_shard_products', 'Products subscribed, by connection.', ('connection',))
+BACKLOG = gauge('websocket_shard_backlog', 'Ticker messages waiting for a processing worker.')
+
+def partition(rates, max_rate, max_products, max_connections):
+    """
+    Split products across connections so each carries a similar message rate.
+
+    Uses as many connections as needed to keep every one under `max_rate` and
+    `max_products` (at most `max_connections`), then assigns products from the
+    busiest down, each to the connection with the lowest load so far.
+
+    :param rates: dict of product -> expected messages per second
+    :return: list of lists of products, one per connection
+    """
+    count = max(1, math.ceil(sum(rates.values()) / max_rate), math.ceil(len(rates) / max_products))
+    count = min(count, max_connections)
+    shards = [[] for _ in range(count)]
+    loads = [0.0] * count
+    for product in sorted(rates, key=lambda product: -rates[product]):
+        candidates = [i for i in range(count) if len(shards[i]) < max_products] or range(count)
+        i = min(candidates, key=loads.__getitem__)
+        shards[i].append(product)
+        loads[i] += rates[product]
+    return shards
+
+def _exchange_time(stamp):
+    return datetime.fromisoformat(stamp.replace('Z', '+00:00')).timestamp()
+
+class _ProductQueue:
+    """
+    Pending messages of one product. At most one worker drains it at a time,
+    which keeps each product's messages in order.
+    """
+
+    __slots__ = ('product', 'messages', 'scheduled', 'last_sequence', 'lock')
+
+    def __init__(self, product):
+        self.product = product
+        self.messages = deque()
+        self.scheduled = False
+        self.last_sequence = -1
+        self.lock = threading.Lock()
+
+class ShardConnection:
+    """
+    One websocket connection carrying the ticker channel for a subset of products.
+
+    Reconnects with exponential backoff and resubscribes its current products.
+    Messages are parsed on the connection's own thread and handed to the
+    manager's per-product queues, so a slow consumer never blocks the socket.
+    """
+
+    def __init__(self, manager, index):
+        self.manager = manager
+        self.name = f'websocket-{index}'
+        self.products = set()
+        self.subscribed = threading.Event()
+        self.messages = 0
+        self.rate = 0.0
+        self.lag = 0.0
+        self.lag_floor = float('inf')  # Lowest lag seen: network delay plus clock offset
+        self.counts = {}  # Product -> messages since the last rebalance
+        self._handoffs = {}  # Product -> connection to unsubscribe once this one confirms
+        self._ws = None
+        self._thread = None
+        self._open = False
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._messages = MESSAGES.labels(self.name)
+        self._lag_seconds = LAG_SECONDS.labels(self.name)
+        PRODUCTS.labels(self.name).set_function(lambda: len(self.products))
+        RATE.labels(self.name).set_function(lambda: self.rate)
+        LAG.labels(self.name).set_function(lambda: self.lag)
+
+    def load(self, rates):
+        return sum(rates.get(product, 0.0) for product in list(self.products))
+
+    @property
+    def started(self):
+        return self._thread is not None
+
+    def behind(self):
+        """
+        Return seconds by which messages arrive later than the best this connection has seen.
+        """
+        return self.lag - self.lag_floor if self.lag_floor != float('inf') else 0.0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._ws is not None:
+            self._ws.close()
+
+    def _run(self):
+        params = self.manager.params
+        backoff = params['reconnect_backoff']
+        while not self._stopped.is_set():
+            self._ws = websocket.WebSocketApp(
+                self.manager.url,
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=self._on_error,
+                on_close=self._on_close
+            )
+            started = time.monotonic()
+            self._ws.run_forever()
+            if self._stopped.is_set():
+                break
+            if time.monotonic() - started > params['max_reconnect_backoff']:
+                backoff = params['reconnect_backoff']  # Was up for a while; start over
+            logger.warning(f"{self.name} disconnected; reconnecting in {backoff}s.")
+            self._stopped.wait(backoff)
+            backoff = min(backoff * 2, params['max_reconnect_backoff'])
+
+    def _send(self, kind, products):
+        if not products or not self._open:
+            return  # Sent with the full product list when the connection opens
+        message = {'type': kind, 'channels': [{'name': 'ticker', 'product_ids': sorted(products)}]}
+        try:
+            self._ws.send(json.dumps(message))
+        except websocket.WebSocketConnectionClosedException:
+            logger.warning(f"{self.name} closed before {kind} of {len(products)} products was sent.")
+
+    def subscribe(self, products, handoff_from=None):
+        """
+        Add products to this connection.
+
+        :param handoff_from: ShardConnection that carries them now; it is unsubscribed
+                             once this connection confirms, so no ticks are missed
+        """
+        with self._lock:
+            self.products.update(products)
+            if handoff_from is not None:
+                self._handoffs.update((product, handoff_from) for product in products)
+            self._send('subscribe', products)
+
+    def unsubscribe(self, products):
+        with self._lock:
+            self.products.difference_update(products)
+            self._send('unsubscribe', products)
+
+    def _on_open(self, ws):
+        with self._lock:
+            self._open = True
+            self._send('subscribe', self.products)
+        logger.info(f"{self.name} opened with {len(self.products)} products.")
+
+    def _on_close(self, ws, close_status_code, close_msg):
+        self._open = False
+        self.subscribed.clear()
+        logger.info(f"{self.name} closed.")
+
+    def _on_error(self, ws, error):
+        logger.error(f"{self.name} error: {error}")
+
+    def _on_message(self, ws, message):
+        received = time.perf_counter_ns()
+        data = json.loads(message)
+        self.messages += 1
+        self._messages.inc()
+        kind = data.get('type')
+        if kind == 'ticker':
+            product = data.get('product_id')
+            self.counts[product] = self.counts.get(product, 0) + 1
+            if 'time' in data:
+                lag = max(0.0, time.time() - _exchange_time(data['time']))
+                self._lag_seconds.observe(lag)
+                if lag < self.lag_floor:
+                    self.lag_floor = lag
+                    if not self.lag:
+                        self.lag = lag
+                self.lag += 0.05 * (lag - self.lag)
+            self.manager.enqueue(data, received)
+        elif kind == 'subscriptions':
+            self._on_subscriptions(data)
+        elif kind == 'error':
+            logger.error(f"{self.name} received error: {data.get('message')} {data.get('reason', '')}")
+
+    def _on_subscriptions(self, data):
+        confirmed = set()
+        for channel in data.get('channels', []):
+            if channel.get('name') == 'ticker':
+                confirmed.update(channel.get('product_ids', []))
+        with self._lock:
+            handoffs = {product: source for product, source in self._handoffs.items() if product in confirmed}
+            for product in handoffs:
+                del self._handoffs[product]
+        for source in set(handoffs.values()):
+            source.unsubscribe([product for product, s in handoffs.items() if s is source])
+        if confirmed >= self.products:
+            self.subscribed.set()
+            self.manager.on_subscribed()
+
+class SubscriptionManager:
+    """
+    Spreads ticker subscriptions over several websocket connections.
+
+    Products are partitioned by expected message rate (see partition()). Every
+    connection feeds one ordered queue per product, drained by a pool of
+    worker threads that call `handler(data, received_ns)`; a product is
+    handled by one worker at a time, so its messages are processed in order
+    while different products run in parallel. Messages whose sequence number
+    is not newer than the last one handled for the product (duplicates while a
+    product moves between connections) are dropped.
+
+    Every rebalance_interval the measured per-product rates replace the
+    estimates, and a connection that is over max_rate_per_connection or whose
+    messages arrive more than max_lag seconds late has its busiest products
+    moved to the least loaded connection, opening a new one if all are full.
+    Lateness is measured against the lowest lag the connection has seen, so
+    network delay and clock offset don't count as falling behind.
+    A moved product is subscribed on the new connection first and only
+    unsubscribed from the old one once the exchange confirms.
+    """
+
+    def __init__(self, products, handler, url, rates=None, params=None, ready_event=None):
+        """
+        :param products: list of product ids
+        :param handler: callable(data, received_ns) run on a worker thread per ticker message
+        :param url: str, websocket feed URL
+        :param rates: dict of product -> expected messages per second; missing ones use default_rate
+        :param ready_event: threading.Event set once every connection has confirmed its subscriptions
+        """
+        self.params = WEBSOCKET_SHARD_PARAMS if params is None else params
+        self.handler = handler
+        self.url = url
+        rates = rates or {}
+        self.rates = {product: rates.get(product, self.params['default_rate']) for product in products}
+        self.ready = ready_event or threading.Event()
+        self.connections = []
+        self._queues = {}
+        self._queues_lock = threading.Lock()
+        self._ready_queues = queue.SimpleQueue()
+        self._last_rebalance = None
+        self._stopped = threading.Event()
+
+    def _add_connection(self):
+        connection = ShardConnection(self, len(self.connections))
+        self.connections.append(connection)
+        return connection
+
+    def start(self):
+        params = self.params
+        shards = partition(self.rates, params['max_rate_per_connection'],
+                           params['max_products_per_connection'], params['max_connections'])
+        for products in shards:
+            self._add_connection().subscribe(products)
+        for i in range(params['workers']):
+            threading.Thread(target=self._work, name=f'websocket-worker-{i}', daemon=True).start()
+        BACKLOG.set_function(self.backlog)
+        self._last_rebalance = time.monotonic()
+        for connection in self.connections:
+            connection.start()
+        scheduler.every(params['rebalance_interval'], self.rebalance, name='websocket_rebalance')
+        logger.info(
+            f"Subscribing {len(self.rates)} products over {len(self.connections)} connections "
+            f"with {params['workers']} workers."
+        )
+
+    def run(self):
+        """
+        Start and block until stop(), like WebSocketApp.run_forever.
+        """
+        self.start()
+        self._stopped.wait()
+
+    def stop(self):
+        self._stopped.set()
+        scheduler.cancel('websocket_rebalance')
+        for connection in self.connections:
+            connection.stop()
+        for _ in range(self.params['workers']):
+            self._ready_queues.put(None)
+
+    def on_subscribed(self):
+        if all(connection.subscribed.is_set() for connection in self.connections):
+            self.ready.set()
+
+    def backlog(self):
+        return sum(len(product_queue.messages) for product_queue in list(self._queues.values()))
+
+    def _queue(self, product):
+        product_queue = self._queues.get(product)
+        if product_queue is None:
+            with self._queues_lock:
+                product_queue = self._queues.setdefault(product, _ProductQueue(product))
+        return product_queue
+
+    def enqueue(self, data, received_ns):
+        """
+        Queue a ticker message for its product; called on the connection threads.
+        """
+        product_queue = self._queue(data.get('product_id'))
+        with product_queue.lock:
+            if len(product_queue.messages) >= self.params['max_pending']:
+                # Ticker messages are snapshots; when hopelessly behind keep the newest
+                product_queue.messages.popleft()
+                DROPPED.labels('overflow').inc()
+            product_queue.messages.append((data, received_ns))
+            if product_queue.scheduled:
+                return
+            product_queue.scheduled = True
+        self._ready_queues.put(product_queue)
+
+    def _work(self):
+        batch = self.params['batch']
+        queue_seconds = QUEUE_SECONDS.labels()
+        stale = DROPPED.labels('stale')
+        while True:
+            product_queue = self._ready_queues.get()
+            if product_queue is None:
+                return
+            for _ in range(batch):
+                with product_queue.lock:
+                    if not product_queue.messages:
+                        product_queue.scheduled = False
+                        break
+                    data, received_ns = product_queue.messages.popleft()
+                sequence = data.get('sequence')
+                if sequence is not None:
+                    if sequence <= product_queue.last_sequence:
+                        stale.inc()
+                        continue
+                    product_queue.last_sequence = sequence
+                queue_seconds.observe((time.perf_counter_ns() - received_ns) / 1e9)
+                try:
+                    self.handler(data, received_ns)
+                except Exception as e:
+                    logger.error(f"Error handling ticker for {product_queue.product}: {e}")
+            else:
+                # Still scheduled; go to the back of the line so other products get a turn
+                self._ready_queues.put(product_queue)
+
+    def update_products(self, added, removed):
+        """
+        Subscribe new products on the least loaded connections and drop removed ones.
+
+        Usable as a universe listener (see universe.register_universe_listener).
+        """
+        params = self.params
+        for connection in self.connections:
+            gone = connection.products.intersection(removed)
+            if gone:
+                connection.unsubscribe(gone)
+        for product in removed:
+            self.rates.pop(product, None)
+
+        loads = {connection: connection.load(self.rates) for connection in self.connections}
+        assignments = {}
+        for product in added:
+            if product in self.rates:
+                continue
+            self.rates[product] = params['default_rate']
+            open_slots = [connection for connection in self.connections
+                          if len(connection.products) + len(assignments.get(connection, ()))
+                          < params['max_products_per_connection']]
+            target = min(open_slots, key=loads.__getitem__) if open_slots else None
+            if target is None or loads[target] + self.rates[product] > params['max_rate_per_connection']:
+                if len(self.connections) < params['max_connections']:
+                    target = self._add_connection()
+                    loads[target] = 0.0
+                elif target is None:
+                    target = min(self.connections, key=loads.__getitem__)
+            assignments.setdefault(target, []).append(product)
+            loads[target] += self.rates[product]
+        for target, products in assignments.items():
+            target.subscribe(products)
+            if not target.started:
+                target.start()
+        logger.info(f"Subscriptions updated: +{len(added)} -{len(removed)} products.")
+
+    def rebalance(self):
+        """
+        Refresh the rate estimates and move products off connections that fall behind.
+
+        :return: int, the number of products moved
+        """
+        params = self.params
+        now = time.monotonic()
+        elapsed = max(now - self._last_rebalance, 1e-9)
+        self._last_rebalance = now
+        smoothing = params['rate_smoothing']
+        counts = {}
+        for connection in self.connections:
+            connection_counts, connection.counts = connection.counts, {}
+            connection.rate = sum(connection_counts.values()) / elapsed
+            for product, count in connection_counts.items():
+                counts[product] = counts.get(product, 0) + count
+        for product in self.rates:
+            self.rates[product] += smoothing * (counts.get(product, 0) / elapsed - self.rates[product])
+
+        max_rate = params['max_rate_per_connection']
+        loads = {connection: connection.load(self.rates) for connection in self.connections}
+        behind = [connection for connection in self.connections
+                  if connection.behind() > params['max_lag'] or loads[connection] > max_rate]
+        moved = 0
+        for connection in behind:
+            # Shed down to the rate limit, and at least half the load if messages arrive late
+            excess = loads[connection] - max_rate
+            if connection.behind() > params['max_lag']:
+                excess = max(excess, loads[connection] / 2)
+            moves = {}
+            for product in sorted(connection.products, key=lambda product: -self.rates[product]):
+                rate = self.rates[product]
+                if excess <= 0 or len(connection.products) - sum(map(len, moves.values())) <= 1:
+                    break
+                others = [other for other in self.connections if other is not connection and other not in behind]
+                target = min(others, key=loads.__getitem__) if others else None
+                if ((target is None or loads[target] + rate > max_rate)
+                        and len(self.connections) < params['max_connections']):
+                    target = self._add_connection()
+                    loads[target] = 0.0
+                if target is None:
+                    break
+                moves.setdefault(target, []).append(product)
+                loads[target] += rate
+                loads[connection] -= rate
+                excess -= rate
+            for target, products in moves.items():
+                target.subscribe(products, handoff_from=connection)
+                if not target.started:
+                    target.start()
+                moved += len(products)
+                logger.info(
+                    f"Moving {len(products)} products from {connection.name} ({connection.behind():.2f}s behind, "
+                    f"{connection.rate:.1f} msg/s) to {target.name}."
+                )
+        if moved:
+            MOVED.inc(moved)
+        return moved
+
+    def stats(self):
+        """
+        Return per-connection products, message rate and smoothed lag.
+        """
+        return {
+            connection.name: {
+                'products': len(connection.products),
+                'messages': connection.messages,
+                'rate': connection.rate,
+                'expected_rate': connection.load(self.rates),
+                'lag': connection.lag,
+                'behind': connection.behind()
+            }
+            for connection in self.connections
+        }
@@ -0,0 +1,84 @@
+# test_archive.py
+#
+# Parquet archive round trips, including chunks whose columns are entirely NULL.
+#
+#   python -m pytest tests/test_archive.py
+#   python -m unittest tests.test_archive
+
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.join(BASE_DIR, 'src'))
+
+from archive import archive_rows, read_archive
+from retention import RetentionManager
+
+# strategy2_data after an ALTER TABLE ... ADD COLUMN migration: older rows hold NULL
+COLUMN_TYPES = {'id': 'INTEGER', 'ticker': 'TEXT', 'timestamp': 'TEXT', 'close_5m': 'REAL', 'trades': 'INTEGER'}
+
+def _rows(timestamps, close, trades):
+    return pd.DataFrame({
+        'ticker': 'BTC-USD',
+        'timestamp': timestamps,
+        'close_5m': [close] * len(timestamps),
+        'trades': [trades] * len(timestamps)
+    })
+
+class ArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_null_only_chunk_then_values_reads_back(self):
+        archive_rows(_rows(['2024-01-01T00:00:00', '2024-01-01T01:00:00'], None, None), 'strategy2_data',
+                     root=self.root, column_types=COLUMN_TYPES)
+        archive_rows(_rows(['2024-01-01T02:00:00'], 101.5, 7), 'strategy2_data',
+                     root=self.root, column_types=COLUMN_TYPES)
+
+        df = read_archive('strategy2_data', root=self.root)
+        self.assertEqual(len(df), 3)
+        self.assertTrue(df['close_5m'].iloc[:2].isna().all())
+        self.assertEqual(df['close_5m'].iloc[2], 101.5)
+        self.assertEqual(df['trades'].iloc[2], 7)
+
+    def test_null_only_chunk_without_column_types_is_stored_as_float(self):
+        archive_rows(_rows(['2024-01-01T00:00:00'], None, None), 'strategy2_data', root=self.root)
+        archive_rows(_rows(['2024-01-01T02:00:00'], 101.5, 7.0), 'strategy2_data', root=self.root)
+
+        df = read_archive('strategy2_data', root=self.root, columns=['close_5m'])
+        self.assertEqual(df['close_5m'].tolist()[1], 101.5)
+
+    def test_retention_archives_migrated_table_in_readable_chunks(self):
+        db_path = os.path.join(self.root, 'trading_bot.db')
+        conn = sqlite3.connect(db_path)
+        conn.execute('CREATE TABLE strategy2_data (id INTEGER PRIMARY KEY, ticker TEXT, timestamp TEXT)')
+        conn.executemany('INSERT INTO strategy2_data (ticker, timestamp) VALUES (?, ?)',
+                         [('BTC-USD', f'2024-01-01T00:{minute:02d}:00') for minute in range(3)])
+        conn.execute('ALTER TABLE strategy2_data ADD COLUMN close_5m REAL')
+        conn.executemany('INSERT INTO strategy2_data (ticker, timestamp, close_5m) VALUES (?, ?, ?)',
+                         [('BTC-USD', f'2024-01-01T00:{minute:02d}:00', 100.0 + minute) for minute in range(3, 6)])
+        conn.commit()
+        conn.close()
+
+        policies = {'strategy2_data': {'timestamp': 'timestamp', 'max_age_hours': 1, 'archive': 'strategy2_data'}}
+        manager = RetentionManager(db_path=db_path, policies=policies, chunk_rows=3, chunk_pause=0,
+                                   archive_root=self.root)
+        manager.run(now=datetime(2024, 2, 1), record=False)
+
+        df = read_archive('strategy2_data', root=self.root)
+        self.assertEqual(len(df), 6)
+        self.assertEqual(df['close_5m'].isna().sum(), 3)
+        self.assertEqual(df['close_5m'].max(), 105.0)
+
+if __name__ == '__main__':
+    unittest.main()
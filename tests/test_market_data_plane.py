@@ -0,0 +1,72 @@
+# test_market_data_plane.py
+#
+# Reads from the shared-memory market data plane: empty rings, limits and
+# rings that have wrapped around.
+#
+#   python -m pytest tests/test_market_data_plane.py
+#   python -m unittest tests.test_market_data_plane
+
+import os
+import sys
+import unittest
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.join(BASE_DIR, 'src'))
+
+from market_data_plane import MarketDataReader, MarketDataWriter
+
+CAPACITY = 4
+START = 1700000040  # A minute boundary
+
+class MarketDataReaderTest(unittest.TestCase):
+    def setUp(self):
+        name = f'mdp_test_{os.getpid()}'
+        self.writer = MarketDataWriter(['BTC-USD', 'ETH-USD'], name=name, max_tickers=4, capacity=CAPACITY)
+        self.reader = MarketDataReader(name)
+
+    def tearDown(self):
+        self.reader.close()
+        self.writer.close()
+
+    def publish_minutes(self, ticker, minutes):
+        for i in range(minutes):
+            self.writer.on_tick(ticker, 100.0 + i, 1.0, START + 60 * i)
+
+    def test_registered_ticker_without_bars_is_empty(self):
+        timestamps, values = self.reader.bars('BTC-USD')
+        self.assertEqual(timestamps.shape, (0,))
+        self.assertEqual(values.shape, (0, 5))
+        self.assertTrue(self.reader.frame('BTC-USD', minutes=5).empty)
+
+    def test_limit_zero_is_empty(self):
+        self.publish_minutes('BTC-USD', 2)
+        timestamps, values = self.reader.bars('BTC-USD', limit=0)
+        self.assertEqual(len(timestamps), 0)
+        self.assertEqual(values.shape, (0, 5))
+
+    def test_partially_filled_ring(self):
+        self.publish_minutes('BTC-USD', 3)
+        timestamps, values = self.reader.bars('BTC-USD')
+        self.assertEqual(timestamps.tolist(), [START, START + 60, START + 120])
+        self.assertEqual(values[:, 3].tolist(), [100.0, 101.0, 102.0])
+        self.assertEqual(self.reader.bars('ETH-USD')[0].tolist(), [])
+
+    def test_wrapped_ring_returns_newest_bars_in_order(self):
+        self.publish_minutes('BTC-USD', CAPACITY + 2)
+        timestamps, values = self.reader.bars('BTC-USD')
+        self.assertEqual(timestamps.tolist(), [START + 60 * i for i in range(2, CAPACITY + 2)])
+        self.assertEqual(values[:, 3].tolist(), [100.0 + i for i in range(2, CAPACITY + 2)])
+
+        timestamps, _ = self.reader.bars('BTC-USD', limit=3)
+        self.assertEqual(timestamps.tolist(), [START + 60 * i for i in range(CAPACITY - 1, CAPACITY + 2)])
+
+    def test_loaded_history_is_followed_by_ticks(self):
+        timestamps = np.array([START - 120, START - 60], dtype=np.int64)
+        self.writer.load_bars('BTC-USD', timestamps, np.full((2, 5), 99.0))
+        self.publish_minutes('BTC-USD', 1)
+        self.assertEqual(self.reader.bars('BTC-USD')[0].tolist(), [START - 120, START - 60, START])
+
+if __name__ == '__main__':
+    unittest.main()
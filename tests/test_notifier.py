@@ -0,0 +1,149 @@
+# test_notifier.py
+#
+# Behaviour of the background notification dispatcher: coalescing, rate
+# limiting, retries with backoff and the final flush on stop.
+#
+#   python -m pytest tests/test_notifier.py
+#   python -m unittest tests.test_notifier
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.join(BASE_DIR, 'src'))
+
+from notifier import InMemoryTransport, NotificationDispatcher, RateLimiter
+
+class RecordingTransport(InMemoryTransport):
+    """
+    InMemoryTransport that fails its first `failures` sends and records close().
+    """
+
+    def __init__(self, failures=0):
+        super().__init__()
+        self.failures = failures
+        self.attempts = 0
+        self.closed = False
+
+    def send(self, subject, body):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise ConnectionError("transport unavailable")
+        super().send(subject, body)
+
+    def close(self):
+        self.closed = True
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+class NotificationDispatcherTest(unittest.TestCase):
+    def make_dispatcher(self, transport, **kwargs):
+        dispatcher = NotificationDispatcher({'email': transport}, **kwargs)
+        self.addCleanup(dispatcher.stop, 1)
+        return dispatcher
+
+    def test_burst_is_coalesced_into_one_digest(self):
+        transport = RecordingTransport()
+        dispatcher = self.make_dispatcher(transport, coalesce_window=0.3)
+        dispatcher.submit('email', 'first', 'one')
+        self.assertTrue(wait_for(lambda: len(transport.sent) == 1))
+        dispatcher.submit('email', 'second', 'two')
+        dispatcher.submit('email', 'third', 'three')
+
+        self.assertTrue(wait_for(lambda: len(transport.sent) == 2))
+        subject, body = transport.sent[1]
+        self.assertEqual(subject, '2 notifications: second')
+        self.assertIn('[second]\ntwo', body)
+        self.assertIn('[third]\nthree', body)
+        stats = dispatcher.get_stats()
+        self.assertEqual((stats['queued'], stats['sent'], stats['coalesced']), (3, 2, 1))
+
+    def test_rate_limit_holds_messages_until_a_token_frees_up(self):
+        transport = RecordingTransport()
+        dispatcher = self.make_dispatcher(transport, rate_limits={'email': 1}, coalesce_window=0)
+        dispatcher.submit('email', 'first', 'one')
+        self.assertTrue(wait_for(lambda: len(transport.sent) == 1))
+        dispatcher.submit('email', 'second', 'two')
+        time.sleep(0.2)
+        self.assertEqual(len(transport.sent), 1)  # The next token is a minute away
+
+    def test_rate_limiter_refills_at_the_configured_rate(self):
+        limiter = RateLimiter(per_minute=2)
+        now = limiter.last_refill
+        limiter.consume(now)
+        limiter.consume(now)
+        self.assertAlmostEqual(limiter.next_available(now), now + 30.0)
+        self.assertEqual(limiter.next_available(now + 30.0), now + 30.0)
+
+    def test_failed_delivery_is_retried_with_backoff(self):
+        transport = RecordingTransport(failures=2)
+        dispatcher = self.make_dispatcher(transport, coalesce_window=0, max_retries=5, initial_backoff=0.05)
+        start = time.monotonic()
+        dispatcher.submit('email', 'alert', 'body')
+
+        self.assertTrue(wait_for(lambda: transport.sent == [('alert', 'body')]))
+        self.assertGreaterEqual(time.monotonic() - start, 0.05 + 0.1)  # Backoff doubles: 0.05s, then 0.1s
+        stats = dispatcher.get_stats()
+        self.assertEqual((stats['retried'], stats['sent'], stats['failed']), (2, 1, 0))
+
+    def test_delivery_is_abandoned_after_max_retries(self):
+        transport = RecordingTransport(failures=100)
+        dispatcher = self.make_dispatcher(transport, coalesce_window=0, max_retries=2, initial_backoff=0.01)
+        dispatcher.submit('email', 'alert', 'body')
+
+        self.assertTrue(wait_for(lambda: dispatcher.get_stats()['failed'] == 1))
+        self.assertEqual(transport.attempts, 3)
+        self.assertEqual(transport.sent, [])
+
+    def test_stop_sends_pending_messages_as_a_final_digest(self):
+        transport = RecordingTransport()
+        dispatcher = NotificationDispatcher({'email': transport}, rate_limits={'email': 1}, coalesce_window=60)
+        dispatcher.submit('email', 'first', 'one')
+        self.assertTrue(wait_for(lambda: len(transport.sent) == 1))
+        dispatcher.submit('email', 'second', 'two')
+        dispatcher.submit('email', 'third', 'three')
+
+        dispatcher.stop(timeout=5)
+        # Held by both the coalesce window and the rate limit, but sent on stop
+        self.assertEqual(transport.sent[1][0], '2 notifications: second')
+        self.assertTrue(transport.closed)
+
+    def test_final_digest_is_not_retried(self):
+        transport = RecordingTransport(failures=100)
+        dispatcher = NotificationDispatcher({'email': transport}, coalesce_window=60, initial_backoff=60)
+        dispatcher.submit('email', 'first', 'one')
+        self.assertTrue(wait_for(lambda: dispatcher.get_stats()['retried'] == 1))
+
+        dispatcher.stop(timeout=5)
+        self.assertEqual(transport.attempts, 2)
+        self.assertEqual(dispatcher.get_stats()['failed'], 1)
+
+    def test_stop_leaves_transports_open_while_the_worker_is_sending(self):
+        release = threading.Event()
+
+        class BlockingTransport(RecordingTransport):
+            def send(self, subject, body):
+                release.wait()
+                super().send(subject, body)
+
+        transport = BlockingTransport()
+        dispatcher = NotificationDispatcher({'email': transport}, coalesce_window=0)
+        dispatcher.submit('email', 'slow', 'body')
+        dispatcher.stop(timeout=0.1)
+        self.assertFalse(transport.closed)
+
+        release.set()
+        self.assertTrue(wait_for(lambda: transport.sent == [('slow', 'body')]))
+
+if __name__ == '__main__':
+    unittest.main()
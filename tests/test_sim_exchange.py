@@ -0,0 +1,121 @@
+# test_sim_exchange.py
+#
+# Behaviour of the simulated exchange's matching engine: resting limit orders,
+# post-only and IOC handling, funds checks and holds.
+#
+#   python -m pytest tests/test_sim_exchange.py
+#   python -m unittest tests.test_sim_exchange
+
+import os
+import sys
+import unittest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.join(BASE_DIR, 'src'))
+
+from sim_exchange import SimulatedExchange, SimulatedExchangeError
+
+PRODUCT = 'BTC-USD'
+MAKER_FEE = 0.001
+TAKER_FEE = 0.002
+
+class SimulatedExchangeTest(unittest.TestCase):
+    def setUp(self):
+        # No injected latency or failures; 10 bps spread puts the book at 99.95 / 100.05
+        self.exchange = SimulatedExchange(
+            balances={'USD': 1000.0, 'BTC': 1.0}, spread_bps=10, maker_fee=MAKER_FEE, taker_fee=TAKER_FEE,
+            latency_ms=0, latency_jitter_ms=0, reject_rate=0, error_rate=0, seed=0
+        )
+        self.exchange.on_tick(PRODUCT, 100.0, 0.5, 1700000000.0)
+
+    def accounts(self):
+        return {account['currency']: account for account in self.exchange.get_accounts()}
+
+    def test_resting_buy_fills_when_price_trades_through(self):
+        order = self.exchange.place_order(PRODUCT, 'BUY', 1, price=99.0, post_only=True)
+        self.assertEqual(order['status'], 'open')
+        self.assertAlmostEqual(float(self.accounts()['USD']['hold']), 99.0 * (1 + MAKER_FEE))
+
+        self.exchange.on_tick(PRODUCT, 99.5, 0.1, 1700000060.0)
+        self.assertEqual(self.exchange.get_order(order['id'])['status'], 'open')
+
+        self.exchange.on_tick(PRODUCT, 98.9, 0.1, 1700000120.0)
+        filled = self.exchange.get_order(order['id'])
+        self.assertEqual((filled['status'], filled['done_reason']), ('done', 'filled'))
+        self.assertEqual(float(filled['executed_value']), 99.0)  # At the limit price, not the trade
+        self.assertAlmostEqual(float(filled['fill_fees']), 99.0 * MAKER_FEE)
+        accounts = self.accounts()
+        self.assertAlmostEqual(float(accounts['USD']['balance']), 1000.0 - 99.0 * (1 + MAKER_FEE))
+        self.assertAlmostEqual(float(accounts['BTC']['balance']), 2.0)
+        self.assertEqual(float(accounts['USD']['hold']), 0.0)
+
+    def test_resting_sell_fills_when_price_trades_through(self):
+        order = self.exchange.place_order(PRODUCT, 'SELL', 0.5, price=101.0)
+        self.assertEqual(float(self.accounts()['BTC']['hold']), 0.5)
+        self.exchange.on_tick(PRODUCT, 101.2, 0.1, 1700000060.0)
+        self.assertEqual(self.exchange.get_order(order['id'])['done_reason'], 'filled')
+        self.assertAlmostEqual(float(self.accounts()['USD']['balance']), 1000.0 + 50.5 * (1 - MAKER_FEE))
+
+    def test_post_only_order_that_would_cross_is_rejected(self):
+        order = self.exchange.place_order(PRODUCT, 'BUY', 1, price=100.1, post_only=True)
+        self.assertEqual(order['status'], 'rejected')
+        self.assertEqual(order['reject_reason'], 'post only')
+        self.assertEqual(float(self.accounts()['USD']['hold']), 0.0)
+
+    def test_crossing_limit_order_fills_at_best_price_as_taker(self):
+        order = self.exchange.place_order(PRODUCT, 'BUY', 1, price=100.1)
+        self.assertEqual(order['done_reason'], 'filled')
+        self.assertAlmostEqual(float(order['executed_value']), 100.05)
+        self.assertAlmostEqual(float(order['fill_fees']), 100.05 * TAKER_FEE)
+
+    def test_insufficient_funds_is_rejected(self):
+        buy = self.exchange.place_order(PRODUCT, 'BUY', 20, price=99.0)
+        sell = self.exchange.place_order(PRODUCT, 'SELL', 5, price=101.0)
+        self.assertEqual((buy['status'], buy['reject_reason']), ('rejected', 'Insufficient funds'))
+        self.assertEqual((sell['status'], sell['reject_reason']), ('rejected', 'Insufficient funds'))
+        accounts = self.accounts()
+        self.assertEqual(float(accounts['USD']['balance']), 1000.0)
+        self.assertEqual(float(accounts['USD']['hold']), 0.0)
+        self.assertEqual(float(accounts['BTC']['hold']), 0.0)
+
+    def test_holds_count_against_available_funds(self):
+        self.exchange.place_order(PRODUCT, 'BUY', 6, price=99.0)  # Holds about 594.6 USD
+        second = self.exchange.place_order(PRODUCT, 'BUY', 6, price=99.0)
+        self.assertEqual(second['reject_reason'], 'Insufficient funds')
+
+    def test_ioc_order_that_does_not_cross_is_canceled(self):
+        order = self.exchange.place_order(PRODUCT, 'BUY', 1, price=99.0, time_in_force='IOC')
+        self.assertEqual((order['status'], order['done_reason']), ('done', 'canceled'))
+        self.assertEqual(float(order['filled_size']), 0.0)
+        self.assertEqual(float(self.accounts()['USD']['hold']), 0.0)
+
+        # It never rests, so a later trade through its price does not fill it
+        self.exchange.on_tick(PRODUCT, 98.0, 0.1, 1700000060.0)
+        self.assertEqual(self.exchange.get_order(order['id'])['done_reason'], 'canceled')
+        self.assertEqual(float(self.accounts()['BTC']['balance']), 1.0)
+
+    def test_ioc_order_that_crosses_fills(self):
+        order = self.exchange.place_order(PRODUCT, 'SELL', 0.5, price=99.0, time_in_force='IOC')
+        self.assertEqual(order['done_reason'], 'filled')
+        self.assertAlmostEqual(float(order['executed_value']), 0.5 * 99.95)
+
+    def test_cancel_releases_hold(self):
+        order = self.exchange.place_order(PRODUCT, 'BUY', 2, price=99.0)
+        self.assertGreater(float(self.accounts()['USD']['hold']), 0.0)
+
+        self.assertEqual(self.exchange.cancel_order(order['id']), order['id'])
+        accounts = self.accounts()
+        self.assertEqual(float(accounts['USD']['hold']), 0.0)
+        self.assertEqual(float(accounts['USD']['available']), 1000.0)
+        self.assertEqual(self.exchange.get_order(order['id'])['done_reason'], 'canceled')
+
+        # The canceled order is skipped when the price trades through it
+        self.exchange.on_tick(PRODUCT, 98.0, 0.1, 1700000060.0)
+        self.assertEqual(float(self.accounts()['USD']['balance']), 1000.0)
+        with self.assertRaises(SimulatedExchangeError) as raised:
+            self.exchange.cancel_order(order['id'])
+        self.assertEqual(raised.exception.status, 400)
+
+if __name__ == '__main__':
+    unittest.main()